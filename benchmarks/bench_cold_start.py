@@ -0,0 +1,136 @@
+"""Time a sync with nothing to do, from a fresh interpreter, as a CI job or pre-commit hook would run it.
+
+    python benchmarks/bench_cold_start.py --sizes 1000 100000 --repeat 5
+
+For each tree the data dir is synced with the local platform until it is in sync, then three commands
+are each run --repeat times in a new process:
+
+    import:     import kabbes_s3synchrony
+    fast:       a sync that stops at the fingerprint of the last one
+    full:       the same sync with fast_noop off
+
+The median wall time of each, and whether the run imported pandas or boto3, are written as JSON
+to --output, by default benchmarks/results/cold_start-<commit>.json"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_sync import make_tree, get_commit
+
+SYNC_SCRIPT = '''
+import json, sys
+import kabbes_s3synchrony
+client = kabbes_s3synchrony.Client( dict = json.loads( sys.argv[1] ) )
+client.cfg.load_dict( { '_name': 'bench' } )
+client.run()
+print( json.dumps( { module: module in sys.modules for module in [ 'pandas', 'boto3' ] } ) )
+'''
+
+IMPORT_SCRIPT = '''
+import json, sys
+import kabbes_s3synchrony
+print( json.dumps( { module: module in sys.modules for module in [ 'pandas', 'boto3' ] } ) )
+'''
+
+
+def run_python( script, work_dir, *args ):
+
+    """Run a script in a new interpreter, returning its wall time and the JSON on its last line"""
+
+    env = dict( os.environ )
+    env['PYTHONPATH'] = os.pathsep.join( [ os.path.join( os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ), 'src' ) ] +
+                                         [ path for path in [ env.get( 'PYTHONPATH' ) ] if path ] )
+
+    start = time.perf_counter()
+    completed = subprocess.run( [ sys.executable, '-c', script ] + list( args ), cwd = work_dir, env = env, capture_output = True, text = True )
+    seconds = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        raise RuntimeError( completed.stderr )
+    return seconds, json.loads( completed.stdout.strip().split( '\n' )[-1] )
+
+
+def run_case( args, n_files ):
+
+    tree_dir = os.path.join( args.root, 'trees', 'small-{}'.format( n_files ) )
+    make_tree( tree_dir, n_files, 'small' )
+
+    work_dir = os.path.join( args.root, 'cold' )
+    shutil.rmtree( work_dir, ignore_errors = True )
+    os.makedirs( os.path.join( work_dir, 'remote' ) )
+    shutil.copytree( tree_dir, os.path.join( work_dir, 'Data' ), copy_function = os.link, ignore = shutil.ignore_patterns( '.done' ) )
+
+    cfg = {
+        'platform': 'local',
+        'local_data_rel_dir': 'Data',
+        'remote_data_dir': 'data',
+        'auto_approve': True,
+        'platforms': { 'local': { 'remote_root': os.path.join( work_dir, 'remote' ) } }
+    }
+
+    # the first sync uploads everything, the second finds nothing to do and records the fingerprint
+    for _ in range( 2 ):
+        run_python( SYNC_SCRIPT, work_dir, json.dumps( cfg ) )
+
+    commands = {
+        'import': ( IMPORT_SCRIPT, [] ),
+        'fast': ( SYNC_SCRIPT, [ json.dumps( cfg ) ] ),
+        'full': ( SYNC_SCRIPT, [ json.dumps( dict( cfg, fast_noop = False ) ) ] )
+    }
+
+    case = { 'files': n_files, 'runs': {} }
+    for name, ( script, script_args ) in commands.items():
+
+        seconds = []
+        for _ in range( args.repeat ):
+            run_seconds, modules = run_python( script, work_dir, *script_args )
+            seconds.append( run_seconds )
+
+        case['runs'][ name ] = { 'median_seconds': statistics.median( seconds ), 'seconds': seconds, 'imported': modules }
+
+    shutil.rmtree( work_dir, ignore_errors = True )
+    return case
+
+
+def run( args ):
+
+    commit = get_commit()
+    results = {
+        'commit': commit,
+        'timestamp': dt.datetime.now().isoformat( timespec = 'seconds' ),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': []
+    }
+
+    for n_files in args.sizes:
+
+        case = run_case( args, n_files )
+        results['cases'].append( case )
+
+        print( '{:>9} files  '.format( n_files ) + '  '.join(
+            '{} {:.3f}s'.format( name, run['median_seconds'] ) for name, run in case['runs'].items() ) )
+
+    output = args.output or os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'results', 'cold_start-' + commit + '.json' )
+    os.makedirs( os.path.dirname( os.path.abspath( output ) ), exist_ok = True )
+    with open( output, 'w' ) as f:
+        json.dump( results, f, indent = 2 )
+    print( 'Wrote ' + output )
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument( '--sizes', type = int, nargs = '+', default = [ 1000, 100000 ] )
+    parser.add_argument( '--repeat', type = int, default = 5 )
+    parser.add_argument( '--root', default = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), '.trees' ) )
+    parser.add_argument( '--output', default = None )
+    run( parser.parse_args() )
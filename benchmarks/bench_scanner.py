@@ -0,0 +1,103 @@
+"""Compare the directory scanner against the legacy walk + per-file concat.
+
+    python benchmarks/bench_scanner.py --sizes 10000 100000 1000000
+
+Trees are generated once under --root and reused on later runs. Hashing is
+left out so only the walk and the DataFrame construction are timed."""
+
+import argparse
+import datetime as dt
+import os
+import time
+
+import dir_ops as do
+import pandas as pd
+
+import kabbes_s3synchrony
+
+COLUMNS = [ 'File', 'Edited By', 'Time Edited', 'Checksum' ]
+DTTM_FORMAT = '%Y-%m-%d %H:%M:%S'
+FILES_PER_DIR = 1000
+
+
+def make_tree( root, n_files ):
+
+    done_Path = os.path.join( root, '.done' )
+    if os.path.exists( done_Path ):
+        return
+
+    for i in range( n_files ):
+        dir = os.path.join( root, 'd{:05d}'.format( i // FILES_PER_DIR ) )
+        if i % FILES_PER_DIR == 0:
+            os.makedirs( dir, exist_ok = True )
+        with open( os.path.join( dir, 'f{:07d}.txt'.format( i ) ), 'w' ) as f:
+            f.write( str( i ) )
+
+    open( done_Path, 'w' ).close()
+
+
+def legacy( root ):
+
+    lDir = do.Dir( root )
+    df = pd.DataFrame( columns = COLUMNS )
+
+    for Path_inst in lDir.walk_contents_Paths( block_dirs = True, block_paths = False, folders_to_skip = [] ):
+        df_new = pd.DataFrame( columns = COLUMNS )
+        df_new[ 'File' ] = [ Path_inst.get_rel( lDir ).path ]
+        df_new[ 'Time Edited' ] = Path_inst.get_mtime().strftime( DTTM_FORMAT )
+        df_new[ 'Checksum' ] = ''
+        df_new[ 'Edited By' ] = 'bench'
+        df = pd.concat( [ df, df_new ], ignore_index = True )
+
+    return df
+
+
+def scanner( root ):
+
+    scan = kabbes_s3synchrony.Scanner( root ).scan()
+    return pd.DataFrame( {
+        'File': scan.rel_paths,
+        'Edited By': 'bench',
+        'Time Edited': [ dt.datetime.fromtimestamp( mtime ).strftime( DTTM_FORMAT ) for mtime in scan.mtimes ],
+        'Checksum': ''
+    }, columns = COLUMNS )
+
+
+def streaming( root ):
+
+    n = 0
+    for entry in kabbes_s3synchrony.iter_files( root ):
+        n += 1
+    return n
+
+
+def timed( function, *args ):
+
+    start = time.perf_counter()
+    function( *args )
+    return time.perf_counter() - start
+
+
+def main():
+
+    parser = argparse.ArgumentParser( description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter )
+    parser.add_argument( '--sizes', type = int, nargs = '+', default = [ 10000, 100000, 1000000 ] )
+    parser.add_argument( '--root', default = os.path.join( 'benchmarks', '.trees' ) )
+    parser.add_argument( '--legacy-max', type = int, default = 10000, help = 'skip the quadratic legacy walk above this many files' )
+    args = parser.parse_args()
+
+    print( '{:>10} {:>12} {:>12} {:>12}'.format( 'files', 'legacy s', 'scanner s', 'stream s' ) )
+    for n_files in args.sizes:
+
+        root = os.path.join( args.root, str( n_files ) )
+        make_tree( root, n_files )
+
+        legacy_seconds = float( 'nan' )
+        if n_files <= args.legacy_max:
+            legacy_seconds = timed( legacy, root )
+
+        print( '{:>10} {:>12.2f} {:>12.2f} {:>12.2f}'.format( n_files, legacy_seconds, timed( scanner, root ), timed( streaming, root ) ) )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""Time every phase of BasePlatform.synchronize on synthetic trees, with the local platform as the remote.
+
+    python benchmarks/bench_sync.py --sizes 1000 10000 100000 --distributions small mixed --change-ratios 0.01 0.1
+    python benchmarks/bench_sync.py compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+
+Each tree is generated once under --root from a fixed seed and reused on later runs.
+For every tree, distribution and change ratio, four syncs are timed:
+
+    initial:  the first sync, uploading every file
+    noop:     a second sync with nothing changed
+    push:     a sync after modifying, adding and deleting change_ratio of the files
+    clone:    a second user's first sync, downloading every file
+
+Results are written as JSON to --output, by default benchmarks/results/<commit>.json"""
+
+import argparse
+import contextlib
+import datetime as dt
+import functools
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+import kabbes_s3synchrony
+
+FILES_PER_DIR = 1000
+SEED = 0
+
+# file size in bytes for each distribution
+DISTRIBUTIONS = {
+    'small': lambda rng: rng.randint( 100, 4096 ),
+    'mixed': lambda rng: min( int( rng.lognormvariate( 8, 2 ) ) + 1, 64 * 1024**2 ),
+    'large': lambda rng: rng.randint( 256 * 1024, 4 * 1024**2 )
+}
+
+PHASES = [
+    '_download_manifest',
+    '_push_deleted_remote',
+    '_pull_deleted_local',
+    '_push_new_remote',
+    '_pull_new_local',
+    '_push_modified_remote',
+    '_pull_modified_local',
+    '_revert_modified_remote',
+    '_revert_modified_local',
+]
+
+
+def write_file( path, n_bytes, rng ):
+
+    os.makedirs( os.path.dirname( path ), exist_ok = True )
+    with open( path, 'wb' ) as f:
+        f.write( rng.randbytes( n_bytes ) )
+
+
+def get_rel_path( i ):
+    return 'd{:04d}/f{:07d}.bin'.format( i // FILES_PER_DIR, i )
+
+
+def make_tree( root, n_files, distribution ):
+
+    """Generate the tree once, marking it done so an interrupted run starts over"""
+
+    done_path = os.path.join( root, '.done' )
+    if os.path.exists( done_path ):
+        return
+
+    shutil.rmtree( root, ignore_errors = True )
+    rng = random.Random( SEED )
+    size_function = DISTRIBUTIONS[ distribution ]
+
+    for i in range( n_files ):
+        write_file( os.path.join( root, get_rel_path( i ) ), size_function( rng ), rng )
+
+    open( done_path, 'w' ).close()
+
+
+def apply_changes( data_dir, n_files, distribution, change_ratio ):
+
+    """Modify change_ratio of the files, and add and delete a tenth as many.
+    Files are replaced rather than edited in place, they may be hard links into the generated tree"""
+
+    rng = random.Random( SEED + 1 )
+    size_function = DISTRIBUTIONS[ distribution ]
+    n_changes = max( 1, int( n_files * change_ratio ) )
+
+    indices = rng.sample( range( n_files ), min( n_files, n_changes + n_changes // 10 ) )
+    modified, deleted = indices[ :n_changes ], indices[ n_changes: ]
+
+    for i in modified:
+        path = os.path.join( data_dir, get_rel_path( i ) )
+        os.remove( path )
+        write_file( path, size_function( rng ), rng )
+
+    for i in deleted:
+        os.remove( os.path.join( data_dir, get_rel_path( i ) ) )
+
+    for i in range( n_files, n_files + n_changes // 10 ):
+        write_file( os.path.join( data_dir, get_rel_path( i ) ), size_function( rng ), rng )
+
+    return { 'modified': len( modified ), 'deleted': len( deleted ), 'added': n_changes // 10 }
+
+
+@contextlib.contextmanager
+def time_phases( timings ):
+
+    """Accumulate the seconds spent in each phase of BasePlatform into timings while active"""
+
+    BasePlatform = kabbes_s3synchrony.BasePlatform
+    originals = { name: getattr( BasePlatform, name ) for name in PHASES + [ '_compute_directory' ] }
+
+    def timed( name, method ):
+
+        @functools.wraps( method )
+        def wrapper( *args, **kwargs ):
+            start = time.perf_counter()
+            try:
+                return method( *args, **kwargs )
+            finally:
+                timings[ name ] = timings.get( name, 0.0 ) + time.perf_counter() - start
+
+        return wrapper
+
+    for name, method in originals.items():
+        setattr( BasePlatform, name, timed( name.strip( '_' ), method ) )
+
+    try:
+        yield timings
+    finally:
+        for name, method in originals.items():
+            setattr( BasePlatform, name, method )
+
+
+def sync( work_dir, who, remote_root, manifest, verbose, streaming = False ):
+
+    """Run one synchronization of who's data dir, returning the seconds spent in each phase"""
+
+    # local_data_rel_dir is relative to the working directory at import
+    client = kabbes_s3synchrony.Client( dict = {
+        'platform': 'local',
+        'local_data_rel_dir': os.path.relpath( os.path.join( work_dir, who, 'Data' ) ),
+        'remote_data_dir': 'data',
+        'manifest': manifest,
+        'streaming': streaming,
+        'auto_approve': True,
+        'platforms': { 'local': { 'remote_root': remote_root } }
+    } )
+    client.cfg.load_dict( { '_name': who } )
+
+    timings = {}
+    output = sys.stdout if verbose else io.StringIO()
+    with time_phases( timings ), contextlib.redirect_stdout( output ):
+        start = time.perf_counter()
+        client.run()
+        timings['total'] = time.perf_counter() - start
+
+    timings['other'] = timings['total'] - sum( seconds for name, seconds in timings.items() if name != 'total' )
+    return timings
+
+
+def run_case( args, n_files, distribution, change_ratio ):
+
+    tree_dir = os.path.join( args.root, 'trees', '{}-{}'.format( distribution, n_files ) )
+    make_tree( tree_dir, n_files, distribution )
+
+    work_dir = os.path.join( args.root, 'work' )
+    shutil.rmtree( work_dir, ignore_errors = True )
+    remote_root = os.path.join( work_dir, 'remote' )
+    os.makedirs( remote_root )
+
+    # hard links make the copy cheap, apply_changes replaces files instead of writing through them
+    data_dir = os.path.join( work_dir, 'alice', 'Data' )
+    shutil.copytree( tree_dir, data_dir, copy_function = os.link, ignore = shutil.ignore_patterns( '.done' ) )
+
+    case = {
+        'files': n_files,
+        'distribution': distribution,
+        'change_ratio': change_ratio,
+        'bytes': sum( os.path.getsize( os.path.join( data_dir, get_rel_path( i ) ) ) for i in range( n_files ) ),
+        'syncs': {}
+    }
+
+    case['syncs']['initial'] = sync( work_dir, 'alice', remote_root, args.manifest, args.verbose, args.streaming )
+    case['syncs']['noop'] = sync( work_dir, 'alice', remote_root, args.manifest, args.verbose, args.streaming )
+    case['changes'] = apply_changes( data_dir, n_files, distribution, change_ratio )
+    case['syncs']['push'] = sync( work_dir, 'alice', remote_root, args.manifest, args.verbose, args.streaming )
+    case['syncs']['clone'] = sync( work_dir, 'bob', remote_root, args.manifest, args.verbose, args.streaming )
+
+    shutil.rmtree( work_dir, ignore_errors = True )
+    return case
+
+
+def get_commit():
+
+    try:
+        return subprocess.run( [ 'git', 'rev-parse', '--short', 'HEAD' ], capture_output = True, text = True,
+                               cwd = os.path.dirname( os.path.abspath( __file__ ) ) ).stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def run( args ):
+
+    commit = get_commit()
+    results = {
+        'commit': commit,
+        'timestamp': dt.datetime.now().isoformat( timespec = 'seconds' ),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'manifest': args.manifest,
+        'streaming': args.streaming,
+        'cases': []
+    }
+
+    for n_files in args.sizes:
+        for distribution in args.distributions:
+            for change_ratio in args.change_ratios:
+
+                case = run_case( args, n_files, distribution, change_ratio )
+                results['cases'].append( case )
+
+                print( '{:>9} files {:>6} {:>5.1%} changed  '.format( n_files, distribution, change_ratio ) + '  '.join(
+                    '{} {:.2f}s'.format( name, timings['total'] ) for name, timings in case['syncs'].items() ) )
+
+    output = args.output or os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'results', commit + '.json' )
+    os.makedirs( os.path.dirname( os.path.abspath( output ) ), exist_ok = True )
+    with open( output, 'w' ) as f:
+        json.dump( results, f, indent = 2 )
+    print( 'Wrote ' + output )
+
+
+def compare( args ):
+
+    """Print the total seconds of every sync in two result files side by side"""
+
+    with open( args.before ) as f:
+        before = json.load( f )
+    with open( args.after ) as f:
+        after = json.load( f )
+
+    def key( case ):
+        return ( case['files'], case['distribution'], case['change_ratio'] )
+
+    before_cases = { key( case ): case for case in before['cases'] }
+
+    print( '{:>9} {:>6} {:>6} {:>8} {:>10} {:>10} {:>8}'.format( 'files', 'dist', 'ratio', 'sync', before['commit'], after['commit'], 'change' ) )
+    for case in after['cases']:
+
+        before_case = before_cases.get( key( case ) )
+        if before_case is None:
+            continue
+
+        for name, timings in case['syncs'].items():
+            if name not in before_case['syncs']:
+                continue
+
+            old, new = before_case['syncs'][ name ]['total'], timings['total']
+            print( '{:>9} {:>6} {:>6.1%} {:>8} {:>9.2f}s {:>9.2f}s {:>+7.1%}'.format(
+                case['files'], case['distribution'], case['change_ratio'], name, old, new, new / old - 1 if old > 0 else 0 ) )
+
+
+if __name__ == '__main__':
+
+    if len( sys.argv ) > 1 and sys.argv[1] == 'compare':
+        parser = argparse.ArgumentParser( prog = 'bench_sync.py compare' )
+        parser.add_argument( 'before' )
+        parser.add_argument( 'after' )
+        compare( parser.parse_args( sys.argv[2:] ) )
+
+    else:
+        parser = argparse.ArgumentParser()
+        parser.add_argument( '--sizes', type = int, nargs = '+', default = [ 1000, 10000 ] )
+        parser.add_argument( '--distributions', nargs = '+', default = [ 'small', 'mixed' ], choices = sorted( DISTRIBUTIONS ) )
+        parser.add_argument( '--change-ratios', type = float, nargs = '+', default = [ 0.01, 0.1 ] )
+        parser.add_argument( '--manifest', default = 'csv' )
+        parser.add_argument( '--streaming', action = 'store_true' )
+        parser.add_argument( '--root', default = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), '.trees' ) )
+        parser.add_argument( '--output', default = None )
+        parser.add_argument( '--verbose', action = 'store_true' )
+        run( parser.parse_args() )
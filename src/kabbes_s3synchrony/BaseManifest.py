@@ -0,0 +1,122 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import pandas as pd
+import os
+
+
+class BaseManifest( ParentClass ):
+
+    """Reads and writes the versions/deleted manifests kept in the util dirs.
+    Child Manifests store the same four columns in their own format"""
+
+    EXTENSION = None
+    LEGACY_EXTENSION = '.csv'
+
+    def __init__( self, Platform ):
+
+        ParentClass.__init__( self )
+        self.Platform = Platform
+        self.columns = Platform.columns
+
+    def get_filename( self, name ):
+        """versions_remote -> versions_remote.csv"""
+        return name + self.EXTENSION
+
+    def get_legacy_path( self, path ):
+        """The csv a manifest at path was migrated from"""
+        return os.path.splitext( path )[0] + self.LEGACY_EXTENSION
+
+    def exists( self, lPath ):
+        return os.path.exists( lPath.path ) or os.path.exists( self.get_legacy_path( lPath.path ) )
+
+    def read( self, lPath ):
+
+        """Return the manifest at lPath as a dataframe, migrating from a legacy csv if needed"""
+
+        if not os.path.exists( lPath.path ):
+            legacy_path = self.get_legacy_path( lPath.path )
+            if legacy_path != lPath.path and os.path.exists( legacy_path ):
+                return self._read_csv( legacy_path )
+
+        return self._read( lPath.path )
+
+    def write( self, df, lPath ):
+        self._write( df.reindex( columns = self.columns ), lPath.path )
+
+    def lookup( self, lPath, rel_paths ):
+
+        """Return the rows of the manifest for the given relative paths"""
+
+        df = self.read( lPath )
+        return df.loc[ df[ self.Platform._file_colname ].isin( rel_paths ) ]
+
+    def read_scope( self, lPath, Scope ):
+
+        """Return the rows of the manifest for files within the Scope"""
+
+        df = self.read( lPath )
+        return df.loc[ df[ self.Platform._file_colname ].map( lambda rel_path: isinstance( rel_path, str ) and Scope.contains( rel_path ) ).astype( bool ) ]
+
+    def replace_scope( self, df, lPath, Scope ):
+
+        """Replace the rows of the manifest for files within the Scope with df, leaving every other row as it is"""
+
+        if self.exists( lPath ):
+            df_outside = self.read( lPath )
+            df_outside = df_outside.loc[ ~df_outside[ self.Platform._file_colname ].map( lambda rel_path: isinstance( rel_path, str ) and Scope.contains( rel_path ) ).astype( bool ) ]
+            df = pd.concat( [ df_outside, df ], ignore_index = True )
+
+        self.write( df, lPath )
+
+    def iter_sorted( self, lPath ):
+
+        """Yield the rows of the manifest as tuples, one per file, in the order iter_files visits them.
+        Reads the whole manifest first, Child Manifests that can should stream it"""
+
+        if not self.exists( lPath ):
+            return
+
+        df = self.read( lPath ).dropna( subset = [ self.Platform._file_colname ] )
+        df = df.drop_duplicates( [ self.Platform._file_colname ], keep = 'last' ).astype( object )
+        df = df.where( df.notna(), None )
+
+        rows = list( df.itertuples( index = False, name = None ) )
+        rows.sort( key = lambda row: kabbes_s3synchrony.sort_key( row[0] ) )
+        yield from rows
+
+    def open_writer( self, lPath ):
+        """Return a ManifestWriter that replaces the manifest at lPath once it is closed"""
+        return ManifestWriter( self, lPath )
+
+    def _read_csv( self, path ):
+
+        # drop any stray columns such as a written index
+        df = pd.read_csv( path, dtype = { self.Platform._hash_colname: str } )
+        return df.reindex( columns = self.columns )
+
+    def _read( self, path ):
+        """Should be defined by the Child Manifest"""
+        assert False
+
+    def _write( self, df, path ):
+        """Should be defined by the Child Manifest"""
+        assert False
+
+
+class ManifestWriter( ParentClass ):
+
+    """Writes a manifest a part at a time. Holds every part until close, Child Manifests that can should write them as they come"""
+
+    def __init__( self, Manifest, lPath ):
+
+        ParentClass.__init__( self )
+
+        self.Manifest = Manifest
+        self.lPath = lPath
+        self.dfs = []
+
+    def append( self, df ):
+        self.dfs.append( df )
+
+    def close( self ):
+        self.Manifest.write( pd.concat( [ pd.DataFrame( columns = self.Manifest.columns ) ] + self.dfs, ignore_index = True ), self.lPath )
@@ -6,19 +6,75 @@ import py_starter as ps
 import dir_ops as do
 import pandas as pd
 from parent_class import ParentClass
+import importlib
 import functools
+import tempfile
+import time
 import os
 
 
 def data_function( method ):
 
+    """Run a single-Path transfer method over every Path on the platform's transfer executor.
+    A coroutine named like the method plus _async is used instead by the async executor.
+    The latency of every call and the bytes moved are recorded in the platform's metrics"""
+
+    name = method.__name__.strip('_')
+
     @functools.wraps( method )
     def wrapper( self, Paths_inst ):
 
-        successful_Paths = self.PATHS_CLASS()
+        Paths_list = list( Paths_inst )
+
+        # the transfers of a sync are logged ahead, so an interrupted one can be resumed
+        transfer_log = None
+        rel_paths = {}
+        if name in kabbes_s3synchrony.TransferLog.OPERATIONS:
+            transfer_log = self._get_transfer_log()
+        if transfer_log is not None:
+            rel_paths = dict( zip( [ Path_inst.path for Path_inst in Paths_list ], transfer_log.plan( name, Paths_list ) ) )
+
+        def finish( Path_inst, start, success ):
+            self.metrics.observe( name, time.perf_counter() - start, success )
+            if success and transfer_log is not None:
+                transfer_log.done( name, [ rel_paths[ Path_inst.path ] ] )
+
+        def function( Path_inst ):
+            start = time.perf_counter()
+            success = False
+            if transfer_log is not None:
+                transfer_log.start( name, rel_paths[ Path_inst.path ] )
+            try:
+                success = method( self, Path_inst )
+                return success
+            finally:
+                finish( Path_inst, start, success )
+
+        async_method = getattr( self, method.__name__ + '_async', None )
+        async def async_function( Path_inst ):
+            start = time.perf_counter()
+            success = False
+            if transfer_log is not None:
+                transfer_log.start( name, rel_paths[ Path_inst.path ] )
+            try:
+                success = await async_method( Path_inst )
+                return success
+            finally:
+                finish( Path_inst, start, success )
+
+        executor = self._get_transfer_executor()
+        results = executor.run(
+            function,
+            Paths_list,
+            description = name.replace('_', ' '),
+            async_function = async_function if async_method is not None else None
+        )
+        self.metrics.add_bytes( name, executor.n_bytes )
+        self.metrics.add_wall_seconds( name, executor.get_seconds() )
 
-        for Path_inst in Paths_inst: 
-            if method( self, Path_inst ):
+        successful_Paths = self.PATHS_CLASS()
+        for Path_inst, success in zip( Paths_list, results ):
+            if success:
                 successful_Paths._add( Path_inst )
 
         return successful_Paths
@@ -42,36 +98,72 @@ class BasePlatform( ParentClass ):
     columns = [_file_colname, _editor_colname, _time_colname, _hash_colname]
     dttm_format = "%Y-%m-%d %H:%M:%S"
 
+    ### These should be defined by the Child Platform if it supports conditional writes, which journal mode needs
+    # _upload_bytes_if( data, rPath, if_match = None ): write bytes to rPath only if its version is still if_match, or if it
+    #     does not exist when if_match is None. Returns the new version, None when the condition failed
+    # _download_bytes_if_exists( rPath ): return the contents of rPath and its version, ( None, None ) if it does not exist
+    _upload_bytes_if = None
+    _download_bytes_if_exists = None
 
-    def __init__(self, Connection, **kwargs ):
-        """Initialize necessary instance variables."""
 
-        ParentClass.__init__( self )
+    def __init__(self, Connection, node_name = None, **kwargs ):
+        """Initialize necessary instance variables.
+        node_name is the node of platforms to sync with, by default the one platform names"""
 
-        ###
-        self.UTIL_DIR = '.' + self.NAME.upper() #.S3
+        ParentClass.__init__( self )
 
         ### set cfg
         self.Connection = Connection
-        self.cfg = self.Connection.cfg[ self.Connection.platform_node_name ]
+        self.node_name = node_name
+        if self.node_name is None:
+            self.node_name = self.Connection.node_names[0]
+        self.cfg = self.Connection.cfg[ 'platforms.' + self.node_name ]
+
+        if self.Connection.cfg['journal'] and not self.supports_conditional_writes():
+            raise ValueError( 'journal needs conditional writes, which the ' + self.NAME + ' platform does not support' )
+
+        ### the remote util dir is named after the platform, the local one after the node, so several remotes can share the data dir
+        self.UTIL_DIR = '.' + self.NAME.upper() #.S3
+        self.LOCAL_UTIL_DIR = '.' + self.node_name.upper()
 
         ###
         self.data_lDir = do.Dir( self.Connection.cfg.parent['cwd.Dir'].join( self.Connection.cfg['local_data_rel_dir'] ) )
 
+        ### Manifest format of the versions and deleted records
+        manifest_name = self.Connection.cfg['manifest']
+        if manifest_name is None:
+            manifest_name = 'csv'
+        self.Manifest = kabbes_s3synchrony.get_manifest( manifest_name ).Manifest( self )
+
         #lDir is a local Dir, rDir is a remote dir
-        self._util_lDir =  do.Dir( self.data_lDir.join(  self.UTIL_DIR ) )
+        self._util_lDir =  do.Dir( self.data_lDir.join(  self.LOCAL_UTIL_DIR ) )
 
-        self._remote_versions_lPath = do.Path( self._util_lDir.join( 'versions_remote.csv' ) )
-        self._local_versions_lPath =  do.Path( self._util_lDir.join( 'versions_local.csv' ) )
+        self._remote_versions_lPath = do.Path( self._util_lDir.join( self.Manifest.get_filename( 'versions_remote' ) ) )
+        self._local_versions_lPath =  do.Path( self._util_lDir.join( self.Manifest.get_filename( 'versions_local' ) ) )
 
-        self._remote_delete_lPath = do.Path( self._util_lDir.join( 'deleted_remote.csv' ) )
-        self._local_delete_lPath = do.Path( self._util_lDir.join( 'deleted_local.csv' ) )
+        self._remote_delete_lPath = do.Path( self._util_lDir.join( self.Manifest.get_filename( 'deleted_remote' ) ) )
+        self._local_delete_lPath = do.Path( self._util_lDir.join( self.Manifest.get_filename( 'deleted_local' ) ) )
 
         self._tmp_lDir = do.Dir( self._util_lDir.join('tmp') )
         self._logs_lDir = do.Dir( self._util_lDir.join('logs') )
         self._ignore_lPath = do.Path( self._util_lDir.join( 'ignore_remote.txt' ) )
-
-        self._ignore = []
+        self._hash_cache_lPath = do.Path( self._util_lDir.join( 'hash_cache.json' ) )
+        self._metrics_lPath = do.Path( self._logs_lDir.join( 'metrics.jsonl' ) )
+
+        self._ignore = kabbes_s3synchrony.Ignore()
+        self._scope = None
+        if self.Connection.cfg['scope']:
+            self._scope = kabbes_s3synchrony.Scope( self.Connection.cfg['scope'] )
+        self._hash_cache = None
+        self._transfer_executor = None
+        self._bandwidth = None
+        self._shared_reads = None
+        self._delta_store = None
+        self._blob_store = None
+        self._journal = None
+        self._transfer_log = None
+        self.snapshot = None
+        self.metrics = kabbes_s3synchrony.Metrics()
         self._reset_approved = False
 
         ### These should be defined by the Child Platform
@@ -136,17 +228,19 @@ class BasePlatform( ParentClass ):
             self._initialize_util_rDir()
             print("Done")
 
-        has_local_lPaths =  self._local_versions_lPath.exists() and self._local_delete_lPath.exists()
-        has_remote_lPaths = self._remote_versions_lPath.exists() and self._remote_delete_lPath.exists()
+        has_local_lPaths =  self.Manifest.exists( self._local_versions_lPath ) and self.Manifest.exists( self._local_delete_lPath )
+        has_remote_lPaths = self.Manifest.exists( self._remote_versions_lPath ) and self.Manifest.exists( self._remote_delete_lPath )
 
         if(not has_local_lPaths or not has_remote_lPaths):
             print( "Your data folder has not been initialized for S3 Synchrony - Downloading from S3..." )
 
-            self._util_rDir.download( Destination = self._util_lDir, override = True )
+            # only the records, the util dir also holds the deleted files and any chunks
+            self._download_manifest( self._remote_versions_rPath, self._remote_versions_lPath )
+            self._download_manifest( self._remote_delete_rPath, self._remote_delete_lPath )
 
             empty = pd.DataFrame( columns=self.columns )
-            empty.to_csv( self._local_delete_lPath.path,      index=False)
-            empty.to_csv( self._local_versions_lPath.path ,   index=False)
+            self.Manifest.write( empty, self._local_delete_lPath )
+            self.Manifest.write( empty, self._local_versions_lPath )
 
         if not self._tmp_lDir.exists():
             self._tmp_lDir.create( override = True )
@@ -155,7 +249,7 @@ class BasePlatform( ParentClass ):
         if not self._ignore_lPath.exists():
             self._ignore_lPath.create( override = True )
 
-        self._ignore = self._ignore_lPath.read().strip().split( '\n' ) #list of lines
+        self._ignore = kabbes_s3synchrony.Ignore( self._ignore_lPath.read().split( '\n' ) )
 
 
     def _initialize_util_rDir( self ):
@@ -165,66 +259,252 @@ class BasePlatform( ParentClass ):
         randhex = self._get_randomized_dirname() 
         download_lDir = self._tmp_lDir.join_Dir( path = randhex )
 
-        self._tmp_lDir.create( override = True )
+        if not self._tmp_lDir.exists():
+            self._tmp_lDir.create( override = True )
         download_lDir.create( override = True )
 
-        self.data_rDir.download( Destination = download_lDir, override = True )
+        # Prefer describing the remote files from a listing, only download them when the platform can't
+        df_versions = self._list_remote_versions()
+        if df_versions is None:
+            self.data_rDir.download( Destination = download_lDir, override = True )
+            df_versions = self._compute_directory( download_lDir, False )
 
         # Upload versions
-        df_versions = self._compute_directory( download_lDir, False )
         temp_remote_versions_lPath = download_lDir.join_Path( path = self._remote_versions_lPath.filename )
-        df_versions.to_csv( temp_remote_versions_lPath.path, index = False )
+        self.Manifest.write( df_versions, temp_remote_versions_lPath )
         self._remote_versions_rPath.upload( Destination = temp_remote_versions_lPath, override = True )        
 
         # Upload deleted
         df_empty = pd.DataFrame( columns=self.columns )
         temp_remote_delete_lPath = download_lDir.join_Path( path = self._remote_delete_lPath.filename )
-        df_empty.to_csv( temp_remote_delete_lPath.path , index=False)
+        self.Manifest.write( df_empty, temp_remote_delete_lPath )
         self._remote_delete_rPath.upload( Destination = temp_remote_delete_lPath, override = True )        
 
-    def synchronize(self):
-        """Prompt the user to synchronize all local files with remote files"""
-
-        self._remote_versions_rPath.download( Destination = self._remote_versions_lPath, override = True, overwrite = True )
-        self._remote_delete_rPath.download( Destination = self._remote_delete_lPath, override = True, overwrite = True )
-
-        self._push_deleted_remote()
-        self._pull_deleted_local()
-
-        self._push_new_remote()
-        self._pull_new_local()
-
-        self._push_modified_remote()
-        self._pull_modified_local()
-
-        self._revert_modified_remote()
-        self._revert_modified_local()
-
-        self._remote_versions_rPath.upload( Destination = self._remote_versions_lPath, override = True )
-        self._remote_delete_rPath.upload( Destination = self._remote_delete_lPath, override = True )
+        download_lDir.remove( override = True )
+
+    def _list_remote_versions( self ):
+        """Return a versions dataframe of the remote data dir built without downloading it.
+        Should be defined by the Child Platform, None means the platform can't list."""
+        return None
+
+    def synchronize(self, changed_rel_paths = None, mine = None):
+        """Prompt the user to synchronize all local files with remote files.
+        Given changed_rel_paths, only those local files and folders are revisited instead of the whole data dir.
+        Given mine, the versions of the data dir a FanOut computed once for every remote, the data dir is not walked,
+        and the metrics and local fingerprint are the ones it started"""
+
+        self._blob_store = None # blobs others uploaded since the last synchronize
+        if mine is None:
+            self._local_fingerprint = None
+            self.metrics = kabbes_s3synchrony.Metrics()
+
+        transfer_log = self._get_transfer_log()
+        if transfer_log is not None:
+            transfer_log.load()
+
+        executor = self._get_transfer_executor()
+        if executor.concurrency is not None:
+            executor.concurrency.reset_stats()
+        if self._get_bandwidth() is not None:
+            self._get_bandwidth().wait_seconds = 0.0
+
+        stream = None
+        if mine is None:
+            stream = self._get_stream( changed_rel_paths )
+        if stream is not None:
+            stream.synchronize()
+            self._print_transfer_report()
+            self._write_metrics()
+            return
+
+        with self.metrics.phase( 'download_manifests' ):
+            journal = self._get_journal()
+            if journal is None:
+                self._download_manifest( self._remote_versions_rPath, self._remote_versions_lPath )
+                self._download_manifest( self._remote_delete_rPath, self._remote_delete_lPath )
+            else:
+                journal.load()
+
+            delta_store = self._get_delta_store()
+            if delta_store is not None:
+                delta_store.load()
+
+        if changed_rel_paths is not None:
+            mine = self._update_directory( self._read_manifest( self._local_versions_lPath ), changed_rel_paths )
+
+        # Walk the data dir and read the versions once, each phase updates the snapshot as it goes
+        self.snapshot = kabbes_s3synchrony.Snapshot( self, mine = mine )
+        self.metrics.add( 'files_local', len( self.snapshot.mine ) )
+        self.metrics.add( 'files_remote', len( self.snapshot.other ) )
+        nothing_to_do = self._resume_transfers() == 0 and self.snapshot.get_diff().is_empty()
+
+        self._run_phases()
+
+        with self.metrics.phase( 'upload_manifests' ):
+
+            # the chunk index goes up before the versions that point into it
+            if delta_store is not None:
+                if self.Connection.cfg['delta_gc'] and self._scope is None: # chunks of files outside the scope look unused
+                    delta_store.collect_garbage( self.snapshot.get_remote_checksums() )
+                delta_store.save()
+
+            # in journal mode only the rows this sync changed go up, after anyone who appended first
+            if journal is None:
+                self.snapshot.save_remote()
+                self._remote_versions_rPath.upload( Destination = self._remote_versions_lPath, override = True )
+                self._remote_delete_rPath.upload( Destination = self._remote_delete_lPath, override = True )
+            else:
+                journal.commit( self.snapshot.other, self.snapshot.deleted_remote, scope = self._scope )
 
         # Save a snapshot of our current files into versionsLocal for next time
-        self._compute_directory( self.data_lDir ).to_csv( self._local_versions_lPath.path, index=False )
+        with self.metrics.phase( 'save_local' ):
+            self.snapshot.save_local()
+            if transfer_log is not None:
+                transfer_log.clear( scope = self._scope )
+
+        # the next run can stop early if neither side changes until then
+        # a scoped sync only saw part of the data dir, so it can only tell that the last fingerprint is stale
+        fingerprint = kabbes_s3synchrony.Fingerprint( self.Connection, self.node_name )
+        if self._scope is not None:
+            if not nothing_to_do:
+                fingerprint.remove()
+        elif nothing_to_do and self._local_fingerprint is not None:
+            if journal is None:
+                fingerprint.save( self._local_fingerprint, [ self._remote_versions_rPath.path, self._remote_delete_rPath.path ] )
+            else:
+                fingerprint.save( self._local_fingerprint, journal.get_fingerprint_paths() )
+        else:
+            fingerprint.remove()
+
+        self._print_transfer_report()
+        self._write_metrics()
+
+    def _run_phases( self ):
+        """Delete, upload and download everything the diff of the snapshot calls for, one kind at a time."""
+
+        for phase in [ self._push_deleted_remote, self._pull_deleted_local,
+                       self._push_new_remote, self._pull_new_local,
+                       self._push_modified_remote, self._pull_modified_local,
+                       self._revert_modified_remote, self._revert_modified_local ]:
+            with self.metrics.phase( phase.__name__.strip('_') ):
+                phase()
+
+    def _resume_transfers( self ):
+        """Record in the snapshot the transfers an interrupted sync finished, returning how many there were."""
+
+        transfer_log = self._get_transfer_log()
+        if transfer_log is None:
+            return 0
+
+        n_files = transfer_log.replay( self.snapshot )
+        if n_files > 0:
+            print ( 'Resuming an interrupted sync, ' + str( n_files ) + ' files were already transferred' )
+            self.metrics.add( 'files_resumed', n_files )
+
+        return n_files
+
+    def _print_transfer_report( self ):
+        """Print the effective throughput of each kind of transfer this synchronization made and what held them back,
+        adding the counts of the concurrency limit and bandwidth caps to the metrics."""
+
+        lines = []
+        for name, operation in self.metrics.operations.items():
+            if operation['bytes'] > 0 and operation.get( 'wall_seconds', 0 ) > 0:
+                lines.append( '{}: {} files, {:.1f} MB in {:.1f}s, {:.2f} MB/s'.format( name.replace( '_', ' ' ), operation['calls'] - operation['failed'],
+                              operation['bytes'] / 1024**2, operation['wall_seconds'], operation['bytes'] / 1024**2 / operation['wall_seconds'] ) )
+
+        concurrency = self._transfer_executor.concurrency if self._transfer_executor is not None else None
+        bandwidth = self._get_bandwidth()
+        if bandwidth is not None and bandwidth.wait_seconds > 0:
+            self.metrics.add( 'bandwidth_wait_seconds', round( bandwidth.wait_seconds, 6 ) )
+        if concurrency is not None:
+            self.metrics.add( 'latency_spikes', concurrency.n_latency_spikes )
+            self.metrics.add( 'concurrency_decreases', concurrency.n_decreases )
+
+        counts = self.metrics.counts
+        held_back = [ '{} {}'.format( counts[ key ], label ) for key, label in [
+            ( 'throttle_events', 'throttle events' ), ( 'transfer_errors', 'errors' ), ( 'latency_spikes', 'latency spikes' ),
+            ( 'retries', 'client retries' ), ( 'transfer_retries', 'transfer retries' ) ] if counts.get( key ) ]
+        if counts.get( 'bandwidth_wait_seconds' ):
+            held_back.append( 'transfers held back {:.1f}s in total by bandwidth caps'.format( counts['bandwidth_wait_seconds'] ) )
+        if concurrency is not None and concurrency.lowest != concurrency.highest:
+            held_back.append( 'concurrency {}-{}, now {}'.format( concurrency.lowest, concurrency.highest, int( concurrency.limit ) ) )
+
+        if len( lines ) == 0 and len( held_back ) == 0:
+            return
+
+        print ( 'Transfers:' )
+        for line in lines:
+            print ( '  ' + line )
+        if len( held_back ) > 0:
+            print ( '  ' + ', '.join( held_back ) )
+
+    def _write_metrics( self ):
+        """Append the metrics of this synchronization to the logs dir and pass them to the metrics_hook."""
+
+        fields = {}
+        if self._transfer_executor is not None and self._transfer_executor.concurrency is not None:
+            concurrency = self._transfer_executor.concurrency
+            fields['concurrency'] = { 'lowest': concurrency.lowest, 'highest': concurrency.highest, 'limit': int( concurrency.limit ) }
+
+        record = self.metrics.get_record(
+            user = self.Connection.cfg['_name'],
+            platform = self.NAME,
+            remote = str( self.data_rDir ),
+            data_dir = self.data_lDir.path,
+            **fields
+        )
+
+        if self.Connection.cfg['metrics'] is not False:
+            if not self._logs_lDir.exists():
+                self._logs_lDir.create( override = True )
+            self.metrics.write( self._metrics_lPath.path, record )
+
+        # "package.module:function", called with the record; a broken hook must not fail the sync
+        hook = self.Connection.cfg['metrics_hook']
+        if hook:
+            try:
+                module_name, function_name = hook.split( ':' )
+                getattr( importlib.import_module( module_name ), function_name )( record )
+            except Exception as e:
+                print ( 'WARNING: metrics_hook ' + str( hook ) + ' failed - ' + repr( e ) )
+
+    def _read_manifest( self, lPath ):
+        """Read a manifest, only the rows within the scope when the sync is scoped."""
+
+        if self._scope is None:
+            return self.Manifest.read( lPath )
+        return self.Manifest.read_scope( lPath, self._scope )
+
+    def _write_manifest( self, df, lPath ):
+        """Write a manifest, only replacing the rows within the scope when the sync is scoped."""
+
+        if self._scope is None:
+            return self.Manifest.write( df, lPath )
+        return self.Manifest.replace_scope( df, lPath, self._scope )
+
+    def _download_manifest( self, rPath, lPath ):
+        """Download a remote manifest, falling back to the legacy csv it will be migrated from."""
+
+        if rPath.exists() or self.Manifest.EXTENSION == self.Manifest.LEGACY_EXTENSION:
+            return rPath.download( Destination = lPath, override = True, overwrite = True )
+
+        legacy_filename = os.path.basename( self.Manifest.get_legacy_path( rPath.path ) )
+        legacy_rPath = rPath.ascend().join_Path( path = legacy_filename )
+        legacy_lPath = lPath.ascend().join_Path( path = legacy_filename )
+
+        if os.path.exists( lPath.path ):
+            os.remove( lPath.path )
+        return legacy_rPath.download( Destination = legacy_lPath, override = True, overwrite = True )
 
     def _push_deleted_remote(self):
 
         """Remove remote files that were deleted locally."""
-        mine, other, mod_mine, mod_other = self._compute_dfs( self.data_lDir )
-
-        # Load in what files we had last time, and what files we have deleted in the past
-        oldmine = pd.read_csv(self._local_versions_lPath.path)
-        deletedlocal = pd.read_csv(self._local_delete_lPath.path)
-        # Combine a list of files we have deleted and files we have had in the past, remove any duplicates
-        deletedlocal = pd.concat([oldmine, deletedlocal])
-        deletedlocal = deletedlocal.drop_duplicates(
-            [self._file_colname], keep="last")
-        # From previous files + deleted files select only the ones that AREN'T in our local system but ARE on AWS
-        deletedlocal = deletedlocal[~deletedlocal[self._file_colname].isin(
-            mine[self._file_colname])]
-        deletedlocal = other[other[self._file_colname].isin(
-            deletedlocal[self._file_colname])]
+        diff = self.snapshot.get_diff()
 
-        deletedlocal.to_csv(self._local_delete_lPath.path, index=False)
+        # From previous files + deleted files select only the ones that AREN'T in our local system but ARE on AWS
+        deletedlocal = diff.deleted_local
+        self.snapshot.deleted_local = deletedlocal
 
         if(len(deletedlocal) > 0):
             print("UPLOAD: Would you like to delete these files on S3 that were deleted locally?:")
@@ -242,33 +522,23 @@ class BasePlatform( ParentClass ):
             selected_deleted_Paths = self._apply_selected_indices( self._delete_from_remote, to_delete_Paths )
             deleted_rel_paths = selected_deleted_Paths.get_rels( self.data_rDir ).export_strings()
 
-            deleteds3 = pd.read_csv( self._remote_delete_lPath.path )
-            newdeleted = other.loc[other[self._file_colname].isin(deleted_rel_paths)]
-            deleteds3 = pd.concat([deleteds3, newdeleted])
-            deleteds3.to_csv( self._remote_delete_lPath.path )
-
-            # Replace any removed file names with N/A and then drop if they have been deleted
-            other[self._file_colname] = other[self._file_colname].where(
-                ~other[self._file_colname].isin( deleted_rel_paths ))
-            other = other.dropna()
-            other.to_csv(self._remote_versions_lPath.path, index=False)
+            # Move the deleted files from the remote versions into the remote deleted record
+            self.snapshot.record_deleted_remote( deleted_rel_paths )
             print("Done.\n")
   
     def _pull_deleted_local(self):
         """Remove files from local system that were deleted on S3."""
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
+        diff = self.snapshot.get_diff()
 
-        # Load in files deleted from S3, and select only those that ARE on our local system and AREN'T on AWS
-        deleted_remote = pd.read_csv(self._remote_delete_lPath.path)
-        deleted_remote = deleted_remote[deleted_remote[self._file_colname].isin(
-            mine[self._file_colname])]
-        deleted_remote = deleted_remote[~deleted_remote[self._file_colname].isin(
-            other[self._file_colname])]
+        # Files deleted from S3 that ARE on our local system and AREN'T on AWS
+        deleted_remote = diff.deleted_remote
 
         if(len(deleted_remote) > 0):
             print("DOWNLOAD: Would you like to delete these files from your computer that were deleted on S3?:")
             print("('file name' / 'Date last modified locally')\n")
 
+            local_times = diff.mine.set_index( self._file_colname )[ self._time_colname ]
+
             to_delete_Paths = do.Paths()
             index = 1
             for i, row in deleted_remote.iterrows():
@@ -276,22 +546,20 @@ class BasePlatform( ParentClass ):
                 lPath = self.data_lDir.join_Path( path = row[self._file_colname] )
                 to_delete_Paths._add( lPath )
 
-                mask = row[self._file_colname] == mine[self._file_colname]
-                print(index, row[self._file_colname], '\t', mine.loc[mask][self._file_colname].iloc[0])
+                print(index, row[self._file_colname], '\t', local_times[ row[self._file_colname] ])
                 index += 1
 
             selected_deleted_Paths = self._apply_selected_indices(self._delete_from_local, to_delete_Paths)
+            self.snapshot.record_deleted_local( selected_deleted_Paths.get_rels( self.data_lDir ).export_strings() )
             print('Done.\n')
 
     def _push_new_remote(self):
         """Upload files to S3 that were created locally."""
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
+        diff = self.snapshot.get_diff()
 
         # Find files that are in our directory but not AWS, and load in files deleted from AWS
-        new_local = mine.loc[~mine[self._file_colname].isin(
-            other[self._file_colname])]
-        deletedfiles = pd.read_csv(self._remote_delete_lPath.path)[
-            self._file_colname].values.tolist()
+        new_local = diff.new_local
+        deletedfiles = set( self.snapshot.deleted_remote[self._file_colname] )
 
         if(len(new_local) > 0):
             print("UPLOAD: Would you like to upload these new files to S3 that were created locally?:")
@@ -313,22 +581,17 @@ class BasePlatform( ParentClass ):
             selected_added_Paths = self._apply_selected_indices(self._upload_to_remote, to_add_Paths)
             added_rel_paths = selected_added_Paths.get_rels( self.data_lDir ).export_strings()
 
-            added_to_s3 = mine.loc[mine[self._file_colname].isin(added_rel_paths)]
-            newversions = pd.concat([other, added_to_s3])
-
-            newversions.to_csv(self._remote_versions_lPath.path, index=False)
+            self.snapshot.record_uploaded( added_rel_paths )
             print("Done.\n")
 
 
     def _pull_new_local(self):
         """Download files from S3 that were created recently."""
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
+        diff = self.snapshot.get_diff()
 
         # Find files that are on S3 but not our local system and read in files we have deleted locally
-        news3 = other.loc[~other[self._file_colname].isin(
-            mine[self._file_colname])]
-        deletedfiles = pd.read_csv(self._local_delete_lPath.path)[
-            self._file_colname].values.tolist()
+        news3 = diff.new_remote
+        deletedfiles = set( self.snapshot.deleted_local[self._file_colname] )
 
         if(len(news3) > 0):
             print("DOWNLOAD: Would you like to download these new files that were created on S3?:")
@@ -349,142 +612,566 @@ class BasePlatform( ParentClass ):
                 index += 1
 
             selected_downloaded_Paths = self._apply_selected_indices(self._download_from_remote, to_download_Paths)
+            self.snapshot.record_downloaded( selected_downloaded_Paths.get_rels( self.data_rDir ).export_strings() )
             print("Done.\n")
 
     def _push_modified_remote(self):
         """Update files on S3 with modifications that were made locally more recently."""
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
+        diff = self.snapshot.get_diff()
 
-        if(len(mod_mine) > 0):
+        if(len(diff.mod_mine) > 0):
             print("UPLOAD: Would you like to update these files on S3 with your local changes?:")
             print("('file name' / 'Date last modified locally' / 'Date last modified on S3')\n")
-            self._push_sequence(mod_mine, mine, other)
+            self._push_sequence(diff.mod_mine)
 
     def _pull_modified_local(self):
         """Update local files with modifications that were made on S3 more recently."""
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
+        diff = self.snapshot.get_diff()
 
-        if(len(mod_other) > 0):
+        if(len(diff.mod_other) > 0):
             print("DOWNLOAD: Would you like to update these local files with the changes from S3?:")
             print("('file name' / 'Date last modified locally' / 'Date last modified on S3')\n")
-            self._pull_sequence(mod_other, other)
+            self._pull_sequence(diff.mod_other)
 
     def _revert_modified_remote(self):
 
         """Revert remote files with modifications that were made locally less recently."""
 
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
-        if(len(mod_other) > 0):
+        if self.Connection.cfg['auto_approve']: # never overwrite the newer version unattended
+            return
+
+        diff = self.snapshot.get_diff()
+        if(len(diff.mod_other) > 0):
             print( "UPLOAD: Would you like to revert these files on S3 back to your local versions?:")
             print( "('file name' / 'Date last modified locally' / 'Date last modified on S3')\n")
-            self._push_sequence(mod_other, mine, other)
+            self._push_sequence(diff.mod_other)
 
 
     def _revert_modified_local(self):
         """Revert local files with modifications that were made on S3 less recently."""
-        mine, other, mod_mine, mod_other = self._compute_dfs(self.data_lDir)
-        if(len(mod_mine) > 0):
+        if self.Connection.cfg['auto_approve']: # never overwrite the newer version unattended
+            return
+
+        diff = self.snapshot.get_diff()
+        if(len(diff.mod_mine) > 0):
             print("DOWNLOAD: Would you like to revert these local files back to the versions on S3?:")
             print("('file name' / 'Date last modified locally' / 'Date last modified on S3')\n")
-            self._pull_sequence(mod_mine, other)
+            self._pull_sequence(diff.mod_mine)
 
 
-    def _compute_dfs(self, lDir ):
-        """Return a list of dfs containing all the information for smart_sync."""
-        
-        mine = self._compute_directory( lDir )
-        other = pd.read_csv( self._remote_versions_lPath.path )
+    def _compute_directory(self, lDir, ignore_util=True):
+        """Create a dataframe describing all files in a local directory."""
 
-        mine = self._filter_ignore( mine )
-        other = self._filter_ignore( other )
+        folders_to_skip = self.Connection.get_util_dirs()
+        if not ignore_util:
+            folders_to_skip = []
 
-        inboth = mine[ mine[self._file_colname].isin( other[self._file_colname]) ]
+        # only the data dir is worth caching, temporary downloads are hashed once
+        # ignore_remote.txt is ours alone, the team's remote versions are never filtered by it
+        hash_cache = None
+        ignore = None
+        if lDir == self.data_lDir:
+            hash_cache = self._get_hash_cache()
+            ignore = self._ignore
+
+        # a scoped sync only walks its part of the data dir, and only knows the cache entries of that part are current
+        scope = None
+        if lDir == self.data_lDir:
+            scope = self._scope
+
+        with self.metrics.phase( 'walk' ):
+            scanner = kabbes_s3synchrony.Scanner( lDir.path, folders_to_skip = folders_to_skip, ignore = ignore, scope = scope ).scan()
+        df = self._compute_files( scanner.rel_paths, scanner.paths, scanner.stat_results, hash_cache )
+
+        if hash_cache is not None:
+            if scope is None:
+                hash_cache.evict()
+            hash_cache.save()
+
+            # like the hash cache, don't trust files that may still change within the same mtime tick
+            racy_ns = ( time.time() - kabbes_s3synchrony.HashCache.RACY_SECONDS ) * 1e9
+            if all( stat_result.st_mtime_ns < racy_ns for stat_result in scanner.stat_results ):
+                self._local_fingerprint = kabbes_s3synchrony.fingerprint_files( zip( scanner.rel_paths, scanner.stat_results ) )
 
-        mod_mine = []  # Files more recently modified Locally
-        mod_other = []  # Files more recently modified on S3
+        return df
 
-        for file in inboth[self._file_colname]:
-            mycs = inboth.loc[inboth[self._file_colname] == file][self._hash_colname].iloc[0]
-            othercs = other.loc[other[self._file_colname] == file][self._hash_colname].iloc[0]
+    def _update_directory( self, df_previous, changed_rel_paths ):
+        """Update a dataframe of the local data directory by only revisiting the changed files and folders."""
+
+        changed_rel_paths = set( changed_rel_paths )
+        prefixes = tuple( rel_path + '/' for rel_path in changed_rel_paths )
 
-            if(mycs != othercs): # users have pushed conflicting file check sums
+        files = df_previous[ self._file_colname ].astype( str )
+        df_unchanged = df_previous.loc[ ~( files.isin( changed_rel_paths ) | files.str.startswith( prefixes ) ) ]
 
-                datemine = dt.datetime.strptime(
-                    mine.loc[mine[self._file_colname] == file][self._time_colname].iloc[0], self.dttm_format)
-                dateother = dt.datetime.strptime(
-                    other.loc[other[self._file_colname] == file][self._time_colname].iloc[0], self.dttm_format)
-                if(datemine > dateother):
-                    mod_mine.append([file, datemine, dateother])
-                else:
-                    mod_other.append([file, datemine, dateother])
+        found = {} # rel_path: ( path, stat_result ), a folder and a file inside it may both have changed
+        with self.metrics.phase( 'walk' ):
+            for rel_path in changed_rel_paths:
 
-        return (mine, other, mod_mine, mod_other)
+                path = self.data_lDir.join( rel_path )
+                try:
+                    if os.path.isdir( path ):
+                        if self._ignore.is_dir_ignored( rel_path ):
+                            continue
+                        for sub_rel_path, sub_path, stat_result in kabbes_s3synchrony.iter_files( path, folders_to_skip = self.Connection.get_util_dirs(), ignore = self._ignore, rel_dir = rel_path ):
+                            if self._scope is None or self._scope.contains( sub_rel_path ):
+                                found[ sub_rel_path ] = ( sub_path, stat_result )
+                    elif os.path.isfile( path ) and not self._ignore.is_ignored( rel_path ) and ( self._scope is None or self._scope.contains( rel_path ) ):
+                        found[ rel_path ] = ( path, os.stat( path ) )
+                except FileNotFoundError: # removed again since the change
+                    continue
 
-    def _compute_directory(self, lDir, ignore_util=True):
-        """Create a dataframe describing all files in a local directory."""
+        rel_paths = sorted( found )
+        hash_cache = self._get_hash_cache()
+        for rel_path in df_previous.loc[ ~df_previous.index.isin( df_unchanged.index ), self._file_colname ]:
+            if rel_path not in found:
+                hash_cache.discard( rel_path )
 
-        df = pd.DataFrame(columns=self.columns)
+        df_changed = self._compute_files( rel_paths, [ found[r][0] for r in rel_paths ], [ found[r][1] for r in rel_paths ], hash_cache )
+        hash_cache.save()
 
-        folders_to_skip = [ self.UTIL_DIR ]
-        if not ignore_util:
-            folders_to_skip = []
+        return pd.concat( [ df_unchanged, df_changed ], ignore_index = True )
 
-        Paths_inst = lDir.walk_contents_Paths( block_dirs=True, block_paths=False, folders_to_skip = folders_to_skip )
+    def _compute_files( self, rel_paths, paths, stat_results, hash_cache ):
+        """Create a dataframe describing the given files, hashing the ones the cache cannot answer for."""
 
-        for Path_inst in Paths_inst:
+        checksums = [ None ] * len(rel_paths)
+        if hash_cache is not None:
+            for i in range(len(rel_paths)):
+                checksums[i] = hash_cache.get( rel_paths[i], stat_results[i] )
 
-            df_new = pd.DataFrame( columns = self.columns )
-            df_new[ self._file_colname ] = [Path_inst.get_rel( lDir ).path  ]
-            df_new[ self._time_colname ] = Path_inst.get_mtime().strftime( self.dttm_format )
-            df_new[ self._hash_colname ] = self._hash( Path_inst.path )
-            df_new[ self._editor_colname ] = self.Connection.cfg['_name']
+        # hash everything the cache could not answer for in one batch
+        to_hash = [ i for i in range(len(rel_paths)) if checksums[i] is None ]
 
-            df = pd.concat([df, df_new], ignore_index=True)
+        hasher = self._get_hasher()
+        with self.metrics.phase( 'hash' ):
+            for i, checksum in zip( to_hash, hasher.hash_paths( [ paths[i] for i in to_hash ] ) ):
+                checksums[i] = checksum
+                if checksum is None: # removed since the walk
+                    continue
 
-        return df
+                # only remember the checksum if the file did not change underneath us
+                try:
+                    stat_result = os.stat( paths[i] )
+                except FileNotFoundError:
+                    checksums[i] = None
+                    continue
+                if hash_cache is not None and hash_cache.stat_key( stat_result ) == hash_cache.stat_key( stat_results[i] ):
+                    hash_cache.set( rel_paths[i], stat_results[i], checksum )
+
+        hasher.print_throughput()
+        self.metrics.add( 'files_hashed', hasher.n_files )
+        self.metrics.add( 'bytes_hashed', hasher.n_bytes )
+        self.metrics.add( 'files_cached', len( rel_paths ) - len( to_hash ) )
+
+        # a file removed between the walk and the hash is left out, as if the walk had not found it
+        kept = [ i for i in range(len(rel_paths)) if checksums[i] is not None ]
+
+        return pd.DataFrame( {
+            self._file_colname: [ rel_paths[i] for i in kept ],
+            self._editor_colname: self.Connection.cfg['_name'],
+            self._time_colname: [ dt.datetime.fromtimestamp( stat_results[i].st_mtime ).strftime( self.dttm_format ) for i in kept ],
+            self._hash_colname: [ checksums[i] for i in kept ]
+        }, columns = self.columns )
+
+    def _get_hash_cache( self ):
+        """Load the persistent checksum cache for the local data directory."""
+
+        if self._hash_cache is None:
+            self._hash_cache = kabbes_s3synchrony.HashCache( self._hash_cache_lPath, rehash = bool( self.Connection.cfg['rehash'] ) )
+
+        return self._hash_cache
+
+    def _get_delta_store( self ):
+        """Return the chunk store used for large files in delta mode, or None when delta mode is off."""
+
+        if not self.Connection.cfg['delta']:
+            return None
+
+        if self._delta_store is None:
+
+            kwargs = {}
+            if self.Connection.cfg['delta_min_file_size_mb'] is not None:
+                kwargs['min_file_size'] = int( float( self.Connection.cfg['delta_min_file_size_mb'] ) * 1024**2 )
+            if self.Connection.cfg['delta_chunk_size_mb'] is not None:
+                kwargs['avg_chunk_size'] = int( float( self.Connection.cfg['delta_chunk_size_mb'] ) * 1024**2 )
+
+            self._delta_store = kabbes_s3synchrony.DeltaStore( self, **kwargs )
+
+        return self._delta_store
+
+    def supports_conditional_writes( self ):
+        """Return whether the Child Platform defines the conditional writes journal mode needs."""
+        return self._upload_bytes_if is not None and self._download_bytes_if_exists is not None
+
+    def _get_journal( self ):
+        """Return the journal the remote records are kept in, or None when journal mode is off."""
+
+        if not self.Connection.cfg['journal']:
+            return None
+
+        if self._journal is None:
+
+            kwargs = {}
+            if self.Connection.cfg['journal_compact_every'] is not None:
+                kwargs['compact_every'] = int( self.Connection.cfg['journal_compact_every'] )
+
+            self._journal = kabbes_s3synchrony.Journal( self, **kwargs )
+
+        return self._journal
+
+    def _get_transfer_log( self ):
+        """Return the log that makes an interrupted sync resumable, or None when resume is off."""
+
+        if self.Connection.cfg['resume'] is False:
+            return None
+
+        if self._transfer_log is None:
+            self._transfer_log = kabbes_s3synchrony.TransferLog( self )
+
+        return self._transfer_log
+
+    def _get_stream( self, changed_rel_paths = None ):
+        """Return a Stream to synchronize chunk by chunk with, or None to hold the whole snapshot in memory."""
+
+        if not self.Connection.cfg['streaming'] or changed_rel_paths is not None or self._scope is not None:
+            return None
+
+        # chunks and blobs are looked up across the whole tree, and the journal diffs the whole records
+        unsupported = [ key for key in [ 'delta', 'content_addressed', 'journal' ] if self.Connection.cfg[ key ] ]
+        if len( unsupported ) > 0:
+            print ( 'WARNING: streaming is not supported with ' + ', '.join( unsupported ) + ', syncing in memory' )
+            return None
+
+        kwargs = {}
+        if self.Connection.cfg['stream_chunk_size'] is not None:
+            kwargs['chunk_size'] = int( self.Connection.cfg['stream_chunk_size'] )
+
+        return kabbes_s3synchrony.Stream( self, **kwargs )
+
+    def _get_blob_store( self ):
+        """Return the content-addressed store of data files, or None when content_addressed is off."""
+
+        if not self.Connection.cfg['content_addressed']:
+            return None
+
+        if self._blob_store is None:
+            self._blob_store = kabbes_s3synchrony.BlobStore( self )
+
+        return self._blob_store
+
+    def _get_hasher( self ):
+        """Return a fresh Hasher configured from the Connection cfg."""
+
+        kwargs = {}
+        if self.Connection.cfg['hash_workers'] is not None:
+            kwargs['workers'] = int( self.Connection.cfg['hash_workers'] )
+        if self.Connection.cfg['hash_executor'] is not None:
+            kwargs['executor'] = self.Connection.cfg['hash_executor']
+
+        return kabbes_s3synchrony.Hasher( **kwargs )
 
     def _filter_ignore(self, df ):
         """Remove all files that should be ignored as requested by the user."""
 
-        return df.loc[ ~df[self._file_colname].isin( self._ignore ) ]      
+        if len( self._ignore ) == 0:
+            return df
+        return df.loc[ ~df[self._file_colname].map( self._ignore.is_ignored ).astype( bool ) ]
 
     @data_function
     def _upload_to_remote( self, lPath ):
 
         rel_lPath = lPath.get_rel( self.data_lDir )
         rPath = self.data_rDir.join_Path( Path = rel_lPath )
-        
-        return rPath.upload( Destination = lPath, override = True, print_off = True )
+
+        delta_store = self._get_delta_store()
+        blob_store = self._get_blob_store()
+
+        if delta_store is not None and delta_store.should_chunk( lPath ):
+            success = delta_store.upload( lPath, rPath, self._get_checksum( lPath ) )
+
+        elif blob_store is not None:
+            success = blob_store.upload( lPath, self._get_checksum( lPath ) )
+
+            # the path held the previous version, which is stale now that the path maps to a blob
+            if success and self.snapshot.get_remote_checksum( rel_lPath.path ) is not None:
+                rPath.remove( override = True, print_off = True )
+
+        else:
+            success = self._upload_Path( lPath, rPath )
+
+        if success:
+            self._transfer_executor.add_bytes( os.path.getsize( lPath.path ) )
+            return True
+        return False
 
     @data_function
     def _download_from_remote(self, rPath):
 
         rel_rPath = rPath.get_rel( self.data_rDir )
         lPath = self.data_lDir.join_Path( Path = rel_rPath )
-        
-        return rPath.download( Destination = lPath, override = True, print_off = True )
+
+        delta_store = self._get_delta_store()
+        blob_store = self._get_blob_store()
+        checksum = self.snapshot.get_remote_checksum( rel_rPath.path )
+
+        if delta_store is not None and delta_store.has( checksum ):
+            success = delta_store.download( rPath, lPath, checksum )
+
+        elif blob_store is not None and blob_store.has( checksum ):
+            success = blob_store.download( lPath, checksum, source_path = self.snapshot.get_local_path( checksum ) )
+
+        else:
+            success = self._download_Path( rPath, lPath )
+
+        if success:
+            self._transfer_executor.add_bytes( os.path.getsize( lPath.path ) )
+            return True
+        return False
+
+    async def _upload_to_remote_async( self, lPath ):
+
+        # chunked and content-addressed uploads take the blocking route
+        if self._get_delta_store() is not None or self._get_blob_store() is not None:
+            return await self._transfer_executor.run_in_thread( self._upload_to_remote.__wrapped__, self, lPath )
+
+        rPath = self.data_rDir.join_Path( Path = lPath.get_rel( self.data_lDir ) )
+        if await self._upload_Path_async( lPath, rPath ):
+            self._transfer_executor.add_bytes( os.path.getsize( lPath.path ) )
+            return True
+        return False
+
+    async def _download_from_remote_async( self, rPath ):
+
+        if self._get_delta_store() is not None or self._get_blob_store() is not None:
+            return await self._transfer_executor.run_in_thread( self._download_from_remote.__wrapped__, self, rPath )
+
+        lPath = self.data_lDir.join_Path( Path = rPath.get_rel( self.data_rDir ) )
+        if await self._download_Path_async( rPath, lPath ):
+            self._transfer_executor.add_bytes( os.path.getsize( lPath.path ) )
+            return True
+        return False
+
+    async def _upload_Path_async( self, lPath, rPath ):
+        """Coroutine version of _upload_Path, can be overwritten by the Child Platform."""
+        return await self._transfer_executor.run_in_thread( self._upload_Path, lPath, rPath )
+
+    async def _download_Path_async( self, rPath, lPath ):
+        """Coroutine version of _download_Path, can be overwritten by the Child Platform."""
+        return await self._transfer_executor.run_in_thread( self._download_Path, rPath, lPath )
+
+    def _upload_Path( self, lPath, rPath ):
+        """Upload a single local file to rPath, can be overwritten by the Child Platform."""
+
+        bandwidth = self._get_bandwidth()
+        if bandwidth is not None:
+            bandwidth.consume( 'upload', os.path.getsize( lPath.path ) )
+        return rPath.upload( Destination = lPath, override = True, print_off = True )
+
+    def _download_Path( self, rPath, lPath ):
+        """Download a single remote file to lPath, can be overwritten by the Child Platform.
+        The file is written to the tmp dir and renamed into place, so it is never left half written"""
+
+        os.makedirs( lPath.ascend().path, exist_ok = True )
+        tmp_path = self._make_tmp_path()
+        try:
+            success = rPath.download( Destination = do.Path( tmp_path ), override = True, overwrite = True, print_off = True )
+            if success:
+                os.replace( tmp_path, lPath.path )
+
+                # paid for after the fact, as the download could not be held back while it ran
+                bandwidth = self._get_bandwidth()
+                if bandwidth is not None:
+                    bandwidth.consume( 'download', os.path.getsize( lPath.path ) )
+            return success
+        finally:
+            if os.path.exists( tmp_path ):
+                os.remove( tmp_path )
+
+    def _make_tmp_path( self ):
+        """Return the path of a new empty file in the tmp dir for a download in progress, removed by the next sync if left behind."""
+
+        fd, tmp_path = tempfile.mkstemp( dir = self._tmp_lDir.path, suffix = '.part' )
+        os.close( fd )
+        return tmp_path
+
+    def _upload_bytes( self, data, rPath ):
+        """Write bytes to rPath through a temporary file, can be overwritten by the Child Platform."""
+
+        tmp_lPath = self._tmp_lDir.join_Path( path = self._get_randomized_dirname() + '-' + os.path.basename( rPath.path ) )
+        try:
+            with open( tmp_lPath.path, 'wb' ) as file:
+                file.write( data )
+            return rPath.upload( Destination = tmp_lPath, override = True, print_off = True )
+        finally:
+            if os.path.exists( tmp_lPath.path ):
+                os.remove( tmp_lPath.path )
+
+    def _download_bytes( self, rPath ):
+        """Read the contents of rPath through a temporary file, can be overwritten by the Child Platform."""
+
+        tmp_lPath = self._tmp_lDir.join_Path( path = self._get_randomized_dirname() + '-' + os.path.basename( rPath.path ) )
+        try:
+            rPath.download( Destination = tmp_lPath, override = True, overwrite = True, print_off = True )
+            with open( tmp_lPath.path, 'rb' ) as file:
+                return file.read()
+        finally:
+            if os.path.exists( tmp_lPath.path ):
+                os.remove( tmp_lPath.path )
+
+    def _list_rel_paths( self, rDir ):
+        """Return the path of every file underneath rDir relative to it, can be overwritten by the Child Platform."""
+
+        Paths_inst = rDir.walk_contents_Paths( block_dirs = True, folders_to_skip = [] )
+        return [ Path_inst.get_rel( rDir ).path for Path_inst in Paths_inst ]
+
+    def _get_checksum( self, lPath ):
+        """Return the checksum of a local data file, from the snapshot if it is known."""
+
+        if self.snapshot is not None:
+            checksum = self.snapshot.get_checksum( lPath.get_rel( self.data_lDir ).path )
+            if checksum is not None:
+                return checksum
+
+        return self._hash( lPath.path )
+
+    def _delete_from_remote(self, Paths_inst):
+        """Copy remote files into the deleted folder, then remove the ones that were copied.
+        Returns the Paths that were removed."""
+
+        transfer_log = self._get_transfer_log()
+        if transfer_log is not None:
+            transfer_log.plan( 'delete_from_remote', list( Paths_inst ) )
+
+        archived_Paths = self._archive_remote( Paths_inst )
+        removed_Paths = self._remove_from_remote( archived_Paths )
+
+        if transfer_log is not None:
+            transfer_log.done( 'delete_from_remote', [ transfer_log.get_rel_path( 'delete_from_remote', rPath ) for rPath in removed_Paths ] )
+        return removed_Paths
 
     @data_function
-    def _delete_from_remote(self, rPath):
+    def _archive_remote(self, rPath):
 
         rel_rPath = rPath.get_rel( self.data_rDir ) 
         deleted_rPath = self._util_deleted_rDir.join_Path( Path = rel_rPath )
 
+        # chunked files and blobs stay recoverable through the checksum in the deleted record
+        checksum = self.snapshot.get_remote_checksum( rel_rPath.path )
+        delta_store = self._get_delta_store()
+        blob_store = self._get_blob_store()
+
+        if ( delta_store is not None and delta_store.has( checksum ) ) or ( blob_store is not None and blob_store.has( checksum ) ):
+            return True
+
         # make a copy of the deleted file into the deleted folder in the util section
-        if rPath.copy( Destination = deleted_rPath, override = True ):
-            return rPath.remove( override = True, print_off = True )
-        return False
+        return self._copy_Path( rPath, deleted_rPath )
+
+    @data_function
+    def _remove_from_remote(self, rPath):
+        """Remove a single remote file, can be overwritten by the Child Platform to remove many Paths at once.
+        A file without an object of its own, stored only as chunks or a blob, is already removed"""
+
+        if not rPath.exists():
+            return True
+        return rPath.remove( override = True, print_off = True )
+
+    def _copy_Path( self, rPath, Destination ):
+        """Copy a single remote file to another remote path, can be overwritten by the Child Platform."""
+        return rPath.copy( Destination = Destination, override = True )
 
     @data_function
     def _delete_from_local(self, lPath):
 
         return lPath.remove( override = True, print_off = True )
 
+    def _get_transfer_executor( self ):
+        """Return the executor that runs data functions, sized from the platform cfg.
+        With transfers.adaptive on, the transfers in flight start there and follow an AIMD limit up to transfers.max_workers"""
+
+        if self._transfer_executor is None:
+            workers = self.cfg['transfer_workers']
+            if workers is None:
+                workers = 8
+
+            is_async = self.cfg['transfer_mode'] == 'async'
+            concurrency = int( workers )
+            if is_async:
+                concurrency = self.cfg['async_concurrency']
+                if concurrency is None:
+                    concurrency = 256
+
+            def get( key, default ):
+                value = self.Connection.cfg[ 'transfers.' + key ]
+                return default if value is None else value
+
+            kwargs = {
+                'retries': int( get( 'retries', 3 ) ),
+                'backoff_seconds': float( get( 'backoff_seconds', 0.5 ) ),
+                'max_backoff_seconds': float( get( 'max_backoff_seconds', 20 ) ),
+                'classify': self._classify_error,
+                'report': lambda name, n = 1: self.metrics.add( name, n )
+            }
+
+            if get( 'adaptive', True ) is not False:
+                maximum = get( 'max_workers', int( concurrency ) if is_async else 4 * int( concurrency ) )
+                concurrency = kabbes_s3synchrony.AIMD( int( concurrency ), maximum = int( maximum ), latency_factor = float( get( 'latency_factor', 4 ) ) )
+
+            if is_async:
+                self._transfer_executor = kabbes_s3synchrony.AsyncTransferExecutor( workers = int( workers ), concurrency = concurrency, **kwargs )
+                self._transfer_executor.contexts.extend( self._get_async_contexts() )
+            elif isinstance( concurrency, int ):
+                self._transfer_executor = kabbes_s3synchrony.TransferExecutor( workers = concurrency, **kwargs )
+            else:
+                self._transfer_executor = kabbes_s3synchrony.TransferExecutor( concurrency = concurrency, **kwargs )
+
+        return self._transfer_executor
+
+    def _get_bandwidth( self ):
+        """Return the caps on transfer bytes per second from transfers.bandwidth_mb, upload_mb and download_mb, or None when there are none."""
+
+        if self._bandwidth is None:
+            rates = {}
+            for key, cfg_key in [ ( 'total', 'bandwidth_mb' ), ( 'upload', 'upload_mb' ), ( 'download', 'download_mb' ) ]:
+                value = self.Connection.cfg[ 'transfers.' + cfg_key ]
+                if value:
+                    rates[ key ] = float( value ) * 1024**2
+
+            self._bandwidth = kabbes_s3synchrony.Bandwidth( **rates )
+
+        if len( self._bandwidth ) == 0:
+            return None
+        return self._bandwidth
+
+    def _read_file( self, path ):
+        """Return the contents of a file to upload. In a fan-out sync the remotes share one read of it"""
+
+        if self._shared_reads is not None:
+            return self._shared_reads.read( path )
+
+        with open( path, 'rb' ) as file:
+            return file.read()
+
+    def _classify_error( self, error ):
+        """Return 'throttle' or 'error' for an exception raised by a transfer that is worth retrying, None for the rest.
+        Can be overwritten by the Child Platform to recognize its own throttling responses"""
+
+        if isinstance( error, ( ConnectionError, TimeoutError ) ):
+            return 'error'
+        return None
+
+    def _get_async_contexts( self ):
+        """Return async context managers to enter around each async run, can be overwritten by the Child Platform."""
+        return []
+
     def _apply_selected_indices(self, data_function, Paths_inst):
 
         """Prompt the user to select certain files to perform a synchronization function on."""
 
-        indices = ps.get_user_selection_for_list_items( Paths_inst.export_strings(), print_off=False )
+        if self.Connection.cfg['auto_approve']:
+            indices = list(range(len(Paths_inst)))
+        else:
+            indices = ps.get_user_selection_for_list_items( Paths_inst.export_strings(), print_off=False )
 
         all_indices = list(range(len(Paths_inst)))
         inds_not_selected = [ ind for ind in all_indices if ind not in indices ]
@@ -494,47 +1181,44 @@ class BasePlatform( ParentClass ):
         successful_Paths = data_function( Paths_inst )
         return successful_Paths
 
-    def _push_sequence(self, listfiles, mine, other):
-        """User-prompted uploading of files from a dataframe."""
+    def _push_sequence(self, df_modified):
+        """User-prompted uploading of files from a dataframe of modified files."""
         
         to_push_Paths = do.Paths()
         index = 1
-        for file in listfiles:
+        for i, row in df_modified.iterrows():
             
-            lPath = self.data_lDir.join_Path( path = file[0] )
+            lPath = self.data_lDir.join_Path( path = row[self._file_colname] )
             to_push_Paths._add( lPath )
 
-            print(index, file[0], '\t', file[1], '\t', file[2], "\t by",
-                  other.loc[other[self._file_colname] == file[0]][self._editor_colname].iloc[0])
+            print(index, row[self._file_colname], '\t', row[kabbes_s3synchrony.Diff.time_local_colname], '\t',
+                  row[kabbes_s3synchrony.Diff.time_remote_colname], "\t by", row[self._editor_colname])
             index += 1
 
         selected_push_Paths = self._apply_selected_indices( self._upload_to_remote, to_push_Paths )
         push_rel_paths = selected_push_Paths.get_rels( self.data_lDir ).export_strings()
 
-        updatedins3 = mine.loc[mine[self._file_colname].isin(push_rel_paths)]
-        newversions = pd.concat([other, updatedins3])
-        newversions = newversions.drop_duplicates(
-            [self._file_colname], keep="last").sort_index()
-        newversions.to_csv(self._remote_versions_lPath.path, index=False)
+        self.snapshot.record_uploaded( push_rel_paths )
         print("Done.\n")
 
  
-    def _pull_sequence(self, listfiles, other):
+    def _pull_sequence(self, df_modified):
 
-        """User-prompted downloading of files from a dataframe."""
+        """User-prompted downloading of files from a dataframe of modified files."""
 
         to_pull_Paths = self.PATHS_CLASS()
         index = 1
-        for file in listfiles:
+        for i, row in df_modified.iterrows():
             
-            rPath = self.data_rDir.join_Path( path = file[0] )
+            rPath = self.data_rDir.join_Path( path = row[self._file_colname] )
             to_pull_Paths._add( rPath )
 
-            print(index, file[0], '\t', file[1], '\t', file[2], "\t by",
-                  other.loc[other[self._file_colname] == file[0]][self._editor_colname].iloc[0])
+            print(index, row[self._file_colname], '\t', row[kabbes_s3synchrony.Diff.time_local_colname], '\t',
+                  row[kabbes_s3synchrony.Diff.time_remote_colname], "\t by", row[self._editor_colname])
             index += 1
 
         selected_pull_Paths = self._apply_selected_indices(self._download_from_remote, to_pull_Paths)
+        self.snapshot.record_downloaded( selected_pull_Paths.get_rels( self.data_rDir ).export_strings() )
         print("Done.\n")
 
 
@@ -567,6 +1251,19 @@ class BasePlatform( ParentClass ):
         """Remove all modifications made to the remote repo by synchronization."""
         
         if self._reset_approved:
+
+            delta_store = self._get_delta_store()
+            if delta_store is not None:
+                delta_store.load()
+                if len( delta_store.index ) > 0:
+                    print("Cannot reset remote -- " + str( len( delta_store.index ) ) + " files are only stored as chunks in " + str( self.UTIL_DIR ))
+                    return
+
+            blob_store = self._get_blob_store()
+            if blob_store is not None and len( blob_store._get_known() ) > 0:
+                print("Cannot reset remote -- files are only stored as blobs in " + str( self.UTIL_DIR ))
+                return
+
             self._util_rDir.remove( override = True )
         else:
             print("Cannot reset remote -- user has not approved.")
@@ -577,8 +1274,6 @@ class BasePlatform( ParentClass ):
 
     def _hash(self, filepath):
         """Return a unique checksum based on a file's contents."""
-        file = open(filepath, "rb")
-        data = file.read()
-        return hashlib.md5(data).hexdigest()
+        return kabbes_s3synchrony.hash_file( filepath )[0]
 
 
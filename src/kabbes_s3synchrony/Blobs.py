@@ -0,0 +1,94 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import threading
+import shutil
+import os
+
+
+class BlobStore( ParentClass ):
+
+    """Stores each unique file content once under the remote util dir, named by its md5 checksum.
+    A data file maps to its blob through the checksum in the versions manifest, so uploading
+    content the remote already holds is skipped and a copy of a local file replaces a download"""
+
+    def __init__( self, Platform ):
+
+        ParentClass.__init__( self )
+
+        self.Platform = Platform
+        self.blobs_rDir = Platform._util_rDir.join_Dir( path = 'blobs' )
+
+        self._known = None      # checksums with a blob on the remote, listed on first use
+        self._uploading = {}    # { checksum: threading.Event } for blobs being uploaded right now
+        self._lock = threading.Lock()
+
+    def _get_known( self ):
+
+        with self._lock:
+            if self._known is None:
+                self._known = { os.path.basename( rel_path ) for rel_path in self.Platform._list_rel_paths( self.blobs_rDir ) }
+            return self._known
+
+    def has( self, checksum ):
+        return checksum in self._get_known()
+
+    def get_blob_rPath( self, checksum ):
+        return self.blobs_rDir.join_Path( path = checksum[:2] + '/' + checksum )
+
+    def upload( self, lPath, checksum ):
+
+        """Upload the content of lPath unless the remote already has it, or another thread is uploading it"""
+
+        known = self._get_known()
+        with self._lock:
+            if checksum in known:
+                return True
+
+            event = self._uploading.get( checksum )
+            if event is None:
+                self._uploading[ checksum ] = threading.Event()
+
+        if event is not None:
+            event.wait()
+            return checksum in known
+
+        try:
+            if self.Platform._upload_Path( lPath, self.get_blob_rPath( checksum ) ):
+                with self._lock:
+                    known.add( checksum )
+        finally:
+            with self._lock:
+                self._uploading.pop( checksum ).set()
+
+        return checksum in known
+
+    def download( self, lPath, checksum, source_path = None ):
+
+        """Write the content with checksum to lPath, copying source_path when it is a local file
+        with the same content and downloading the blob otherwise"""
+
+        if source_path is not None and self._copy( source_path, lPath, checksum ):
+            return True
+
+        return self.Platform._download_Path( self.get_blob_rPath( checksum ), lPath )
+
+    def _copy( self, source_path, lPath, checksum ):
+
+        """Copy a local duplicate into place, returning False if it changed since it was hashed"""
+
+        os.makedirs( lPath.ascend().path, exist_ok = True )
+        tmp_path = self.Platform._make_tmp_path()
+
+        try:
+            shutil.copyfile( source_path, tmp_path )
+            if kabbes_s3synchrony.hash_file( tmp_path )[0] != checksum:
+                return False
+            os.replace( tmp_path, lPath.path )
+            return True
+
+        except OSError:
+            return False
+
+        finally:
+            if os.path.exists( tmp_path ):
+                os.remove( tmp_path )
@@ -0,0 +1,112 @@
+from parent_class import ParentClass
+import numpy as np
+import hashlib
+import math
+
+
+def _make_gear_table():
+
+    """256 pseudo-random 32 bit values, derived from md5 so they never change between versions"""
+
+    values = [ int.from_bytes( hashlib.md5( bytes([i]) ).digest()[:4], 'little' ) for i in range(256) ]
+    return np.array( values, dtype = np.uint32 )
+
+
+GEAR = _make_gear_table()
+WINDOW = 32 # bytes that influence the rolling hash at each position
+
+
+def _gear_hashes( data ):
+
+    """Return the gear rolling hash at every byte of data, h[n] = sum( GEAR[ data[n-i] ] << i for i < 32 ).
+    Computed by doubling the window five times instead of looping over the bytes"""
+
+    h = GEAR[ np.frombuffer( data, dtype = np.uint8 ) ]
+    shifted = np.empty_like( h )
+
+    width = 1
+    while width < WINDOW:
+        np.left_shift( h[ :-width ], np.uint32( width ), out = shifted[ :-width ] )
+        h[ width: ] += shifted[ :-width ]
+        width *= 2
+
+    return h
+
+
+class Chunker( ParentClass ):
+
+    """Splits files into content-defined chunks, so an insert or append only changes the chunks around it.
+    A boundary falls after any byte whose rolling hash has its low bits all zero"""
+
+    BLOCK_SIZE = 8 * 1024**2
+
+    def __init__( self, avg_size = 1024**2 ):
+
+        ParentClass.__init__( self )
+
+        bits = max( 8, int( round( math.log2( avg_size ) ) ) )
+        self.avg_size = 2**bits
+        self.min_size = self.avg_size // 4
+        self.max_size = self.avg_size * 4
+        self.mask = np.uint32( self.avg_size - 1 )
+
+    def iter_chunks( self, path ):
+
+        """Yield ( digest, offset, length ) for each chunk of the file, digest being the sha256 hex"""
+
+        pending = bytearray() # bytes since the last boundary
+        carry = b''           # the tail of the previous block, so hashes run across block edges
+        offset = 0
+
+        with open( path, 'rb' ) as file:
+            while True:
+
+                block = file.read( self.BLOCK_SIZE )
+                if not block:
+                    break
+
+                data = carry + block
+                candidates = np.flatnonzero( ( _gear_hashes( data ) & self.mask ) == 0 ) - len( carry )
+                candidates = candidates[ candidates >= 0 ]
+
+                start = 0 # position in block where pending ends
+                for cut in self._cuts( len( pending ), candidates, len( block ) ):
+                    pending += block[ start : cut + 1 ]
+                    yield self._finish( pending, offset )
+                    offset += len( pending )
+                    pending = bytearray()
+                    start = cut + 1
+
+                pending += block[ start: ]
+                carry = data[ -( WINDOW - 1 ): ]
+
+        if len( pending ) > 0:
+            yield self._finish( pending, offset )
+
+    def _cuts( self, n_pending, candidates, block_length ):
+
+        """Positions in the block after which a chunk ends, respecting the min and max chunk sizes"""
+
+        last = -1 # the previous cut within this block
+        i = 0
+
+        while True:
+            chunk_start = last + 1 - ( n_pending if last == -1 else 0 )
+
+            # skip candidates that would make a chunk smaller than min_size
+            while i < len( candidates ) and candidates[i] - chunk_start + 1 < self.min_size:
+                i += 1
+
+            max_cut = chunk_start + self.max_size - 1
+            if i < len( candidates ) and candidates[i] <= max_cut:
+                cut = int( candidates[i] )
+            elif max_cut < block_length:
+                cut = max_cut
+            else:
+                return
+
+            yield cut
+            last = cut
+
+    def _finish( self, pending, offset ):
+        return hashlib.sha256( pending ).hexdigest(), offset, len( pending )
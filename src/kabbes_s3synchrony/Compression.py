@@ -0,0 +1,100 @@
+from parent_class import ParentClass
+import shutil
+import gzip
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# formats that are compressed already and would only grow
+COMPRESSED_EXTENSIONS = {
+    '.gz', '.tgz', '.zip', '.zst', '.bz2', '.xz', '.lz4', '.7z', '.rar',
+    '.parquet', '.orc', '.avro', '.feather',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.heic',
+    '.mp3', '.mp4', '.m4a', '.mov', '.avi', '.mkv', '.webm',
+    '.pdf', '.docx', '.xlsx', '.pptx', '.jar', '.whl'
+}
+
+COPY_BUFFER_SIZE = 1024**2
+
+
+def _open_gzip( file, mode, level ):
+    if level is None:
+        level = 6
+    return gzip.GzipFile( fileobj = file, mode = mode, compresslevel = level, mtime = 0 )
+
+def _open_zstd( file, mode, level ):
+    if mode == 'wb':
+        return zstandard.ZstdCompressor( level = 3 if level is None else level ).stream_writer( file, closefd = False )
+    return zstandard.ZstdDecompressor().stream_reader( file, closefd = False )
+
+CODECS = {
+    'gzip': _open_gzip,
+    'zstd': _open_zstd
+}
+
+
+def decompress_stream( stream, destination_path, codec ):
+
+    """Decompress a readable stream, such as the body of a response, into destination_path"""
+
+    if codec == 'zstd' and zstandard is None:
+        raise ImportError( 'zstandard is required to download files compressed with zstd' )
+
+    with open( destination_path, 'wb' ) as destination:
+        with CODECS[ codec ]( stream, 'rb', None ) as reader:
+            shutil.copyfileobj( reader, destination, COPY_BUFFER_SIZE )
+
+
+class Compressor( ParentClass ):
+
+    """Chooses a codec for each file by its extension and size, and streams files through it.
+
+    codec:        default codec, 'zstd' falls back to 'gzip' when zstandard is not installed
+    extensions:   { extension: codec or None } overriding the default for those extensions
+    min_size:     files smaller than this many bytes are left as they are"""
+
+    def __init__( self, codec = 'zstd', extensions = {}, min_size = 4096, level = None ):
+
+        ParentClass.__init__( self )
+
+        self.codec = self._get_codec( codec )
+        self.extensions = { extension.lower(): self._get_codec( extensions[ extension ] ) for extension in extensions }
+        self.min_size = min_size
+        self.level = level
+
+    def _get_codec( self, codec ):
+
+        if codec is None:
+            return None
+        if codec == 'zstd' and zstandard is None:
+            return 'gzip'
+        if codec not in CODECS:
+            raise ValueError( 'unknown compression codec: ' + str( codec ) )
+        return codec
+
+    def choose_codec( self, path ):
+
+        """Return the codec to store path with, or None to store it as it is"""
+
+        filename = os.path.basename( path ).lower()
+        for extension in COMPRESSED_EXTENSIONS:
+            if filename.endswith( extension ):
+                return None
+
+        if os.path.getsize( path ) < self.min_size:
+            return None
+
+        extension = os.path.splitext( filename )[1]
+        if extension in self.extensions:
+            return self.extensions[ extension ]
+        return self.codec
+
+    def compress( self, source_path, destination_path, codec ):
+
+        with open( source_path, 'rb' ) as source, open( destination_path, 'wb' ) as destination:
+            with CODECS[ codec ]( destination, 'wb', self.level ) as writer:
+                shutil.copyfileobj( source, writer, COPY_BUFFER_SIZE )
@@ -7,13 +7,76 @@ class Connection( ParentClass ):
         ParentClass.__init__( self )
 
         self.template_module = kabbes_s3synchrony.get_template( self.cfg['template'] )
-        self.platform_module = kabbes_s3synchrony.get_platform( self.cfg['platform'] )
-        self.platform_node_name = 'platforms.' + self.cfg['platform']
+
+        # platform names one node of platforms, or a list of them to sync the data dir with each
+        platform = self.cfg['platform']
+        self.node_names = list( platform ) if isinstance( platform, list ) else [ platform ]
+        self.platform_node_name = 'platforms.' + self.node_names[0]
+
+        for node_name in self.node_names:
+            self._fill_node_defaults( node_name )
+
+    def _fill_node_defaults( self, node_name ):
+        """A node named after something other than its platform starts from the settings of the platform's own node"""
+
+        platform_name = self.get_platform_name( node_name )
+        if platform_name == node_name:
+            return
+
+        platform_Node = self.cfg.get_node( 'platforms.' + node_name )
+        for key in self.cfg.get_node( 'platforms.' + platform_name ).get_raw_dict():
+            value = self.cfg[ 'platforms.' + platform_name + '.' + key ]
+            if value is not None and platform_Node[ key ] is None:
+                platform_Node.load_dict( { key: value } )
+
+    def get_platform_name( self, node_name = None ):
+        """The platform module of a node: its module key, or else its own name"""
+
+        if node_name is None:
+            node_name = self.node_names[0]
+
+        platform_name = self.cfg[ 'platforms.' + node_name + '.module' ]
+        if platform_name is None:
+            return node_name
+        return platform_name
+
+    def get_util_dirs( self ):
+        """Names of the util dirs no walk of the data dir goes into: the local one of every node, and the remote one of every platform"""
+
+        util_dirs = []
+        for name in self.node_names + [ self.get_platform_name( node_name ) for node_name in self.node_names ]:
+            if '.' + name.upper() not in util_dirs:
+                util_dirs.append( '.' + name.upper() )
+        return util_dirs
+
+    @property
+    def platform_module( self ):
+        """Imported when the platform is first needed, the fast path never does"""
+        return kabbes_s3synchrony.get_platform( self.get_platform_name() )
 
     def run( self ):
 
         self.template_module.set_cfg( self )
-        self.platform = self.platform_module.Platform( self )
+
+        if self._is_unchanged():
+            print ('Nothing changed since the last sync')
+            return
+
+        if len( self.node_names ) > 1:
+            self.platform = kabbes_s3synchrony.FanOut( self )
+        else:
+            self.platform = self.platform_module.Platform( self )
 
         self.platform.run()
 
+    def _is_unchanged( self ):
+        """Check the fingerprint of the last sync, without importing the platform"""
+
+        if self.cfg['reset'] or self.cfg['rehash'] or self.cfg['fast_noop'] is False:
+            return False
+
+        try:
+            return all( kabbes_s3synchrony.Fingerprint( self, node_name ).is_unchanged() for node_name in self.node_names )
+        except Exception as e: # any doubt means a full sync
+            print ( 'Could not check the fingerprint of the last sync: ' + repr( e ) )
+            return False
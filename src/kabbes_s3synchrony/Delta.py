@@ -0,0 +1,199 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import dir_ops as do
+import threading
+import hashlib
+import random
+import json
+import time
+import os
+
+
+class DeltaStore( ParentClass ):
+
+    """Stores large data files as content-defined chunks under the remote util dir, named by their sha256,
+    so a modified file only uploads the chunks the remote does not have yet.
+
+    The chunk index maps the checksum of a file to its ordered [ sha256, length ] chunk list;
+    with the versions manifest it gives the chunks of every remote file. It is replaced with a conditional write,
+    so of two syncs saving at once the second merges in the chunk lists of the first and saves again"""
+
+    INDEX_FILENAME = 'chunks_remote.json'
+    VERSION = 1
+    RETRIES = 10
+
+    def __init__( self, Platform, min_file_size = 64 * 1024**2, avg_chunk_size = 1024**2 ):
+
+        ParentClass.__init__( self )
+
+        self.Platform = Platform
+        self.min_file_size = min_file_size
+        self.Chunker = kabbes_s3synchrony.Chunker( avg_size = avg_chunk_size )
+
+        self.chunks_rDir = Platform._util_rDir.join_Dir( path = 'chunks' )
+        self.index_rPath = Platform._util_rDir.join_Path( path = self.INDEX_FILENAME )
+        self.index_lPath = do.Path( Platform._util_lDir.join( self.INDEX_FILENAME ) )
+
+        self.index = {}         # { file checksum: [ [ sha256, length ], ... ] }
+        self._known = set()     # sha256 of every chunk on the remote
+        self._loaded = set()    # file checksums of the remote index as last read
+        self._etag = None       # version of the remote index as last read, None when there was none
+        self._lock = threading.Lock()
+
+    def _download_index( self ):
+
+        """Return the files of the remote chunk index and its version, ( {}, None ) if the remote has none"""
+
+        data, etag = self.Platform._download_bytes_if_exists( self.index_rPath )
+        if data is None:
+            return {}, None
+
+        contents = json.loads( data )
+        if contents.get( 'version' ) != self.VERSION:
+            return {}, etag
+        return contents['files'], etag
+
+    def load( self ):
+
+        """Download the chunk index, starting an empty one if the remote has none"""
+
+        self.index, self._etag = self._download_index()
+        self._loaded = set( self.index )
+        self._known = { digest for chunks in self.index.values() for digest, length in chunks }
+
+    def _merge( self, files ):
+
+        """Take in the chunk lists others added to the remote index since it was last read.
+        Ones that were there before and are not in ours any more were collected as garbage, and stay out"""
+
+        with self._lock:
+            for checksum, chunks in files.items():
+                if checksum not in self._loaded and checksum not in self.index:
+                    self.index[ checksum ] = chunks
+                    self._known.update( digest for digest, length in chunks )
+            self._loaded = set( files )
+
+    def save( self ):
+
+        """Upload the chunk index, after every chunk it references is on the remote,
+        catching up with anyone who saved since it was loaded"""
+
+        for attempt in range( self.RETRIES ):
+
+            data = json.dumps( { 'version': self.VERSION, 'files': self.index } ).encode()
+            etag = self.Platform._upload_bytes_if( data, self.index_rPath, if_match = self._etag )
+            if etag is not None:
+                break
+
+            # someone saved first, merge in their chunk lists and save on top of theirs
+            self.Platform.metrics.add( 'delta_index_conflicts' )
+            files, self._etag = self._download_index()
+            self._merge( files )
+            time.sleep( random.uniform( 0, 0.05 * 2**attempt ) )
+
+        else:
+            raise RuntimeError( 'Could not save the chunk index after ' + str( self.RETRIES ) + ' attempts' )
+
+        self._etag = etag
+        self._loaded = set( self.index )
+
+        tmp_path = self.index_lPath.path + '.tmp'
+        with open( tmp_path, 'wb' ) as file:
+            file.write( data )
+        os.replace( tmp_path, self.index_lPath.path )
+
+    def should_chunk( self, lPath ):
+        return os.path.getsize( lPath.path ) >= self.min_file_size
+
+    def has( self, checksum ):
+        return checksum in self.index
+
+    def _get_chunk_rPath( self, digest ):
+        return self.chunks_rDir.join_Path( path = digest[:2] + '/' + digest )
+
+    def upload( self, lPath, rPath, checksum ):
+
+        """Upload the chunks of lPath the remote is missing and record its chunk list under checksum"""
+
+        chunks = []
+        with open( lPath.path, 'rb' ) as file:
+            for digest, offset, length in self.Chunker.iter_chunks( lPath.path ):
+                chunks.append( [ digest, length ] )
+
+                with self._lock:
+                    if digest in self._known:
+                        continue
+
+                file.seek( offset )
+                self.Platform._upload_bytes( file.read( length ), self._get_chunk_rPath( digest ) )
+
+                with self._lock:
+                    self._known.add( digest )
+
+        with self._lock:
+            self.index[ checksum ] = chunks
+
+        # a whole object left at rPath by an earlier upload would be stale now
+        if rPath.exists():
+            rPath.remove( override = True, print_off = True )
+        return True
+
+    def download( self, rPath, lPath, checksum ):
+
+        """Reassemble lPath from its chunk list, reusing chunks of the local file and fetching the rest"""
+
+        local_chunks = {}
+        if os.path.exists( lPath.path ):
+            for digest, offset, length in self.Chunker.iter_chunks( lPath.path ):
+                local_chunks[ digest ] = offset
+
+        os.makedirs( lPath.ascend().path, exist_ok = True )
+        tmp_path = self.Platform._make_tmp_path()
+
+        try:
+            local_file = open( lPath.path, 'rb' ) if len( local_chunks ) > 0 else None
+            try:
+                with open( tmp_path, 'wb' ) as file:
+                    for digest, length in self.index[ checksum ]:
+
+                        if digest in local_chunks:
+                            local_file.seek( local_chunks[ digest ] )
+                            data = local_file.read( length )
+                        else:
+                            data = self.Platform._download_bytes( self._get_chunk_rPath( digest ) )
+
+                        if hashlib.sha256( data ).hexdigest() != digest:
+                            raise ValueError( 'chunk ' + digest + ' of ' + str( rPath ) + ' is corrupt' )
+                        file.write( data )
+            finally:
+                if local_file is not None:
+                    local_file.close()
+
+            if kabbes_s3synchrony.hash_file( tmp_path )[0] != checksum:
+                raise ValueError( 'reassembled ' + str( rPath ) + ' does not match its checksum' )
+            os.replace( tmp_path, lPath.path )
+
+        finally:
+            if os.path.exists( tmp_path ):
+                os.remove( tmp_path )
+
+        return True
+
+    def collect_garbage( self, checksums ):
+
+        """Forget the chunk lists of files not in checksums and remove the chunks nothing references.
+        Only run this while no one else is synchronizing, their new chunks are not in the index yet"""
+
+        checksums = set( checksums )
+        self.index = { checksum: chunks for checksum, chunks in self.index.items() if checksum in checksums }
+        self._known = { digest for chunks in self.index.values() for digest, length in chunks }
+
+        unreferenced = [ rel_path for rel_path in self.Platform._list_rel_paths( self.chunks_rDir )
+                         if os.path.basename( rel_path ) not in self._known ]
+
+        print ( 'Removing ' + str( len( unreferenced ) ) + ' unreferenced chunks' )
+        self.Platform._get_transfer_executor().run(
+            lambda rel_path: self.chunks_rDir.join_Path( path = rel_path ).remove( override = True, print_off = True ),
+            unreferenced,
+            description = 'remove chunks'
+        )
@@ -0,0 +1,88 @@
+from parent_class import ParentClass
+import pandas as pd
+
+
+class Diff( ParentClass ):
+
+    """Compares the local versions (mine) with the remote versions (other) in a single join.
+
+    new_local:       rows of mine for files not found remotely
+    new_remote:      rows of other for files not found locally
+    mod_mine:        files with differing checksums, more recently modified locally
+    mod_other:       files with differing checksums, more recently modified remotely
+    deleted_local:   rows of other for files we had before but have since deleted locally
+    deleted_remote:  rows of the remote deleted record for files we still have locally
+
+    mod_mine and mod_other have the columns File, Time Local, Time Remote and Edited By,
+    where the times are parsed datetimes and Edited By is the last remote editor."""
+
+    time_local_colname = 'Time Local'
+    time_remote_colname = 'Time Remote'
+
+    def __init__( self, Platform, mine, other, previous_local = None, deleted_remote = None ):
+
+        ParentClass.__init__( self )
+
+        self.file_colname = Platform._file_colname
+        self.editor_colname = Platform._editor_colname
+        self.time_colname = Platform._time_colname
+        self.hash_colname = Platform._hash_colname
+        self.dttm_format = Platform.dttm_format
+
+        self.mine = mine
+        self.other = other
+
+        self._compute_joined()
+        self._compute_modified()
+        self._compute_deleted( previous_local, deleted_remote )
+
+    def is_empty( self ):
+        """Return whether there is nothing to transfer or delete on either side"""
+        return all( len( df ) == 0 for df in [ self.new_local, self.new_remote, self.mod_mine, self.mod_other, self.deleted_local, self.deleted_remote ] )
+
+    def _compute_joined( self ):
+
+        mine = self.mine.drop_duplicates( [self.file_colname], keep='last' )
+        other = self.other.drop_duplicates( [self.file_colname], keep='last' )
+
+        joined = mine.merge( other, on=self.file_colname, how='outer', suffixes=('_mine', '_other'), indicator=True )
+
+        self.new_local = self.mine.loc[ self.mine[self.file_colname].isin( joined.loc[ joined['_merge'] == 'left_only', self.file_colname ] ) ]
+        self.new_remote = self.other.loc[ self.other[self.file_colname].isin( joined.loc[ joined['_merge'] == 'right_only', self.file_colname ] ) ]
+        self._both = joined.loc[ joined['_merge'] == 'both' ]
+
+    def _compute_modified( self ):
+
+        both = self._both
+        conflicting = both.loc[ both[self.hash_colname + '_mine'] != both[self.hash_colname + '_other'] ]
+
+        time_mine = pd.to_datetime( conflicting[self.time_colname + '_mine'], format=self.dttm_format )
+        time_other = pd.to_datetime( conflicting[self.time_colname + '_other'], format=self.dttm_format )
+
+        modified = pd.DataFrame( {
+            self.file_colname: conflicting[self.file_colname],
+            self.time_local_colname: time_mine,
+            self.time_remote_colname: time_other,
+            self.editor_colname: conflicting[self.editor_colname + '_other']
+        } ).reset_index( drop=True )
+
+        mine_is_newer = ( time_mine > time_other ).to_numpy()
+        self.mod_mine = modified.loc[ mine_is_newer ].reset_index( drop=True )
+        self.mod_other = modified.loc[ ~mine_is_newer ].reset_index( drop=True )
+
+    def _compute_deleted( self, previous_local, deleted_remote ):
+
+        # Files we had in the past but no longer have, which are still remote
+        if previous_local is None:
+            self.deleted_local = self.other.iloc[0:0]
+        else:
+            previous_files = previous_local[self.file_colname]
+            gone = previous_files.loc[ ~previous_files.isin( self.mine[self.file_colname] ) ]
+            self.deleted_local = self.other.loc[ self.other[self.file_colname].isin( gone ) ]
+
+        # Files deleted remotely that we still have locally
+        if deleted_remote is None:
+            self.deleted_remote = self.mine.iloc[0:0]
+        else:
+            deleted_remote = deleted_remote.drop_duplicates( [self.file_colname], keep='last' )
+            self.deleted_remote = deleted_remote.loc[ deleted_remote[self.file_colname].isin( self.new_local[self.file_colname] ) ]
@@ -0,0 +1,184 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import concurrent.futures
+import collections
+import threading
+import os
+
+
+class SharedReads( ParentClass ):
+
+    """Contents of the files being uploaded to several remotes, read from disk once and handed to each of them.
+
+    An entry goes once n_consumers remotes took it, and the least recently read go first past max_bytes.
+    A remote that asks for a file another is still reading waits for that read instead of starting its own"""
+
+    def __init__( self, n_consumers, max_bytes = 256 * 1024**2 ):
+
+        ParentClass.__init__( self )
+
+        self.n_consumers = n_consumers
+        self.max_bytes = max_bytes
+
+        self.entries = collections.OrderedDict() # ( path, size, mtime_ns ): [ data, consumers left ]
+        self.n_bytes = 0
+        self.n_hits = 0
+        self.bytes_saved = 0
+
+        self._reading = {} # key: Event set when its read is done
+        self._lock = threading.Lock()
+
+    def read( self, path ):
+
+        stat_result = os.stat( path )
+        if self.n_consumers < 2 or stat_result.st_size > self.max_bytes:
+            with open( path, 'rb' ) as file:
+                return file.read()
+
+        key = ( path, stat_result.st_size, stat_result.st_mtime_ns )
+        while True:
+            with self._lock:
+                if key in self.entries:
+                    return self._take( key )
+
+                event = self._reading.get( key )
+                if event is None:
+                    self._reading[ key ] = threading.Event()
+                    break
+
+            event.wait()
+
+        try:
+            with open( path, 'rb' ) as file:
+                data = file.read()
+
+            with self._lock:
+                self.entries[ key ] = [ data, self.n_consumers - 1 ]
+                self.n_bytes += len( data )
+                while self.n_bytes > self.max_bytes:
+                    evicted_data, consumers_left = self.entries.popitem( last = False )[1]
+                    self.n_bytes -= len( evicted_data )
+        finally:
+            with self._lock:
+                self._reading.pop( key ).set()
+
+        return data
+
+    def _take( self, key ):
+
+        entry = self.entries[ key ]
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.entries[ key ]
+            self.n_bytes -= len( entry[0] )
+        else:
+            self.entries.move_to_end( key )
+
+        self.n_hits += 1
+        self.bytes_saved += len( entry[0] )
+        return entry[0]
+
+
+class FanOut( ParentClass ):
+
+    """Synchronizes the data dir with the remotes of several platform nodes in a single pass.
+
+    The data dir is walked and hashed once, by the first node, and the versions are diffed against the records of
+    each remote. With auto_approve on, the remotes then sync at the same time, each on its own transfers and adaptive
+    concurrency under the one set of bandwidth caps, and a file uploaded to more than one of them is read once.
+    Otherwise they sync one after the other, so the prompts of each stay together.
+
+    Every node keeps its own util dir in the data dir, named after it. When their ignore_remote.txt differ,
+    the walk ignores nothing and each remote leaves out what it ignores when diffing"""
+
+    def __init__( self, Connection ):
+
+        ParentClass.__init__( self )
+
+        self.Connection = Connection
+        self.Platforms = [ kabbes_s3synchrony.get_platform( Connection.get_platform_name( node_name ) ).Platform( Connection, node_name = node_name )
+                           for node_name in Connection.node_names ]
+
+    def run( self ):
+
+        self.Platforms[0].intro_message()
+        for Platform in self.Platforms:
+            Platform.establish_connection()
+
+        if self.Connection.cfg['reset']:
+            for Platform in self.Platforms:
+                if Platform.reset_confirm():
+                    Platform.reset_local()
+                    Platform.reset_remote()
+
+        else:
+            self.synchronize()
+
+        self.Platforms[0].close_message()
+
+    def synchronize( self ):
+
+        if self.Connection.cfg['streaming']:
+            print ( 'WARNING: streaming is not supported when syncing with several remotes, syncing in memory' )
+
+        mine = self._compute_mine()
+
+        max_bytes = float( self.Connection.cfg['fan_out.shared_read_mb'] or 0 ) * 1024**2
+        shared_reads = SharedReads( len( self.Platforms ), max_bytes = max_bytes )
+
+        self.Platforms[0]._get_bandwidth()
+        for Platform in self.Platforms:
+            Platform._shared_reads = shared_reads
+            Platform._bandwidth = self.Platforms[0]._bandwidth
+
+        try:
+            if self.Connection.cfg['auto_approve'] and self.Connection.cfg['fan_out.concurrent']:
+                for Platform in self.Platforms:
+                    print ( 'Syncing with ' + Platform.node_name + ': ' + str( Platform.data_rDir ) )
+
+                with concurrent.futures.ThreadPoolExecutor( len( self.Platforms ) ) as executor:
+                    futures = [ executor.submit( Platform.synchronize, mine = mine.copy() ) for Platform in self.Platforms ]
+                # any failure is raised once every remote finished what it could
+                for future in futures:
+                    future.result()
+
+            else:
+                for Platform in self.Platforms:
+                    print ()
+                    print ( 'Syncing with ' + Platform.node_name + ': ' + str( Platform.data_rDir ) )
+                    Platform.synchronize( mine = mine.copy() )
+
+        finally:
+            for Platform in self.Platforms:
+                Platform._shared_reads = None
+
+        if shared_reads.n_hits > 0:
+            print ( str( shared_reads.n_hits ) + ' uploads reused a read of another remote, ' + str( round( shared_reads.bytes_saved / 1024**2, 1 ) ) + ' MB not read again' )
+
+    def _compute_mine( self ):
+
+        """Walk and hash the data dir once for every remote, starting the metrics of each sync"""
+
+        walker = self.Platforms[0]
+        shared_ignore = all( Platform._ignore.rules == walker._ignore.rules for Platform in self.Platforms )
+
+        for Platform in self.Platforms:
+            Platform.metrics = kabbes_s3synchrony.Metrics()
+            Platform._local_fingerprint = None
+
+        ignore = walker._ignore
+        if not shared_ignore:
+            walker._ignore = kabbes_s3synchrony.Ignore()
+        try:
+            mine = walker._compute_directory( walker.data_lDir )
+        finally:
+            walker._ignore = ignore
+
+        # the fingerprint of the walk is only that of each remote when they all ignore the same files
+        if shared_ignore:
+            for Platform in self.Platforms[1:]:
+                Platform._local_fingerprint = walker._local_fingerprint
+        else:
+            walker._local_fingerprint = None
+
+        return mine
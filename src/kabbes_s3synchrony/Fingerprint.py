@@ -0,0 +1,156 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import hashlib
+import json
+import os
+
+
+def fingerprint_files( entries ):
+
+    """Return a digest of ( rel_path, stat_result ) pairs, which changes whenever a file is added, removed or rewritten"""
+
+    md5 = hashlib.md5()
+    for rel_path, stat_result in entries:
+        update_fingerprint( md5, rel_path, stat_result )
+    return md5.hexdigest()
+
+
+def update_fingerprint( md5, rel_path, stat_result ):
+
+    """Add one file to a fingerprint being computed as the files are walked"""
+
+    md5.update( '{}\0{}\0{}\0{}\n'.format( rel_path, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino ).encode() )
+
+
+class Fingerprint( ParentClass ):
+
+    """The state of both sides after a sync that found nothing to do.
+
+    The next run walks the data dir without hashing and asks the remote for the version of its manifests;
+    when neither changed, and neither did the settings, there is nothing to sync and the run stops there.
+    Only needs the standard library, and boto3 for the s3 platform"""
+
+    VERSION = 1
+    FILENAME = 'fingerprint.json'
+    SETTINGS = [ 'platform', 'remote_data_dir', 'manifest', 'delta', 'content_addressed', 'journal' ]
+
+    def __init__( self, Connection, node_name = None ):
+
+        ParentClass.__init__( self )
+
+        if node_name is None:
+            node_name = Connection.node_names[0]
+
+        self.Connection = Connection
+        self.platform_name = Connection.get_platform_name( node_name )
+        self.cfg = Connection.cfg[ 'platforms.' + node_name ]
+
+        self.util_dir = '.' + node_name.upper()
+        self.data_dir = Connection.cfg.parent['cwd.Dir'].join( Connection.cfg['local_data_rel_dir'] )
+        self.path = os.path.join( self.data_dir, self.util_dir, self.FILENAME )
+
+    def get_settings( self ):
+
+        """Digest of everything that changes what a sync would do without touching either side"""
+
+        settings = { key: self.Connection.cfg[ key ] for key in self.SETTINGS }
+        settings['platform_cfg'] = { key: value for key, value in self.cfg.get_raw_dict().items() if key != 'credentials' }
+
+        ignore_path = os.path.join( self.data_dir, self.util_dir, 'ignore_remote.txt' )
+        if os.path.exists( ignore_path ):
+            with open( ignore_path ) as file:
+                settings['ignore'] = file.read()
+
+        return hashlib.md5( json.dumps( settings, sort_keys = True, default = str ).encode() ).hexdigest()
+
+    def get_local( self, ignore ):
+
+        """Walk the data dir, stat'ing every file but hashing none"""
+
+        entries = ( ( rel_path, stat_result ) for rel_path, path, stat_result in
+                    kabbes_s3synchrony.iter_files( self.data_dir, folders_to_skip = self.Connection.get_util_dirs(), ignore = ignore ) )
+        return fingerprint_files( entries )
+
+    def get_remote( self, paths ):
+
+        """Return { path: version } of the remote manifests, from a HEAD on s3 and a stat on a local remote.
+        None for platforms without a cheap way to tell"""
+
+        if self.platform_name == 's3':
+            import boto3
+            import botocore.exceptions
+
+            kwargs = self.cfg['credentials'].get_raw_dict() if self.cfg['credentials'] is not None else {}
+            if self.cfg['endpoint_url'] is not None:
+                kwargs['endpoint_url'] = self.cfg['endpoint_url']
+            client = boto3.client( 's3', **kwargs )
+
+            versions = {}
+            for path in paths:
+                try:
+                    versions[ path ] = client.head_object( Bucket = self.cfg['aws_bkt'], Key = path )['ETag']
+                except botocore.exceptions.ClientError:
+                    versions[ path ] = None
+            return versions
+
+        if self.platform_name == 'local':
+            versions = {}
+            for path in paths:
+                try:
+                    stat_result = os.stat( path )
+                    versions[ path ] = '{}-{}'.format( stat_result.st_size, stat_result.st_mtime_ns )
+                except FileNotFoundError:
+                    versions[ path ] = None
+            return versions
+
+        return None
+
+    def load( self ):
+
+        try:
+            with open( self.path ) as file:
+                data = json.load( file )
+            if data.get( 'version' ) == self.VERSION:
+                return data
+        except ( OSError, ValueError ):
+            pass
+
+        return None
+
+    def is_unchanged( self ):
+
+        """Return whether the last sync found nothing to do and nothing changed on either side since"""
+
+        data = self.load()
+        if data is None or data['settings'] != self.get_settings():
+            return False
+
+        ignore = kabbes_s3synchrony.Ignore()
+        ignore_path = os.path.join( self.data_dir, self.util_dir, 'ignore_remote.txt' )
+        if os.path.exists( ignore_path ):
+            with open( ignore_path ) as file:
+                ignore = kabbes_s3synchrony.Ignore( file.read().split( '\n' ) )
+
+        if data['local'] != self.get_local( ignore ):
+            return False
+
+        remote = self.get_remote( list( data['remote'] ) )
+        return remote is not None and remote == data['remote']
+
+    def save( self, local, remote_paths ):
+
+        """Record the state of both sides, local being the fingerprint of the walk the sync started from"""
+
+        remote = self.get_remote( remote_paths )
+        if remote is None:
+            return
+
+        tmp_path = self.path + '.tmp'
+        with open( tmp_path, 'w' ) as file:
+            json.dump( { 'version': self.VERSION, 'settings': self.get_settings(), 'local': local, 'remote': remote }, file )
+        os.replace( tmp_path, self.path )
+
+    def remove( self ):
+
+        if os.path.exists( self.path ):
+            os.remove( self.path )
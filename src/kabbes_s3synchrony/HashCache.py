@@ -0,0 +1,202 @@
+from parent_class import ParentClass
+import sqlite3
+import json
+import os
+import time
+
+
+class HashCache( ParentClass ):
+
+    """Persistent checksum cache stored in the platform util dir.
+    Entries are keyed by relative path and hold the size, mtime_ns and inode of the file
+    at the time it was hashed; a file whose stat no longer matches is rehashed."""
+
+    VERSION = 1
+
+    # files modified this recently may still change within the same mtime tick, don't trust them
+    RACY_SECONDS = 2
+
+    def __init__( self, Path_inst, rehash = False ):
+
+        ParentClass.__init__( self )
+
+        self.Path = Path_inst
+        self.rehash = rehash
+
+        self.entries = {}   # rel path -> [ size, mtime_ns, inode, checksum ]
+        self.seen = set()
+        self.dirty = False
+
+        self.load()
+
+    def load( self ):
+
+        """Read the cache from disk, starting over if it is missing, corrupt or from another version"""
+
+        self.entries = {}
+        if self.rehash:
+            self.dirty = True
+            return
+
+        try:
+            with open( self.Path.path, 'r' ) as f:
+                data = json.load( f )
+
+            if data.get( 'version' ) != self.VERSION:
+                raise ValueError( 'hash cache version mismatch' )
+
+            for rel, entry in data['entries'].items():
+                if isinstance( entry, list ) and len( entry ) == 4:
+                    self.entries[ rel ] = entry
+
+        except ( OSError, ValueError, KeyError, TypeError, AttributeError ):
+            self.entries = {}
+            self.dirty = True
+
+    def get( self, rel, stat_result ):
+
+        """Return the cached checksum if the file is unchanged since it was hashed, else None"""
+
+        self.seen.add( rel )
+        entry = self.entries.get( rel )
+
+        if entry is None:
+            return None
+
+        if entry[0] == stat_result.st_size and entry[1] == stat_result.st_mtime_ns and entry[2] == stat_result.st_ino:
+            return entry[3]
+
+        return None
+
+    @staticmethod
+    def stat_key( stat_result ):
+        """The fields of a stat an entry is keyed by, the access time changes by just hashing the file"""
+        return ( stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino )
+
+    def is_current( self, rel, stat_result ):
+
+        """Return whether the cached entry still matches the file, without marking it as seen"""
+
+        entry = self.entries.get( rel )
+        return entry is not None and entry[0] == stat_result.st_size and entry[1] == stat_result.st_mtime_ns and entry[2] == stat_result.st_ino
+
+    def set( self, rel, stat_result, checksum ):
+
+        """Store the checksum computed for a file with the given stat"""
+
+        self.seen.add( rel )
+
+        # a write landing in the same mtime tick as our read would go unnoticed next time
+        if stat_result.st_mtime_ns >= ( time.time() - self.RACY_SECONDS ) * 1e9:
+            if self.entries.pop( rel, None ) is not None:
+                self.dirty = True
+            return
+
+        self.entries[ rel ] = [ stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino, checksum ]
+        self.dirty = True
+
+    def discard( self, rel ):
+
+        """Forget a file that no longer exists"""
+
+        if self.entries.pop( rel, None ) is not None:
+            self.dirty = True
+
+    def evict( self ):
+
+        """Drop entries for paths that were not visited since the last eviction"""
+
+        for rel in [ rel for rel in self.entries if rel not in self.seen ]:
+            del self.entries[ rel ]
+            self.dirty = True
+
+        self.seen = set()
+
+    def save( self ):
+
+        """Atomically write the cache to disk"""
+
+        if not self.dirty:
+            return
+
+        tmp_path = self.Path.path + '.tmp'
+        with open( tmp_path, 'w' ) as f:
+            json.dump( { 'version': self.VERSION, 'entries': self.entries }, f )
+
+        os.replace( tmp_path, self.Path.path )
+        self.dirty = False
+
+
+class HashCacheDB( HashCache ):
+
+    """The checksum cache as an indexed SQLite table, for data dirs too large to hold every entry in memory.
+    Only the entries of the files passed to prefetch are loaded, and a visit is recorded in the table itself"""
+
+    TABLE = 'entries'
+    BATCH = 500 # stays under SQLite's bound parameter limit
+
+    def load( self ):
+
+        self.entries = {}
+        self._pending = {} # rel path -> [ size, mtime_ns, inode, checksum ], None to delete
+
+        self.conn = sqlite3.connect( self.Path.path )
+        self.conn.execute( 'CREATE TABLE IF NOT EXISTS ' + self.TABLE + ' ( file TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, checksum TEXT, visit INTEGER ) WITHOUT ROWID' )
+        if self.rehash:
+            self.conn.execute( 'DELETE FROM ' + self.TABLE )
+
+        # entries not visited by this run are evicted at the end of it
+        self.visit = ( self.conn.execute( 'SELECT MAX( visit ) FROM ' + self.TABLE ).fetchone()[0] or 0 ) + 1
+        self.conn.commit()
+
+    def prefetch( self, rels ):
+
+        """Load the entries of the given files, replacing the ones loaded before, and mark them as visited"""
+
+        self.entries = {}
+        rels = list( rels )
+
+        for i in range( 0, len( rels ), self.BATCH ):
+            batch = rels[ i : i + self.BATCH ]
+            placeholders = ','.join( '?' * len( batch ) )
+
+            for row in self.conn.execute( 'SELECT file, size, mtime_ns, inode, checksum FROM ' + self.TABLE + ' WHERE file IN ({})'.format( placeholders ), batch ):
+                self.entries[ row[0] ] = list( row[1:] )
+            self.conn.execute( 'UPDATE ' + self.TABLE + ' SET visit = ? WHERE file IN ({})'.format( placeholders ), [ self.visit ] + batch )
+
+    def get( self, rel, stat_result ):
+
+        entry = self.entries.get( rel )
+        if entry is not None and entry[0] == stat_result.st_size and entry[1] == stat_result.st_mtime_ns and entry[2] == stat_result.st_ino:
+            return entry[3]
+
+        return None
+
+    def set( self, rel, stat_result, checksum ):
+
+        if stat_result.st_mtime_ns >= ( time.time() - self.RACY_SECONDS ) * 1e9:
+            self._pending[ rel ] = None
+        else:
+            self._pending[ rel ] = [ stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino, checksum ]
+
+    def discard( self, rel ):
+        self._pending[ rel ] = None
+
+    def evict( self ):
+
+        self.save()
+        self.conn.execute( 'DELETE FROM ' + self.TABLE + ' WHERE visit != ?', ( self.visit, ) )
+        self.conn.commit()
+
+    def save( self ):
+
+        """Write the entries set since the last save"""
+
+        self.conn.executemany( 'DELETE FROM ' + self.TABLE + ' WHERE file = ?', [ ( rel, ) for rel, entry in self._pending.items() if entry is None ] )
+        self.conn.executemany( 'INSERT OR REPLACE INTO ' + self.TABLE + ' VALUES ( ?, ?, ?, ?, ?, ? )',
+                               [ [ rel ] + entry + [ self.visit ] for rel, entry in self._pending.items() if entry is not None ] )
+        self.conn.commit()
+        self._pending = {}
+
+    def close( self ):
+        self.conn.close()
@@ -0,0 +1,116 @@
+from parent_class import ParentClass
+import concurrent.futures
+import hashlib
+import threading
+import time
+import os
+
+
+CHUNK_SIZE = 8 * 1024 * 1024 #8 MB
+
+_local = threading.local()
+
+
+def _get_buffer( chunk_size ):
+
+    """Return a buffer reused by every file hashed on this thread/process"""
+
+    buffer = getattr( _local, 'buffer', None )
+    if buffer is None or len( buffer ) != chunk_size:
+        buffer = bytearray( chunk_size )
+        _local.buffer = buffer
+
+    return buffer
+
+
+def hash_file( filepath, chunk_size = CHUNK_SIZE ):
+
+    """Return the md5 checksum and size of a file, streaming it in fixed-size chunks"""
+
+    buffer = _get_buffer( chunk_size )
+    view = memoryview( buffer )
+
+    md5 = hashlib.md5()
+    n_bytes = 0
+
+    with open( filepath, 'rb', buffering = 0 ) as file:
+        while True:
+            n = file.readinto( buffer )
+            if not n:
+                break
+            md5.update( view[:n] )
+            n_bytes += n
+
+    return md5.hexdigest(), n_bytes
+
+
+def _hash_if_exists( filepath, chunk_size = CHUNK_SIZE ):
+
+    """Return the checksum and size of a file, or None and 0 if it was removed since the walk"""
+
+    try:
+        return hash_file( filepath, chunk_size )
+    except FileNotFoundError:
+        return None, 0
+
+
+class Hasher( ParentClass ):
+
+    """Hashes many files at once across a thread or process pool.
+    hashlib and file reads release the GIL, so threads scale well for most disks"""
+
+    EXECUTORS = {
+        'thread': concurrent.futures.ThreadPoolExecutor,
+        'process': concurrent.futures.ProcessPoolExecutor
+    }
+
+    def __init__( self, workers = None, executor = 'thread', chunk_size = CHUNK_SIZE ):
+
+        ParentClass.__init__( self )
+
+        if workers is None:
+            workers = min( 32, ( os.cpu_count() or 1 ) + 4 )
+
+        self.workers = max( 1, int( workers ) )
+        self.executor = executor if executor in self.EXECUTORS else 'thread'
+        self.chunk_size = int( chunk_size )
+
+        self.n_files = 0
+        self.n_bytes = 0
+        self.seconds = 0.0
+
+    def hash_paths( self, paths ):
+
+        """Return the checksums of the given file paths, in the same order, None for the ones no longer there"""
+
+        paths = list( paths )
+        if len( paths ) == 0:
+            return []
+
+        start = time.perf_counter()
+
+        if self.workers == 1 or len( paths ) == 1:
+            results = [ _hash_if_exists( path, self.chunk_size ) for path in paths ]
+
+        else:
+            with self.EXECUTORS[ self.executor ]( max_workers = self.workers ) as executor:
+                results = list( executor.map( _hash_if_exists, paths, [ self.chunk_size ] * len( paths ) ) )
+
+        self.seconds += time.perf_counter() - start
+        self.n_files += sum( checksum is not None for checksum, n_bytes in results )
+        self.n_bytes += sum( n_bytes for checksum, n_bytes in results )
+
+        return [ checksum for checksum, n_bytes in results ]
+
+    def get_throughput( self ):
+
+        """Return hashing throughput in MB/s"""
+
+        if self.seconds == 0:
+            return 0.0
+        return self.n_bytes / 1024**2 / self.seconds
+
+    def print_throughput( self ):
+
+        if self.n_files > 0:
+            print ( 'Hashed {} files ({:.1f} MB) at {:.1f} MB/s'.format( self.n_files, self.n_bytes / 1024**2, self.get_throughput() ) )
@@ -0,0 +1,233 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import re
+import os
+
+
+def _translate( pattern ):
+
+    """Return ( regex, negated, dir_only ) for one gitignore-style pattern, or None for blank lines and comments"""
+
+    pattern = pattern.rstrip( '\n' )
+
+    # trailing spaces are ignored unless escaped
+    stripped = pattern.rstrip( ' ' )
+    if stripped.endswith( '\\' ) and len( stripped ) < len( pattern ):
+        stripped += ' '
+    pattern = stripped
+
+    if pattern == '' or pattern.startswith( '#' ):
+        return None
+
+    negated = pattern.startswith( '!' )
+    if negated:
+        pattern = pattern[1:]
+    elif pattern.startswith( '\\!' ) or pattern.startswith( '\\#' ):
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith( '/' )
+    pattern = pattern.rstrip( '/' )
+    if pattern == '':
+        return None
+
+    # a slash anywhere but the end anchors the pattern to the data dir, otherwise it matches at any depth
+    anchored = '/' in pattern
+    pattern = pattern.lstrip( '/' )
+
+    regex = ''
+    i = 0
+    while i < len( pattern ):
+
+        if pattern.startswith( '**/', i ) and ( i == 0 or pattern[ i - 1 ] == '/' ):
+            regex += '(?:.*/)?'
+            i += 3
+
+        elif pattern.startswith( '**', i ) and ( i == 0 or pattern[ i - 1 ] == '/' ) and i + 2 == len( pattern ):
+            regex += '.*'
+            i += 2
+
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+
+        elif pattern[i] == '[':
+            end = pattern.find( ']', i + 2 )
+            if end == -1:
+                regex += re.escape( '[' )
+                i += 1
+                continue
+
+            # like every other wildcard, a class never matches the delimiter
+            characters = pattern[ i + 1 : end ].replace( '\\', '\\\\' )
+            if characters[0] in '!^':
+                regex += '[^/' + characters[1:] + ']'
+            else:
+                regex += '(?!/)[' + characters + ']'
+            i = end + 1
+
+        elif pattern[i] == '\\' and i + 1 < len( pattern ):
+            regex += re.escape( pattern[ i + 1 ] )
+            i += 2
+
+        else:
+            regex += re.escape( pattern[i] )
+            i += 1
+
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+
+    return regex, negated, dir_only
+
+
+class Ignore( ParentClass ):
+
+    """gitignore-style rules, matched against paths relative to the data dir with '/' as the delimiter.
+
+    *, ? and [abc] match within one path component, ** across any number of them,
+    a trailing / only matches folders, a leading ! re-includes what an earlier rule ignored,
+    and a rule without a slash before its end matches at any depth. The last matching rule wins;
+    as with git, nothing inside an ignored folder can be re-included"""
+
+    def __init__( self, lines = [] ):
+
+        ParentClass.__init__( self )
+
+        self.rules = [ rule for rule in ( _translate( line ) for line in lines ) if rule is not None ]
+        self._groups = self._compile( self.rules )
+        self._dirs = {} # rel_dir: whether it, or a folder above it, is ignored
+
+    def __len__( self ):
+        return len( self.rules )
+
+    def _compile( self, rules ):
+
+        """Merge each run of rules with the same sign into one regex for files and one for folders.
+        Only the sign of the last matching rule matters, so the runs are tried from last to first"""
+
+        groups = []
+        for regex, negated, dir_only in rules:
+            if len( groups ) == 0 or groups[-1][0] != negated:
+                groups.append( ( negated, [], [] ) )
+            groups[-1][2].append( regex )
+            if not dir_only:
+                groups[-1][1].append( regex )
+
+        def combine( regexes ):
+            if len( regexes ) == 0:
+                return None
+            return re.compile( '(?:' + '|'.join( regexes ) + ')\\Z' )
+
+        return [ ( negated, combine( file_regexes ), combine( dir_regexes ) ) for negated, file_regexes, dir_regexes in reversed( groups ) ]
+
+    def match( self, rel_path, is_dir = False ):
+
+        """Return whether the rules ignore this path itself, regardless of the folders above it"""
+
+        for negated, file_regex, dir_regex in self._groups:
+            regex = dir_regex if is_dir else file_regex
+            if regex is not None and regex.match( rel_path ):
+                return not negated
+
+        return False
+
+    def is_ignored( self, rel_path ):
+
+        """Return whether a file is ignored, by its own path or by any folder above it"""
+
+        if len( self.rules ) == 0:
+            return False
+
+        index = rel_path.rfind( '/' )
+        if index != -1 and self.is_dir_ignored( rel_path[ :index ] ):
+            return True
+        return self.match( rel_path )
+
+    def is_dir_ignored( self, rel_dir ):
+
+        """Return whether a folder is ignored, by its own path or by any folder above it"""
+
+        if len( self.rules ) == 0:
+            return False
+
+        ignored = self._dirs.get( rel_dir )
+        if ignored is None:
+
+            index = rel_dir.rfind( '/' )
+            ignored = ( index != -1 and self.is_dir_ignored( rel_dir[ :index ] ) ) or self.match( rel_dir, is_dir = True )
+            self._dirs[ rel_dir ] = ignored
+
+        return ignored
+
+
+class Scope( Ignore ):
+
+    """The part of the data dir a scoped sync is limited to, as gitignore-style patterns that select instead of ignore.
+    Patterns are relative to the data dir: raw/2026-10/ is that folder, raw/*.csv the csvs directly inside raw,
+    and **/*.csv any csv. Only the folders named before the first wildcard of a pattern are walked"""
+
+    def __init__( self, patterns ):
+
+        if isinstance( patterns, str ):
+            patterns = [ patterns ]
+
+        # anchor every pattern to the data dir, ** still matches at any depth
+        lines = []
+        for pattern in patterns:
+            negated = pattern.startswith( '!' )
+            pattern = pattern[1:] if negated else pattern
+            lines.append( ( '!' if negated else '' ) + '/' + pattern.lstrip( '/' ) )
+
+        Ignore.__init__( self, lines )
+        self.roots = self._get_roots( [ line for line in lines if not line.startswith( '!' ) ] )
+
+    def _get_roots( self, lines ):
+
+        """Return the fixed leading part of each pattern, leaving out any inside another; '' is the whole data dir"""
+
+        roots = set()
+        for line in lines:
+
+            components = []
+            for component in line.strip( '/' ).split( '/' ):
+                if any( character in component for character in '*?[\\' ):
+                    break
+                components.append( component )
+            roots.add( '/'.join( components ) )
+
+        return [ root for root in sorted( roots, key = kabbes_s3synchrony.sort_key )
+                 if not any( other != root and ( other == '' or root.startswith( other + '/' ) ) for other in roots ) ]
+
+    def contains( self, rel_path ):
+        """Return whether a file is within the scope"""
+        return self.is_ignored( rel_path )
+
+    def iter_files( self, root, folders_to_skip = [], ignore = None ):
+
+        """Like iter_files, but only walking the roots of the scope and only yielding files within it"""
+
+        for rel_root in self.roots:
+
+            path = os.path.join( root, rel_root )
+            if rel_root == '':
+                entries = kabbes_s3synchrony.iter_files( root, folders_to_skip = folders_to_skip, ignore = ignore )
+
+            elif os.path.isdir( path ):
+                if ignore is not None and ignore.is_dir_ignored( rel_root ):
+                    continue
+                entries = kabbes_s3synchrony.iter_files( path, folders_to_skip = folders_to_skip, ignore = ignore, rel_dir = rel_root )
+
+            elif os.path.isfile( path ):
+                if ignore is not None and ignore.is_ignored( rel_root ):
+                    continue
+                entries = [ ( rel_root, path, os.stat( path ) ) ]
+
+            else:
+                continue
+
+            for rel_path, file_path, stat_result in entries:
+                if self.contains( rel_path ):
+                    yield rel_path, file_path, stat_result
@@ -0,0 +1,237 @@
+from parent_class import ParentClass
+import datetime as dt
+import pandas as pd
+import random
+import json
+import time
+import os
+
+
+class Journal( ParentClass ):
+
+    """The remote versions and deleted records, kept as an append-only journal of what each sync changed.
+
+    journal/HEAD.json:                names the sequence number of the latest snapshot
+    journal/snapshots/<seq>/:         the versions and deleted records as of that entry; seq 0 is the records in the util dir itself
+    journal/entries/<seq>.json:       the rows one sync upserted into the versions, removed from them and added to the deleted record
+
+    Entries are created with If-None-Match, so of two syncs appending at once one gets the next number and the other
+    catches up and appends after it; HEAD.json is replaced with If-Match. Every compact_every entries a sync writes a new snapshot"""
+
+    DIGITS = 12
+    RETRIES = 10
+
+    def __init__( self, Platform, compact_every = 100 ):
+
+        ParentClass.__init__( self )
+
+        self.Platform = Platform
+        self.compact_every = max( 1, int( compact_every ) )
+
+        self._rDir = Platform._util_rDir.join_Dir( path = 'journal' )
+        self._head_rPath = self._rDir.join_Path( path = 'HEAD.json' )
+        self._state_path = os.path.join( Platform._util_lDir.path, 'journal.json' )
+
+        self.seq = 0         # last entry applied
+        self.head_seq = 0    # entry of the latest snapshot
+        self.head_etag = None
+        self.versions = {}   # file: row
+        self.deleted = []    # rows
+
+    def _get_entry_rPath( self, seq ):
+        return self._rDir.join_Dir( path = 'entries' ).join_Path( path = str( seq ).zfill( self.DIGITS ) + '.json' )
+
+    def _get_snapshot_rPaths( self, seq ):
+
+        if seq == 0:
+            return self.Platform._remote_versions_rPath, self.Platform._remote_delete_rPath
+
+        snapshot_rDir = self._rDir.join_Dir( path = 'snapshots' ).join_Dir( path = str( seq ).zfill( self.DIGITS ) )
+        return ( snapshot_rDir.join_Path( path = self.Platform._remote_versions_lPath.filename ),
+                 snapshot_rDir.join_Path( path = self.Platform._remote_delete_lPath.filename ) )
+
+    def _rows( self, df ):
+        return [ tuple( None if pd.isna( value ) else value for value in row )
+                 for row in df.reindex( columns = self.Platform.columns ).itertuples( index = False, name = None ) ]
+
+    def _read_local( self ):
+
+        self.versions = { row[0]: row for row in self._rows( self.Platform.Manifest.read( self.Platform._remote_versions_lPath ) ) }
+        self.deleted = self._rows( self.Platform.Manifest.read( self.Platform._remote_delete_lPath ) )
+
+    def _write_local( self ):
+
+        """Write the versions and deleted records for the Snapshot to read, then read them back the way it will"""
+
+        self.Platform.Manifest.write( pd.DataFrame( list( self.versions.values() ), columns = self.Platform.columns ), self.Platform._remote_versions_lPath )
+        self.Platform.Manifest.write( pd.DataFrame( self.deleted, columns = self.Platform.columns ), self.Platform._remote_delete_lPath )
+        self._read_local()
+        self._save_state()
+
+    def _save_state( self ):
+
+        with open( self._state_path, 'w' ) as file:
+            json.dump( { 'seq': self.seq, 'head_etag': self.head_etag }, file )
+
+    def _is_local_current( self ):
+
+        """Return whether the local records can be caught up by entries alone. They can't when they are older
+        than the snapshot, when the journal they came from was reset since, or when they are the records in the util dir"""
+
+        try:
+            with open( self._state_path ) as file:
+                state = json.load( file )
+            local_seq = int( state['seq'] )
+        except ( OSError, ValueError, KeyError, TypeError ):
+            return False
+
+        if not self.Platform.Manifest.exists( self.Platform._remote_versions_lPath ) or not self.Platform.Manifest.exists( self.Platform._remote_delete_lPath ):
+            return False
+
+        if local_seq == 0:
+            return False
+        elif local_seq == self.head_seq:
+            if state.get( 'head_etag' ) != self.head_etag:
+                return False
+        elif local_seq < self.head_seq:
+            return False
+        elif self.Platform._download_bytes_if_exists( self._get_entry_rPath( local_seq ) )[0] is None:
+            return False
+
+        self.seq = local_seq
+        return True
+
+    def load( self ):
+
+        """Bring the local copy of the remote records up to the last entry, downloading a snapshot only when ours is older"""
+
+        data, self.head_etag = self.Platform._download_bytes_if_exists( self._head_rPath )
+        self.head_seq = 0 if data is None else int( json.loads( data )['seq'] )
+
+        if not self._is_local_current():
+            versions_rPath, deleted_rPath = self._get_snapshot_rPaths( self.head_seq )
+            self.Platform._download_manifest( versions_rPath, self.Platform._remote_versions_lPath )
+            self.Platform._download_manifest( deleted_rPath, self.Platform._remote_delete_lPath )
+            self.seq = self.head_seq
+
+        self._read_local()
+        self._read_entries()
+        self._write_local()
+
+    def _read_entries( self ):
+
+        """Apply every entry after the last one applied"""
+
+        while True:
+            data, etag = self.Platform._download_bytes_if_exists( self._get_entry_rPath( self.seq + 1 ) )
+            if data is None:
+                return
+
+            self._apply( json.loads( data ) )
+            self.seq += 1
+
+    def _apply( self, entry ):
+
+        for rel_path in entry['remove']:
+            self.versions.pop( rel_path, None )
+        for row in entry['upsert']:
+            self.versions[ row[0] ] = tuple( row )
+        self.deleted.extend( tuple( row ) for row in entry['deleted'] )
+
+    def commit( self, df_versions, df_deleted, scope = None ):
+
+        """Append what changed since load to the journal, catching up with anyone who appended first.
+        The deleted record is only ever appended to, so the rows past the ones loaded are the new ones.
+        Given a Scope, the records passed only hold the files within it"""
+
+        loaded_versions = self.versions
+        n_loaded_deleted = len( self.deleted )
+        if scope is not None:
+            loaded_versions = { rel_path: row for rel_path, row in self.versions.items() if scope.contains( rel_path ) }
+            n_loaded_deleted = sum( 1 for row in self.deleted if scope.contains( row[0] ) )
+
+        versions = { row[0]: row for row in self._rows( df_versions ) }
+        entry = {
+            'user': self.Platform.Connection.cfg['_name'],
+            'time': dt.datetime.now().strftime( self.Platform.dttm_format ),
+            'upsert': [ list( row ) for rel_path, row in versions.items() if loaded_versions.get( rel_path ) != row ],
+            'remove': [ rel_path for rel_path in loaded_versions if rel_path not in versions ],
+            'deleted': [ list( row ) for row in self._rows( df_deleted )[ n_loaded_deleted: ] ]
+        }
+
+        if len( entry['upsert'] ) == 0 and len( entry['remove'] ) == 0 and len( entry['deleted'] ) == 0:
+            return False
+
+        for attempt in range( self.RETRIES ):
+
+            entry['seq'] = self.seq + 1
+            data = json.dumps( entry ).encode()
+            if self.Platform._upload_bytes_if( data, self._get_entry_rPath( entry['seq'] ) ) is not None:
+                break
+
+            # someone appended this entry first, apply theirs and take the next one
+            self.Platform.metrics.add( 'journal_conflicts' )
+            self._read_entries()
+            time.sleep( random.uniform( 0, 0.05 * 2**attempt ) )
+
+        else:
+            raise RuntimeError( 'Could not append to the journal after ' + str( self.RETRIES ) + ' attempts' )
+
+        self._apply( entry )
+        self.seq = entry['seq']
+        self._write_local()
+
+        if self.seq - self.head_seq >= self.compact_every:
+            self.compact()
+        return True
+
+    def compact( self ):
+
+        """Upload the records as a snapshot of the current entry and point HEAD.json at it.
+        Entries and snapshots older than the previous snapshot go, readers still catching up from it keep what they need"""
+
+        versions_rPath, deleted_rPath = self._get_snapshot_rPaths( self.seq )
+        versions_rPath.upload( Destination = self.Platform._remote_versions_lPath, override = True )
+        deleted_rPath.upload( Destination = self.Platform._remote_delete_lPath, override = True )
+
+        data = json.dumps( { 'seq': self.seq } ).encode()
+        etag = self.Platform._upload_bytes_if( data, self._head_rPath, if_match = self.head_etag )
+
+        if etag is None: # someone else compacted first
+            snapshot_Paths = self.Platform.PATHS_CLASS()
+            snapshot_Paths._add( versions_rPath )
+            snapshot_Paths._add( deleted_rPath )
+            self.Platform._remove_from_remote( snapshot_Paths )
+            return False
+
+        previous_seq = self.head_seq
+        self.head_seq = self.seq
+        self.head_etag = etag
+        self._save_state()
+
+        stale_Paths = self.Platform.PATHS_CLASS()
+        for rel_path in self.Platform._list_rel_paths( self._rDir ):
+
+            parts = rel_path.split( '/' )
+            if len( parts ) < 2:
+                continue
+
+            if parts[0] == 'entries' and parts[1].endswith( '.json' ) and parts[1][ :-5 ].isdigit():
+                stale = int( parts[1][ :-5 ] ) <= previous_seq
+            elif parts[0] == 'snapshots' and parts[1].isdigit():
+                stale = int( parts[1] ) < previous_seq
+            else:
+                continue
+
+            if stale:
+                stale_Paths._add( self._rDir.join_Path( path = rel_path ) )
+
+        if len( stale_Paths ) > 0:
+            self.Platform._remove_from_remote( stale_Paths )
+        return True
+
+    def get_fingerprint_paths( self ):
+
+        """Paths whose versions change whenever the journal does"""
+
+        return [ self._head_rPath.path, self._get_entry_rPath( self.seq + 1 ).path ]
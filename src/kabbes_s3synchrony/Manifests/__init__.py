@@ -0,0 +1,13 @@
+import importlib
+
+
+def __getattr__( name: str ):
+
+    """Import each manifest module on first use"""
+
+    try:
+        return importlib.import_module( '.' + name, __name__ )
+    except ModuleNotFoundError as e:
+        if e.name != __name__ + '.' + name:
+            raise
+        raise AttributeError( 'module ' + repr( __name__ ) + ' has no attribute ' + repr( name ) )
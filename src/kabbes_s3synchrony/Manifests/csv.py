@@ -0,0 +1,14 @@
+from ..BaseManifest import BaseManifest
+
+
+class Manifest( BaseManifest ):
+
+    """The original plain csv manifests"""
+
+    EXTENSION = '.csv'
+
+    def _read( self, path ):
+        return self._read_csv( path )
+
+    def _write( self, df, path ):
+        df.to_csv( path, index = False )
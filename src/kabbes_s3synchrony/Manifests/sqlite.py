@@ -0,0 +1,207 @@
+import kabbes_s3synchrony
+from ..BaseManifest import BaseManifest
+import pandas as pd
+import datetime as dt
+import sqlite3
+import shutil
+import os
+
+
+def _checksum_to_blob( checksum ):
+
+    """md5 hex digests are stored as bytes, anything else as text"""
+
+    if isinstance( checksum, str ) and len( checksum ) == 32:
+        try:
+            return bytes.fromhex( checksum )
+        except ValueError:
+            pass
+    return checksum
+
+
+def _blob_to_checksum( blob ):
+
+    if isinstance( blob, bytes ):
+        return blob.hex()
+    return blob
+
+
+class Manifest( BaseManifest ):
+
+    """Manifests stored as an indexed SQLite table, keyed by file path.
+    Times are stored as integer seconds and md5 checksums as 16 byte blobs"""
+
+    EXTENSION = '.db'
+    TABLE = 'versions'
+    LOOKUP_BATCH = 500 # stays under SQLite's bound parameter limit
+    STREAM_BATCH = 10000
+    EPOCH = dt.datetime( 1970, 1, 1 )
+
+    def _connect( self, path ):
+        return sqlite3.connect( path )
+
+    def _read( self, path ):
+
+        with self._connect( path ) as conn:
+            df = pd.read_sql_query( 'SELECT file, editor, time, checksum FROM ' + self.TABLE + ' ORDER BY file', conn )
+
+        return self._from_table( df )
+
+    def _write( self, df, path ):
+
+        conn = self._create( path + '.tmp' )
+        try:
+            conn.executemany( 'INSERT INTO ' + self.TABLE + ' VALUES ( ?, ?, ?, ? )', self._to_table( df ).itertuples( index = False, name = None ) )
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace( path + '.tmp', path )
+
+    def _create( self, path ):
+
+        if os.path.exists( path ):
+            os.remove( path )
+
+        conn = self._connect( path )
+        conn.execute( 'CREATE TABLE ' + self.TABLE + ' ( file TEXT PRIMARY KEY, editor TEXT, time INTEGER, checksum TEXT ) WITHOUT ROWID' )
+        return conn
+
+    def lookup( self, lPath, rel_paths ):
+
+        if not os.path.exists( lPath.path ):
+            return BaseManifest.lookup( self, lPath, rel_paths )
+
+        rel_paths = list( rel_paths )
+        dfs = [ self._from_table( pd.DataFrame( columns = [ 'file', 'editor', 'time', 'checksum' ] ) ) ]
+
+        with self._connect( lPath.path ) as conn:
+            for i in range( 0, len( rel_paths ), self.LOOKUP_BATCH ):
+                batch = rel_paths[ i : i + self.LOOKUP_BATCH ]
+                query = 'SELECT file, editor, time, checksum FROM ' + self.TABLE + ' WHERE file IN ({})'.format( ','.join( '?' * len( batch ) ) )
+                dfs.append( self._from_table( pd.read_sql_query( query, conn, params = batch ) ) )
+
+        return pd.concat( dfs, ignore_index = True )
+
+    def _select_roots( self, conn, Scope ):
+
+        """Return the table rows underneath the roots of the Scope, found through the primary key"""
+
+        if '' in Scope.roots:
+            return conn.execute( 'SELECT file, editor, time, checksum FROM ' + self.TABLE ).fetchall()
+
+        rows = []
+        for root in Scope.roots:
+            # '0' is the character after '/', so the range is everything inside the folder root
+            rows.extend( conn.execute( 'SELECT file, editor, time, checksum FROM ' + self.TABLE + ' WHERE file = ? OR ( file >= ? AND file < ? )',
+                                       ( root, root + '/', root + '0' ) ).fetchall() )
+        return rows
+
+    def read_scope( self, lPath, Scope ):
+
+        if not os.path.exists( lPath.path ):
+            return BaseManifest.read_scope( self, lPath, Scope )
+
+        with self._connect( lPath.path ) as conn:
+            rows = [ row for row in self._select_roots( conn, Scope ) if Scope.contains( row[0] ) ]
+
+        return self._from_table( pd.DataFrame( rows, columns = [ 'file', 'editor', 'time', 'checksum' ] ) )
+
+    def replace_scope( self, df, lPath, Scope ):
+
+        """Delete and insert only the rows within the Scope, in a copy that then replaces the manifest"""
+
+        if not os.path.exists( lPath.path ):
+            return BaseManifest.replace_scope( self, df, lPath, Scope )
+
+        tmp_path = lPath.path + '.tmp'
+        shutil.copyfile( lPath.path, tmp_path )
+
+        conn = self._connect( tmp_path )
+        try:
+            rel_paths = [ ( row[0], ) for row in self._select_roots( conn, Scope ) if Scope.contains( row[0] ) ]
+            conn.executemany( 'DELETE FROM ' + self.TABLE + ' WHERE file = ?', rel_paths )
+            conn.executemany( 'INSERT OR REPLACE INTO ' + self.TABLE + ' VALUES ( ?, ?, ?, ? )', self._to_table( df ).itertuples( index = False, name = None ) )
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace( tmp_path, lPath.path )
+
+    def iter_sorted( self, lPath ):
+
+        """Stream the table in the order iter_files visits paths, a batch of rows at a time"""
+
+        if not os.path.exists( lPath.path ):
+            yield from BaseManifest.iter_sorted( self, lPath )
+            return
+
+        conn = self._connect( lPath.path )
+        try:
+            cursor = conn.execute( "SELECT file, editor, time, checksum FROM " + self.TABLE + " ORDER BY replace( file, '/', char(1) )" )
+            while True:
+                rows = cursor.fetchmany( self.STREAM_BATCH )
+                if len( rows ) == 0:
+                    break
+
+                for file, editor, time, checksum in rows:
+                    if time is not None:
+                        time = ( self.EPOCH + dt.timedelta( seconds = time ) ).strftime( self.Platform.dttm_format )
+                    yield file, editor, time, _blob_to_checksum( checksum )
+        finally:
+            conn.close()
+
+    def open_writer( self, lPath ):
+        return Writer( self, lPath )
+
+    def _to_table( self, df ):
+
+        """Convert a versions dataframe into table rows, with times as integer seconds"""
+
+        P = self.Platform
+
+        # the latest entry for a file wins, like drop_duplicates( keep='last' ) elsewhere
+        df = df.dropna( subset = [ P._file_colname ] ).drop_duplicates( [ P._file_colname ], keep = 'last' )
+        times = pd.to_datetime( df[ P._time_colname ], format = P.dttm_format )
+
+        return pd.DataFrame( {
+            'file': df[ P._file_colname ].astype( str ),
+            'editor': df[ P._editor_colname ],
+            'time': ( times - pd.Timestamp( 0 ) ) // pd.Timedelta( seconds = 1 ),
+            'checksum': [ _checksum_to_blob( checksum ) for checksum in df[ P._hash_colname ] ]
+        } ).astype( object ).where( lambda table: table.notna(), None )
+
+    def _from_table( self, table ):
+
+        P = self.Platform
+        times = pd.to_datetime( pd.to_numeric( table['time'] ), unit = 's' ).dt.strftime( P.dttm_format )
+
+        return pd.DataFrame( {
+            P._file_colname: table['file'].astype( object ),
+            P._editor_colname: table['editor'].astype( object ),
+            P._time_colname: times.astype( object ),
+            P._hash_colname: [ _blob_to_checksum( blob ) for blob in table['checksum'] ]
+        }, columns = self.columns )
+
+
+class Writer( kabbes_s3synchrony.ManifestWriter ):
+
+    """Inserts each part into a new table as it comes, which replaces the manifest once closed"""
+
+    def __init__( self, Manifest, lPath ):
+
+        kabbes_s3synchrony.ManifestWriter.__init__( self, Manifest, lPath )
+        self.tmp_path = lPath.path + '.tmp'
+        self.conn = Manifest._create( self.tmp_path )
+
+    def append( self, df ):
+
+        # parts hold different files, but the latest row for a file still wins
+        self.conn.executemany( 'INSERT OR REPLACE INTO ' + self.Manifest.TABLE + ' VALUES ( ?, ?, ?, ? )',
+                               self.Manifest._to_table( df ).itertuples( index = False, name = None ) )
+
+    def close( self ):
+
+        self.conn.commit()
+        self.conn.close()
+        os.replace( self.tmp_path, self.lPath.path )
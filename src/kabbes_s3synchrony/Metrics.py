@@ -0,0 +1,112 @@
+from parent_class import ParentClass
+import datetime as dt
+import contextlib
+import threading
+import bisect
+import json
+import time
+
+
+class Metrics( ParentClass ):
+
+    """Timing and counts of one synchronization, written as a single JSON line.
+
+    phases:      seconds spent in each named phase, a phase may contain others
+    counts:      totals such as files hashed or request retries
+    operations:  per transfer function, the calls, failures, bytes moved and a latency histogram"""
+
+    # upper bounds of the latency histogram buckets, in milliseconds
+    LATENCY_BUCKETS_MS = ( 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000 )
+
+    def __init__( self ):
+
+        ParentClass.__init__( self )
+
+        self.time = dt.datetime.now().astimezone().isoformat( timespec = 'seconds' )
+        self.phases = {}
+        self.counts = {}
+        self.operations = {}
+
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase( self, name ):
+
+        """Add the seconds spent inside the with block to the phase"""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.phases[ name ] = self.phases.get( name, 0.0 ) + seconds
+
+    def add( self, name, n = 1 ):
+
+        with self._lock:
+            self.counts[ name ] = self.counts.get( name, 0 ) + n
+
+    def _get_operation( self, name ):
+
+        if name not in self.operations:
+            self.operations[ name ] = {
+                'calls': 0,
+                'failed': 0,
+                'bytes': 0,
+                'seconds': 0.0,
+                'wall_seconds': 0.0,
+                'max_seconds': 0.0,
+                'histogram': [ 0 ] * ( len( self.LATENCY_BUCKETS_MS ) + 1 ) # the last bucket is everything slower
+            }
+        return self.operations[ name ]
+
+    def observe( self, name, seconds, success = True ):
+
+        """Record the latency of one call of a transfer function, from any thread"""
+
+        bucket = bisect.bisect_left( self.LATENCY_BUCKETS_MS, seconds * 1000 )
+
+        with self._lock:
+            operation = self._get_operation( name )
+            operation['calls'] += 1
+            operation['seconds'] += seconds
+            operation['max_seconds'] = max( operation['max_seconds'], seconds )
+            operation['histogram'][ bucket ] += 1
+            if not success:
+                operation['failed'] += 1
+
+    def add_bytes( self, name, n_bytes ):
+
+        with self._lock:
+            self._get_operation( name )['bytes'] += n_bytes
+
+    def add_wall_seconds( self, name, seconds ):
+
+        """Add the time from the first call of a batch of transfers to the last one finishing, for the effective throughput"""
+
+        with self._lock:
+            self._get_operation( name )['wall_seconds'] += seconds
+
+    def get_record( self, **fields ):
+
+        """Return everything measured so far as a dict, starting with the given fields"""
+
+        record = dict( fields )
+        record['time'] = self.time
+        record['seconds'] = round( time.perf_counter() - self._start, 6 )
+        record['phases'] = { name: round( seconds, 6 ) for name, seconds in self.phases.items() }
+        record['counts'] = dict( self.counts )
+        record['latency_buckets_ms'] = list( self.LATENCY_BUCKETS_MS )
+        record['operations'] = { name: dict( operation, seconds = round( operation['seconds'], 6 ), wall_seconds = round( operation['wall_seconds'], 6 ),
+                                             max_seconds = round( operation['max_seconds'], 6 ) )
+                                 for name, operation in self.operations.items() }
+        return record
+
+    def write( self, path, record ):
+
+        """Append the record to a JSON lines file"""
+
+        with open( path, 'a' ) as file:
+            file.write( json.dumps( record ) + '\n' )
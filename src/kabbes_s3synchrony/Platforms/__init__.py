@@ -1 +1,13 @@
-from . import s3
\ No newline at end of file
+import importlib
+
+
+def __getattr__( name: str ):
+
+    """Import each platform module on first use"""
+
+    try:
+        return importlib.import_module( '.' + name, __name__ )
+    except ModuleNotFoundError as e:
+        if e.name != __name__ + '.' + name:
+            raise
+        raise AttributeError( 'module ' + repr( __name__ ) + ' has no attribute ' + repr( name ) )
@@ -0,0 +1,155 @@
+import kabbes_s3synchrony
+from ..BasePlatform import BasePlatform
+import dir_ops as do
+import hashlib
+import shutil
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _copy_file( source, destination ):
+
+    """Copy a file into place through a temporary file, creating its parent folders"""
+
+    os.makedirs( os.path.dirname( destination ), exist_ok = True )
+    tmp_path = destination + '.' + os.urandom( 8 ).hex() + '.part'
+
+    try:
+        shutil.copyfile( source, tmp_path )
+        os.replace( tmp_path, destination )
+    finally:
+        if os.path.exists( tmp_path ):
+            os.remove( tmp_path )
+
+    return True
+
+
+class RemoteDir( do.Dir ):
+
+    """A folder of the local "remote", with the upload and download methods of a remote Dir"""
+
+    def __init__( self, *args, **kwargs ):
+
+        do.Dir.__init__( self, *args, **kwargs )
+        self.DIR_CLASS = RemoteDir
+        self.PATH_CLASS = RemotePath
+        self.DIRS_CLASS = do.Dirs
+        self.PATHS_CLASS = do.Paths
+
+    def download( self, Destination = None, **kwargs ):
+
+        for rel_path, path, stat_result in kabbes_s3synchrony.iter_files( self.path ):
+            _copy_file( path, Destination.join( rel_path ) )
+        return True
+
+
+class RemotePath( RemoteDir, do.Path ):
+
+    """A file of the local "remote", with the upload and download methods of a remote Path"""
+
+    def __init__( self, *args, **kwargs ):
+
+        do.Path.__init__( self, *args, **kwargs )
+        self.DIR_CLASS = RemoteDir
+        self.PATH_CLASS = RemotePath
+        self.DIRS_CLASS = do.Dirs
+        self.PATHS_CLASS = do.Paths
+
+    def upload( self, Destination = None, **kwargs ):
+        return _copy_file( Destination.path, self.path )
+
+    def download( self, Destination = None, **kwargs ):
+        return _copy_file( self.path, Destination.path )
+
+    def copy( self, Destination = None, **kwargs ):
+        return _copy_file( self.path, Destination.path )
+
+
+class Platform( BasePlatform ):
+
+    """Treats a second local folder, remote_root, as the remote.
+    Useful for syncing to a mounted drive and for benchmarking without AWS"""
+
+    NAME = do.Path( os.path.abspath( __file__ ) ).root #local
+
+    DIR_CLASS = RemoteDir
+    DIRS_CLASS = do.Dirs
+    PATH_CLASS = RemotePath
+    PATHS_CLASS = do.Paths
+
+    def __init__(self, *args, **kwargs ):
+
+        BasePlatform.__init__( self, *args, **kwargs )
+
+        self.data_rDir = RemoteDir( os.path.join( self.cfg['remote_root'], self.Connection.cfg['remote_data_dir'] ) )
+
+        self._util_rDir = self.data_rDir.join_Dir( path = self.UTIL_DIR ) #RemoteDir
+        self._util_deleted_rDir = self._util_rDir.join_Dir( path = 'deleted' ) #RemoteDir
+        self._remote_versions_rPath = self._util_rDir.join_Path( path = self._remote_versions_lPath.filename )
+        self._remote_delete_rPath = self._util_rDir.join_Path( path = self._remote_delete_lPath.filename )
+
+    def _list_remote_versions( self ):
+        """The remote is local, hashing it is as cheap as listing it."""
+        return self._compute_directory( self.data_rDir )
+
+    def _upload_bytes( self, data, rPath ):
+
+        os.makedirs( os.path.dirname( rPath.path ), exist_ok = True )
+        with open( rPath.path, 'wb' ) as file:
+            file.write( data )
+        return True
+
+    def _download_bytes( self, rPath ):
+
+        with open( rPath.path, 'rb' ) as file:
+            return file.read()
+
+    def _upload_bytes_if( self, data, rPath, if_match = None ):
+
+        """Create the file with a hard link, which fails if it exists, or replace it under a lock file.
+        The version is the md5 of the contents"""
+
+        os.makedirs( os.path.dirname( rPath.path ), exist_ok = True )
+        tmp_path = rPath.path + '.' + self._get_randomized_dirname() + '.tmp'
+        with open( tmp_path, 'wb' ) as file:
+            file.write( data )
+
+        try:
+            if if_match is None:
+                try:
+                    os.link( tmp_path, rPath.path )
+                except FileExistsError:
+                    return None
+
+            else:
+                with open( rPath.path + '.lock', 'a' ) as lock_file:
+                    if fcntl is not None:
+                        fcntl.flock( lock_file, fcntl.LOCK_EX )
+
+                    data_current, version = self._download_bytes_if_exists( rPath )
+                    if version != if_match:
+                        return None
+                    os.replace( tmp_path, rPath.path )
+
+        finally:
+            if os.path.exists( tmp_path ):
+                os.remove( tmp_path )
+
+        return hashlib.md5( data ).hexdigest()
+
+    def _download_bytes_if_exists( self, rPath ):
+
+        try:
+            with open( rPath.path, 'rb' ) as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None, None
+
+        return data, hashlib.md5( data ).hexdigest()
+
+    def _list_rel_paths( self, rDir ):
+        return [ rel_path for rel_path, path, stat_result in kabbes_s3synchrony.iter_files( rDir.path ) ]
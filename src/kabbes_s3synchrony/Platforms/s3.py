@@ -1,10 +1,28 @@
 import kabbes_s3synchrony
+from ..BasePlatform import BasePlatform
 import py_starter as ps
 import aws_connections
 import dir_ops as do
+from boto3.s3.transfer import TransferConfig
+import botocore.config
+import botocore.exceptions
+import boto3
+import pandas as pd
+import concurrent.futures
+import contextlib
+import tempfile
+import hashlib
+import shutil
+import time
 import os
 
-class Platform( kabbes_s3synchrony.BasePlatform ):
+try:
+    import aiobotocore.session
+    import aiobotocore.config
+except ImportError:
+    aiobotocore = None
+
+class Platform( BasePlatform ):
 
     NAME = do.Path( os.path.abspath( __file__ ) ).root #s3
 
@@ -13,9 +31,15 @@ class Platform( kabbes_s3synchrony.BasePlatform ):
     PATH_CLASS = aws_connections.s3.S3Path
     PATHS_CLASS = aws_connections.s3.S3Paths
 
+    CHECKSUM_METADATA_KEY = 'md5' #content md5, comparable with the versions csv even after a multipart upload
+    CODEC_METADATA_KEY = 'codec' #set when the object is stored compressed
+    DELETE_BATCH_SIZE = 1000 #most keys DeleteObjects takes in one request
+    THROTTLE_CODES = ( 'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException', '503' )
+    RETRY_CODES = ( 'InternalError', 'ServiceUnavailable', 'RequestTimeout', 'RequestTimeTooSkewed', '500', '502', '504' )
+
     def __init__(self, *args, **kwargs ):
 
-        kabbes_s3synchrony.BasePlatform.__init__( self, *args, **kwargs )
+        BasePlatform.__init__( self, *args, **kwargs )
 
         self.data_rDir = aws_connections.s3.S3Dir( bucket = self.cfg['aws_bkt'], path = self.Connection.cfg['remote_data_dir'], conn = self.remote_connection )
 
@@ -24,6 +48,10 @@ class Platform( kabbes_s3synchrony.BasePlatform ):
         self._remote_versions_rPath = self._util_rDir.join_Path( path = self._remote_versions_lPath.filename )
         self._remote_delete_rPath = self._util_rDir.join_Path( path = self._remote_delete_lPath.filename )
 
+        self.transfer_config = self._get_transfer_config()
+        self.Compressor = self._get_compressor()
+        self._aio_client = None
+
     def _get_remote_connection( self ):
         self.remote_connection = aws_connections.Client( 
             dict = {
@@ -32,3 +60,541 @@ class Platform( kabbes_s3synchrony.BasePlatform ):
             } 
         )
 
+        # one pooled client shared by every transfer thread, S3Path and S3Dir
+        kwargs = self._get_client_kwargs()
+        self.remote_connection.client = boto3.client( self.NAME, config = botocore.config.Config( **self._get_pool_kwargs() ), **kwargs )
+        self.remote_connection.resource = boto3.resource( self.NAME, config = botocore.config.Config( **self._get_pool_kwargs() ), **kwargs )
+
+        for client in [ self.remote_connection.client, self.remote_connection.resource.meta.client ]:
+            client.meta.events.register( 'after-call.s3', self._count_retries )
+            client.meta.events.register( 'needs-retry.s3', self._observe_throttling )
+
+    def _count_retries( self, parsed = None, **kwargs ):
+
+        """Add the retries botocore made before each successful response to the metrics"""
+
+        retries = ( parsed or {} ).get( 'ResponseMetadata', {} ).get( 'RetryAttempts', 0 )
+        if retries:
+            self.metrics.add( 'retries', retries )
+
+    def _observe_throttling( self, response = None, **kwargs ):
+
+        """Cut the transfer concurrency on every throttling response, including the ones botocore retries by itself"""
+
+        if response is None:
+            return None
+
+        http_response, parsed = response
+        code = ( parsed or {} ).get( 'Error', {} ).get( 'Code' )
+        if code in self.THROTTLE_CODES or getattr( http_response, 'status_code', None ) == 503:
+            self.metrics.add( 'throttle_events' )
+            if self._transfer_executor is not None and self._transfer_executor.concurrency is not None:
+                self._transfer_executor.concurrency.throttled()
+
+        return None
+
+    def _classify_error( self, error ):
+
+        if isinstance( error, botocore.exceptions.ClientError ):
+            code = error.response.get( 'Error', {} ).get( 'Code' )
+            if code in self.THROTTLE_CODES:
+                return 'throttle'
+            if code in self.RETRY_CODES:
+                return 'error'
+            return None
+
+        if isinstance( error, ( botocore.exceptions.ConnectionError, botocore.exceptions.HTTPClientError ) ):
+            return 'error'
+        return BasePlatform._classify_error( self, error )
+
+    def _get_client_kwargs( self ):
+
+        kwargs = self.remote_connection.cfg['connection.kwargs'].get_ref_dict()
+        if self.cfg['endpoint_url'] is not None: # an S3-compatible service instead of AWS
+            kwargs['endpoint_url'] = self.cfg['endpoint_url']
+        return kwargs
+
+    def _get_pool_kwargs( self ):
+
+        """Size the connection pool for every transfer worker running its multipart threads at once"""
+
+        max_pool_connections = self.cfg['max_pool_connections']
+        if max_pool_connections is None:
+            max_pool_connections = 64
+
+        # standard mode backs off exponentially with full jitter between attempts
+        return {
+            'max_pool_connections': int( max_pool_connections ),
+            'tcp_keepalive': self.cfg['tcp_keepalive'] is not False,
+            'retries': { 'mode': 'standard' }
+        }
+
+    def _get_async_contexts( self ):
+
+        if aiobotocore is None: # the async executor runs the blocking calls on its thread pool
+            return []
+        return [ self._open_async_client ]
+
+    @contextlib.asynccontextmanager
+    async def _open_async_client( self ):
+
+        """Open an aiobotocore client on the running event loop for the length of one async run"""
+
+        pool_kwargs = self._get_pool_kwargs()
+        config = aiobotocore.config.AioConfig(
+            max_pool_connections = pool_kwargs['max_pool_connections'],
+            connector_args = { 'keepalive_timeout': 60 if pool_kwargs['tcp_keepalive'] else 0 },
+            retries = pool_kwargs['retries']
+        )
+
+        session = aiobotocore.session.get_session()
+        async with session.create_client( self.NAME, config = config, **self._get_client_kwargs() ) as client:
+            client.meta.events.register( 'after-call.s3', self._count_retries )
+            client.meta.events.register( 'needs-retry.s3', self._observe_throttling )
+            self._aio_client = client
+            try:
+                yield client
+            finally:
+                self._aio_client = None
+
+    def _get_transfer_config( self ):
+
+        """Files above multipart_threshold_mb are uploaded in parts and downloaded with parallel ranged GETs"""
+
+        def get( key, default ):
+            value = self.cfg[ key ]
+            if value is None:
+                return default
+            return value
+
+        MB = 1024**2
+        return TransferConfig(
+            multipart_threshold = int( float( get( 'multipart_threshold_mb', 64 ) ) * MB ),
+            multipart_chunksize = int( float( get( 'multipart_part_size_mb', 16 ) ) * MB ),
+            max_concurrency = int( get( 'multipart_concurrency', 8 ) ),
+            use_threads = True
+        )
+
+    def _get_compressor( self ):
+
+        """Files are compressed on upload when compression names a codec, 'zstd' or 'gzip'"""
+
+        if not self.cfg['compression']:
+            return None
+
+        kwargs = {}
+        if self.cfg['compression_extensions'] is not None:
+            kwargs['extensions'] = self.cfg['compression_extensions'].get_raw_dict()
+        if self.cfg['compression_min_size_kb'] is not None:
+            kwargs['min_size'] = int( float( self.cfg['compression_min_size_kb'] ) * 1024 )
+        if self.cfg['compression_level'] is not None:
+            kwargs['level'] = int( self.cfg['compression_level'] )
+
+        return kabbes_s3synchrony.Compressor( codec = self.cfg['compression'], **kwargs )
+
+    def _upload_Path( self, lPath, rPath ):
+
+        # the checksum is always of the uncompressed content
+        extra_args = { 'Metadata': { self.CHECKSUM_METADATA_KEY: self._get_checksum( lPath ) } }
+
+        codec = None
+        if self.Compressor is not None:
+            codec = self.Compressor.choose_codec( lPath.path )
+
+        if codec is None:
+            size = os.path.getsize( lPath.path )
+            transfer_log = self._get_transfer_log()
+            if transfer_log is not None and size >= self.transfer_config.multipart_threshold:
+                return self._upload_multipart( lPath, rPath, extra_args, transfer_log )
+
+            # a fan-out sync reads a single part file once for all its remotes
+            if self._shared_reads is not None and size < self.transfer_config.multipart_threshold:
+                data = self._read_file( lPath.path )
+
+                bandwidth = self._get_bandwidth()
+                if bandwidth is not None:
+                    bandwidth.consume( 'upload', len( data ) )
+
+                self.remote_connection.client.put_object( Bucket = rPath.bucket, Key = rPath.path, Body = data, **extra_args )
+                return True
+
+            self._upload_file( lPath.path, rPath, extra_args )
+            return True
+
+        fd, tmp_path = tempfile.mkstemp( dir = self._tmp_lDir.path )
+        os.close( fd )
+        try:
+            self.Compressor.compress( lPath.path, tmp_path, codec )
+
+            # keep the original when compressing did not help
+            upload_path = lPath.path
+            if os.path.getsize( tmp_path ) < os.path.getsize( lPath.path ):
+                upload_path = tmp_path
+                extra_args['Metadata'][ self.CODEC_METADATA_KEY ] = codec
+
+            self._upload_file( upload_path, rPath, extra_args )
+        finally:
+            os.remove( tmp_path )
+
+        return True
+
+    def _upload_file( self, path, rPath, extra_args ):
+
+        """Upload with the transfer manager, reading the file through the bandwidth caps when there are any"""
+
+        bandwidth = self._get_bandwidth()
+        if bandwidth is None:
+            self.remote_connection.client.upload_file( path, rPath.bucket, rPath.path, ExtraArgs = extra_args, Config = self.transfer_config )
+            return
+
+        with open( path, 'rb' ) as file:
+            self.remote_connection.client.upload_fileobj( bandwidth.wrap( file, 'upload' ), rPath.bucket, rPath.path, ExtraArgs = extra_args, Config = self.transfer_config )
+
+    def _upload_multipart( self, lPath, rPath, extra_args, transfer_log ):
+
+        """Upload in parts, recording the upload ID in the transfer log so a sync that stops partway
+        continues from the parts S3 already has. A part is only kept when its size and md5 match the file"""
+
+        client = self.remote_connection.client
+        rel_path = lPath.get_rel( self.data_lDir ).path
+        checksum = extra_args['Metadata'][ self.CHECKSUM_METADATA_KEY ]
+        size = os.path.getsize( lPath.path )
+
+        upload_id = None
+        part_size = None
+        uploaded = {} # part number: ETag
+
+        record = transfer_log.get_multipart( rel_path )
+        if record is not None:
+            if record.get( 'checksum' ) == checksum and record.get( 'key' ) == rPath.path:
+                upload_id = record['upload_id']
+                part_size = record['part_size']
+                try:
+                    paginator = client.get_paginator( 'list_parts' )
+                    for page in paginator.paginate( Bucket = rPath.bucket, Key = rPath.path, UploadId = upload_id ):
+                        for part in page.get( 'Parts', [] ):
+                            uploaded[ part['PartNumber'] ] = ( part['ETag'], part['Size'] )
+                except botocore.exceptions.ClientError as e:
+                    if e.response['Error']['Code'] != 'NoSuchUpload':
+                        raise
+                    upload_id = None
+                    uploaded = {}
+            else:
+                # the file changed since, its parts are of no use
+                try:
+                    client.abort_multipart_upload( Bucket = rPath.bucket, Key = record['key'], UploadId = record['upload_id'] )
+                except ( botocore.exceptions.ClientError, KeyError ):
+                    pass
+
+        if upload_id is None:
+            # S3 takes at most 10000 parts
+            part_size = max( self.transfer_config.multipart_chunksize, -( -size // 10000 ) )
+            upload_id = client.create_multipart_upload( Bucket = rPath.bucket, Key = rPath.path, **extra_args )['UploadId']
+            transfer_log.set_multipart( rel_path, key = rPath.path, upload_id = upload_id, part_size = part_size, checksum = checksum )
+
+        n_parts = max( 1, -( -size // part_size ) )
+
+        bandwidth = self._get_bandwidth()
+
+        def upload_part( part_number ):
+
+            with open( lPath.path, 'rb' ) as file:
+                file.seek( ( part_number - 1 ) * part_size )
+                data = file.read( part_size )
+
+            if part_number in uploaded:
+                etag, part_bytes = uploaded[ part_number ]
+                if part_bytes == len( data ) and etag.strip( '"' ) == hashlib.md5( data ).hexdigest():
+                    self.metrics.add( 'parts_resumed' )
+                    return etag
+
+            if bandwidth is not None:
+                bandwidth.consume( 'upload', len( data ) )
+            return client.upload_part( Bucket = rPath.bucket, Key = rPath.path, UploadId = upload_id, PartNumber = part_number, Body = data )['ETag']
+
+        with concurrent.futures.ThreadPoolExecutor( max_workers = self.transfer_config.max_concurrency ) as pool:
+            etags = list( pool.map( upload_part, range( 1, n_parts + 1 ) ) )
+
+        client.complete_multipart_upload(
+            Bucket = rPath.bucket, Key = rPath.path, UploadId = upload_id,
+            MultipartUpload = { 'Parts': [ { 'ETag': etag, 'PartNumber': i + 1 } for i, etag in enumerate( etags ) ] }
+        )
+        transfer_log.end_multipart( rel_path )
+        return True
+
+    def _download_Path( self, rPath, lPath ):
+
+        os.makedirs( lPath.ascend().path, exist_ok = True )
+
+        response = self.remote_connection.client.get_object( Bucket = rPath.bucket, Key = rPath.path )
+        codec = response.get( 'Metadata', {} ).get( self.CODEC_METADATA_KEY )
+
+        bandwidth = self._get_bandwidth()
+        body = response['Body']
+        if bandwidth is not None:
+            body = bandwidth.wrap( body, 'download' )
+
+        # written to the tmp dir and renamed into place, so a file is never left half written
+        tmp_path = self._make_tmp_path()
+        try:
+            # large uncompressed objects are faster as parallel ranged GETs
+            if codec is None and response['ContentLength'] >= self.transfer_config.multipart_threshold:
+                response['Body'].close()
+                if bandwidth is None:
+                    self.remote_connection.client.download_file( rPath.bucket, rPath.path, tmp_path, Config = self.transfer_config )
+                else:
+                    with open( tmp_path, 'wb' ) as file:
+                        self.remote_connection.client.download_fileobj( rPath.bucket, rPath.path, bandwidth.wrap( file, 'download' ), Config = self.transfer_config )
+            elif codec is None:
+                with open( tmp_path, 'wb' ) as file:
+                    shutil.copyfileobj( body, file, 1024**2 )
+            else:
+                kabbes_s3synchrony.decompress_stream( body, tmp_path, codec )
+
+            os.replace( tmp_path, lPath.path )
+        finally:
+            if os.path.exists( tmp_path ):
+                os.remove( tmp_path )
+
+        return True
+
+    def _copy_Path( self, rPath, Destination ):
+
+        """Copy server-side, in parts above multipart_threshold_mb; the md5 and codec metadata come along"""
+
+        copy_source = { 'Bucket': rPath.bucket, 'Key': rPath.path }
+        self.remote_connection.client.copy( copy_source, Destination.bucket, Destination.path, Config = self.transfer_config )
+        return True
+
+    def _remove_from_remote( self, Paths_inst ):
+
+        """Remove objects with DeleteObjects, DELETE_BATCH_SIZE keys per request, running the requests concurrently.
+        Returns the Paths S3 reported as deleted, keys that failed are printed and left out"""
+
+        Paths_list = list( Paths_inst )
+        batches = [ Paths_list[ i : i + self.DELETE_BATCH_SIZE ] for i in range( 0, len( Paths_list ), self.DELETE_BATCH_SIZE ) ]
+        deleted_keys = set()
+
+        def remove_batch( batch ):
+
+            start = time.perf_counter()
+            response = self.remote_connection.client.delete_objects(
+                Bucket = batch[0].bucket,
+                Delete = { 'Objects': [ { 'Key': rPath.path } for rPath in batch ], 'Quiet': False }
+            )
+            self.metrics.observe( 'remove_from_remote', time.perf_counter() - start )
+
+            deleted_keys.update( deleted['Key'] for deleted in response.get( 'Deleted', [] ) )
+            for error in response.get( 'Errors', [] ):
+                print ( 'ERROR: ' + str( error.get( 'Key' ) ) + ' - ' + str( error.get( 'Code' ) ) + ': ' + str( error.get( 'Message' ) ) )
+
+            return len( response.get( 'Errors', [] ) ) == 0
+
+        self._get_transfer_executor().run( remove_batch, batches, description = 'remove from remote' )
+
+        removed_Paths = self.PATHS_CLASS()
+        for rPath in Paths_list:
+            if rPath.path in deleted_keys:
+                removed_Paths._add( rPath )
+
+        self.metrics.add( 'files_removed_remote', len( removed_Paths ) )
+        return removed_Paths
+
+    def _upload_bytes( self, data, rPath ):
+
+        bandwidth = self._get_bandwidth()
+        if bandwidth is not None:
+            bandwidth.consume( 'upload', len( data ) )
+
+        self.remote_connection.client.put_object( Bucket = rPath.bucket, Key = rPath.path, Body = data )
+        return True
+
+    def _download_bytes( self, rPath ):
+
+        response = self.remote_connection.client.get_object( Bucket = rPath.bucket, Key = rPath.path )
+        data = response['Body'].read()
+
+        bandwidth = self._get_bandwidth()
+        if bandwidth is not None:
+            bandwidth.consume( 'download', len( data ) )
+        return data
+
+    def _upload_bytes_if( self, data, rPath, if_match = None ):
+
+        """A conditional PutObject, the version is the ETag"""
+
+        kwargs = { 'IfNoneMatch': '*' } if if_match is None else { 'IfMatch': if_match }
+        try:
+            response = self.remote_connection.client.put_object( Bucket = rPath.bucket, Key = rPath.path, Body = data, **kwargs )
+        except botocore.exceptions.ClientError as e:
+            # 412 when the condition failed, 409 when another conditional write to the key was in flight
+            if e.response['Error']['Code'] in ( 'PreconditionFailed', 'ConditionalRequestConflict' ):
+                return None
+            raise
+
+        return response['ETag']
+
+    def _download_bytes_if_exists( self, rPath ):
+
+        try:
+            response = self.remote_connection.client.get_object( Bucket = rPath.bucket, Key = rPath.path )
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ( 'NoSuchKey', '404' ):
+                return None, None
+            raise
+
+        return response['Body'].read(), response['ETag']
+
+    def _list_rel_paths( self, rDir ):
+
+        prefix = rDir.path
+        if prefix != '':
+            prefix += '/'
+
+        rel_paths = []
+        paginator = self.remote_connection.client.get_paginator( 'list_objects_v2' )
+        for page in paginator.paginate( Bucket = rDir.bucket, Prefix = prefix ):
+            for obj in page.get( 'Contents', [] ):
+                if not obj['Key'].endswith( '/' ):
+                    rel_paths.append( obj['Key'][ len(prefix): ] )
+
+        return rel_paths
+
+    async def _upload_Path_async( self, lPath, rPath ):
+
+        # multipart and compressed uploads stay with the blocking transfer manager
+        if self._aio_client is None or os.path.getsize( lPath.path ) >= self.transfer_config.multipart_threshold or \
+                ( self.Compressor is not None and self.Compressor.choose_codec( lPath.path ) is not None ):
+            return await BasePlatform._upload_Path_async( self, lPath, rPath )
+
+        data = self._read_file( lPath.path )
+
+        bandwidth = self._get_bandwidth()
+        if bandwidth is not None:
+            await bandwidth.consume_async( 'upload', len( data ) )
+
+        metadata = { self.CHECKSUM_METADATA_KEY: self._get_checksum( lPath ) }
+        await self._aio_client.put_object( Bucket = rPath.bucket, Key = rPath.path, Body = data, Metadata = metadata )
+        return True
+
+    async def _download_Path_async( self, rPath, lPath ):
+
+        if self._aio_client is None:
+            return await BasePlatform._download_Path_async( self, rPath, lPath )
+
+        response = await self._aio_client.get_object( Bucket = rPath.bucket, Key = rPath.path )
+        codec = response.get( 'Metadata', {} ).get( self.CODEC_METADATA_KEY )
+
+        # compressed and large objects stay with the blocking transfer manager
+        if codec is not None or response['ContentLength'] >= self.transfer_config.multipart_threshold:
+            response['Body'].close()
+            return await BasePlatform._download_Path_async( self, rPath, lPath )
+
+        async with response['Body'] as body:
+            data = await body.read()
+
+        bandwidth = self._get_bandwidth()
+        if bandwidth is not None:
+            await bandwidth.consume_async( 'download', len( data ) )
+
+        os.makedirs( lPath.ascend().path, exist_ok = True )
+        tmp_path = self._make_tmp_path()
+        try:
+            with open( tmp_path, 'wb' ) as file:
+                file.write( data )
+            os.replace( tmp_path, lPath.path )
+        finally:
+            if os.path.exists( tmp_path ):
+                os.remove( tmp_path )
+
+        return True
+
+    def _list_remote_versions( self ):
+
+        """Build the remote versions from a paginated ListObjectsV2 scan of the data prefix.
+        The checksum of each object comes from its ETag when it is a plain md5, then from the
+        md5 metadata written by _upload_Path, and only as a last resort from downloading it"""
+
+        prefix = self.data_rDir.path
+        if prefix != '':
+            prefix += '/'
+        util_prefix = prefix + self.UTIL_DIR + '/'
+
+        # the ETag of a compressed object is the md5 of the compressed bytes
+        etag_is_md5 = self.cfg['etag_is_md5'] is not False and self.Compressor is None
+
+        rel_paths = []
+        times = []
+        checksums = []
+        unresolved = [] # indices of objects whose checksum needs a HEAD or a download
+
+        paginator = self.remote_connection.client.get_paginator( 'list_objects_v2' )
+        for page in paginator.paginate( Bucket = self.data_rDir.bucket, Prefix = prefix ):
+            for obj in page.get( 'Contents', [] ):
+
+                key = obj['Key']
+                if key.endswith( '/' ) or key.startswith( util_prefix ):
+                    continue
+
+                etag = obj['ETag'].strip( '"' )
+                checksum = None
+                if etag_is_md5 and '-' not in etag: # multipart ETags are not an md5 of the content
+                    checksum = etag
+                else:
+                    unresolved.append( len(rel_paths) )
+
+                rel_paths.append( key[ len(prefix): ] )
+                times.append( obj['LastModified'].astimezone().strftime( self.dttm_format ) )
+                checksums.append( checksum )
+
+        def resolve( i ):
+            checksums[i] = self._get_remote_checksum( prefix + rel_paths[i] )
+            return True
+
+        async def resolve_async( i ):
+            checksums[i] = await self._get_remote_checksum_async( prefix + rel_paths[i] )
+            return True
+
+        executor = self._get_transfer_executor()
+        results = executor.run( resolve, unresolved, description = 'checksum remote', async_function = resolve_async )
+
+        # a missing checksum would go up as the team's record of the file, so nothing goes up at all
+        failed = [ rel_paths[i] for i, success in zip( unresolved, results ) if not success or checksums[i] is None ]
+        if len( failed ) > 0:
+            raise RuntimeError( 'Could not checksum ' + str( len( failed ) ) + ' remote files, the prefix was not initialized: ' + ', '.join( failed[:10] ) )
+
+        return pd.DataFrame( {
+            self._file_colname: rel_paths,
+            self._editor_colname: self.Connection.cfg['_name'],
+            self._time_colname: times,
+            self._hash_colname: checksums
+        }, columns = self.columns )
+
+    async def _get_remote_checksum_async( self, key ):
+
+        if self._aio_client is not None:
+            response = await self._aio_client.head_object( Bucket = self.data_rDir.bucket, Key = key )
+            checksum = response.get( 'Metadata', {} ).get( self.CHECKSUM_METADATA_KEY )
+            if checksum is not None:
+                return checksum
+
+        return await self._transfer_executor.run_in_thread( self._get_remote_checksum, key )
+
+    def _get_remote_checksum( self, key ):
+
+        """Return the content md5 of an object from its metadata, downloading it if it has none"""
+
+        bucket = self.data_rDir.bucket
+        response = self.remote_connection.client.head_object( Bucket = bucket, Key = key )
+
+        checksum = response.get( 'Metadata', {} ).get( self.CHECKSUM_METADATA_KEY )
+        if checksum is not None:
+            return checksum
+
+        fd, tmp_path = tempfile.mkstemp( dir = self._tmp_lDir.path )
+        os.close( fd )
+        try:
+            self.remote_connection.client.download_file( bucket, key, tmp_path, Config = self.transfer_config )
+            return self._hash( tmp_path )
+        finally:
+            os.remove( tmp_path )
@@ -0,0 +1,92 @@
+from parent_class import ParentClass
+import os
+
+
+def iter_files( root, folders_to_skip = [], ignore = None, rel_dir = '' ):
+
+    """Yield ( rel_path, path, stat_result ) for every file underneath root.
+    Entries are visited in name order so the output is sorted by path components;
+    rel_path always uses '/' as the delimiter and starts with rel_dir when root is a subfolder.
+    Folders and files the Ignore rules match are skipped without being stat'ed"""
+
+    if ignore is not None and len( ignore ) == 0:
+        ignore = None
+
+    yield from _iter_dir( root, rel_dir, set( folders_to_skip ), ignore )
+
+
+def sort_key( rel_path ):
+
+    """The order iter_files visits paths in, folder by folder: 'a/b' sorts before 'a-b' as the folder 'a' comes first"""
+
+    return rel_path.replace( '/', '\x01' )
+
+
+def _iter_dir( path, rel_dir, folders_to_skip, ignore ):
+
+    try:
+        with os.scandir( path ) as it:
+            entries = sorted( it, key = lambda entry: entry.name )
+    except ( FileNotFoundError, NotADirectoryError ):
+        return
+
+    for entry in entries:
+
+        if rel_dir == '':
+            rel_path = entry.name
+        else:
+            rel_path = rel_dir + '/' + entry.name
+
+        try:
+            if entry.is_dir( follow_symlinks = True ):
+                if entry.name not in folders_to_skip and ( ignore is None or not ignore.match( rel_path, is_dir = True ) ):
+                    yield from _iter_dir( entry.path, rel_path, folders_to_skip, ignore )
+
+            elif entry.is_file( follow_symlinks = True ):
+                if ignore is None or not ignore.match( rel_path ):
+                    yield rel_path, entry.path, entry.stat( follow_symlinks = True )
+
+        except FileNotFoundError: # removed while we were walking
+            continue
+
+
+class Scanner( ParentClass ):
+
+    """Walks a local directory into flat, column-oriented lists.
+    Iterate over a Scanner to stream ( rel_path, path, stat_result ) instead"""
+
+    def __init__( self, root, folders_to_skip = [], ignore = None, scope = None ):
+
+        ParentClass.__init__( self )
+
+        self.root = root
+        self.folders_to_skip = list( folders_to_skip )
+        self.ignore = ignore
+        self.scope = scope
+
+        self.rel_paths = []
+        self.paths = []
+        self.sizes = []
+        self.mtimes = []        # seconds since the epoch
+        self.stat_results = []
+
+    def __iter__( self ):
+        if self.scope is not None:
+            return self.scope.iter_files( self.root, folders_to_skip = self.folders_to_skip, ignore = self.ignore )
+        return iter_files( self.root, folders_to_skip = self.folders_to_skip, ignore = self.ignore )
+
+    def __len__( self ):
+        return len( self.rel_paths )
+
+    def scan( self ):
+
+        """Walk the directory once, filling the column lists"""
+
+        for rel_path, path, stat_result in self:
+            self.rel_paths.append( rel_path )
+            self.paths.append( path )
+            self.sizes.append( stat_result.st_size )
+            self.mtimes.append( stat_result.st_mtime )
+            self.stat_results.append( stat_result )
+
+        return self
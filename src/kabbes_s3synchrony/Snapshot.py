@@ -0,0 +1,178 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import pandas as pd
+import datetime as dt
+import os
+
+
+class Snapshot( ParentClass ):
+
+    """State of one synchronization, computed once and updated as each phase transfers files.
+
+    mine:            versions of the local data directory
+    other:           versions of the remote data directory (versions_remote)
+    previous_local:  files we had last time plus files we deleted before (versions_local + deleted_local)
+    deleted_local:   remote versions of files deleted locally (deleted_local)
+    deleted_remote:  record of every file deleted remotely (deleted_remote)"""
+
+    def __init__( self, Platform, mine = None, other = None, previous_local = None, deleted_remote = None ):
+
+        """Given other, previous_local and deleted_remote, as a Stream does for each chunk, no manifest is read"""
+
+        ParentClass.__init__( self )
+
+        self.Platform = Platform
+        self._diff = None
+        self._checksums = None
+        self._local_paths = None
+        self._remote_checksums = None
+
+        self.mine = mine
+        if self.mine is None:
+            self.mine = Platform._compute_directory( Platform.data_lDir )
+
+        if other is not None:
+            self.other = other
+            self.deleted_local = other.iloc[0:0]
+            self.deleted_remote = deleted_remote
+            self.previous_local = previous_local
+            return
+
+        with Platform.metrics.phase( 'read_manifests' ):
+            self.other = self._read( Platform._remote_versions_lPath )
+
+            self.deleted_local = self._read( Platform._local_delete_lPath )
+            self.deleted_remote = self._read( Platform._remote_delete_lPath )
+            self.previous_local = pd.concat( [ self._read( Platform._local_versions_lPath ), self.deleted_local ] )
+
+    def _read( self, lPath ):
+        return self.Platform._read_manifest( lPath )
+
+    def get_diff( self ):
+
+        """Return the Diff of the current state, only recomputing it after a change"""
+
+        if self._diff is None:
+            with self.Platform.metrics.phase( 'diff' ):
+                self._diff = kabbes_s3synchrony.Diff(
+                    self.Platform,
+                    self.Platform._filter_ignore( self.mine ),
+                    self.Platform._filter_ignore( self.other ),
+                    previous_local = self.previous_local,
+                    deleted_remote = self.deleted_remote
+                )
+
+        return self._diff
+
+    def get_checksum( self, rel_path ):
+
+        """Return the checksum of a local file, or None if it is not in the snapshot"""
+
+        if self._checksums is None:
+            self._checksums = dict( zip( self.mine[ self.Platform._file_colname ], self.mine[ self.Platform._hash_colname ] ) )
+
+        return self._checksums.get( rel_path )
+
+    def get_local_path( self, checksum ):
+
+        """Return the path of a local file with this checksum, or None if there is none"""
+
+        if self._local_paths is None:
+            self._local_paths = dict( zip( self.mine[ self.Platform._hash_colname ], self.mine[ self.Platform._file_colname ] ) )
+
+        rel_path = self._local_paths.get( checksum )
+        if rel_path is None:
+            return None
+        return self.Platform.data_lDir.join( rel_path )
+
+    def get_remote_checksum( self, rel_path ):
+
+        """Return the checksum of a remote file, or None if it is not in the remote versions"""
+
+        if self._remote_checksums is None:
+            self._remote_checksums = dict( zip( self.other[ self.Platform._file_colname ], self.other[ self.Platform._hash_colname ] ) )
+
+        return self._remote_checksums.get( rel_path )
+
+    def get_remote_checksums( self ):
+
+        """Return the checksums of every remote file, including the ones in the remote deleted record"""
+
+        return set( self.other[ self.Platform._hash_colname ] ) | set( self.deleted_remote[ self.Platform._hash_colname ] )
+
+    def _rows( self, df, rel_paths ):
+        return df.loc[ df[ self.Platform._file_colname ].isin( rel_paths ) ]
+
+    def _without( self, df, rel_paths ):
+        return df.loc[ ~df[ self.Platform._file_colname ].isin( rel_paths ) ]
+
+    def record_uploaded( self, rel_paths ):
+
+        """Local files were uploaded: the remote versions now match ours"""
+
+        if len( rel_paths ) == 0:
+            return
+
+        other = pd.concat( [ self.other, self._rows( self.mine, rel_paths ) ] )
+        self.other = other.drop_duplicates( [ self.Platform._file_colname ], keep='last' ).sort_index()
+        self._diff = None
+        self._remote_checksums = None
+
+    def record_downloaded( self, rel_paths ):
+
+        """Remote files were downloaded: our versions now match the remote ones"""
+
+        if len( rel_paths ) == 0:
+            return
+
+        downloaded = self._rows( self.other, rel_paths ).drop_duplicates( [ self.Platform._file_colname ], keep='last' ).copy()
+        downloaded[ self.Platform._editor_colname ] = self.Platform.Connection.cfg['_name']
+        downloaded[ self.Platform._time_colname ] = [ self._get_local_mtime( rel_path ) for rel_path in downloaded[ self.Platform._file_colname ] ]
+
+        self.mine = pd.concat( [ self._without( self.mine, rel_paths ), downloaded ], ignore_index=True )
+        self._diff = None
+        self._checksums = None
+        self._local_paths = None
+
+    def record_deleted_remote( self, rel_paths ):
+
+        """Remote files were deleted: move their versions into the remote deleted record"""
+
+        if len( rel_paths ) == 0:
+            return
+
+        self.deleted_remote = pd.concat( [ self.deleted_remote, self._rows( self.other, rel_paths ) ] )
+        self.other = self._without( self.other, rel_paths )
+        self._diff = None
+        self._remote_checksums = None
+
+    def record_deleted_local( self, rel_paths ):
+
+        """Local files were deleted"""
+
+        if len( rel_paths ) == 0:
+            return
+
+        self.mine = self._without( self.mine, rel_paths )
+        self._diff = None
+        self._checksums = None
+        self._local_paths = None
+
+    def _get_local_mtime( self, rel_path ):
+
+        path = self.Platform.data_lDir.join( rel_path )
+        return dt.datetime.fromtimestamp( os.path.getmtime( path ) ).strftime( self.Platform.dttm_format )
+
+    def save_remote( self ):
+
+        """Write the remote versions and remote deleted record to the local util dir"""
+
+        self.Platform._write_manifest( self.other, self.Platform._remote_versions_lPath )
+        self.Platform._write_manifest( self.deleted_remote, self.Platform._remote_delete_lPath )
+
+    def save_local( self ):
+
+        """Write our versions and local deleted record to the local util dir for next time"""
+
+        self.Platform._write_manifest( self.mine, self.Platform._local_versions_lPath )
+        self.Platform._write_manifest( self.deleted_local, self.Platform._local_delete_lPath )
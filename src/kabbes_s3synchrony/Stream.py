@@ -0,0 +1,170 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import pandas as pd
+import itertools
+import hashlib
+import time
+
+
+_END = object()
+
+def merge_join( *iterators, key ):
+
+    """Walk iterators sorted by key side by side, yielding ( key, [ item or None for each iterator ] ) for every key in any of them.
+    Each iterator holds a key at most once, and only one item of each is held at a time"""
+
+    iterators = [ iter( iterator ) for iterator in iterators ]
+    heads = [ next( iterator, _END ) for iterator in iterators ]
+    keys = [ None if head is _END else key( head ) for head in heads ]
+
+    while True:
+
+        current = min( ( k for k, head in zip( keys, heads ) if head is not _END ), default = _END )
+        if current is _END:
+            return
+
+        items = []
+        for i in range( len( iterators ) ):
+            if heads[i] is not _END and keys[i] == current:
+                items.append( heads[i] )
+                heads[i] = next( iterators[i], _END )
+                keys[i] = None if heads[i] is _END else key( heads[i] )
+            else:
+                items.append( None )
+
+        yield current, items
+
+
+class Stream( ParentClass ):
+
+    """Synchronizes a chunk of files at a time, so memory does not grow with the size of the data dir.
+
+    The walk of the data dir and the manifests are read as streams sorted in the order iter_files visits paths,
+    and merge-joined by path. Each chunk_size paths become a small Snapshot that the usual phases run on,
+    and what they leave is written to the new manifests before the next chunk is read.
+    The sqlite manifest streams from disk, any other is read whole and sorted first"""
+
+    def __init__( self, Platform, chunk_size = 10000 ):
+
+        ParentClass.__init__( self )
+
+        self.Platform = Platform
+        self.chunk_size = max( 1, int( chunk_size ) )
+
+        self._fingerprint = hashlib.md5()
+        self._racy = False
+        self._hash_cache = None
+
+    def synchronize( self ):
+
+        P = self.Platform
+
+        with P.metrics.phase( 'download_manifests' ):
+            P._download_manifest( P._remote_versions_rPath, P._remote_versions_lPath )
+            P._download_manifest( P._remote_delete_rPath, P._remote_delete_lPath )
+
+        self._hash_cache = kabbes_s3synchrony.HashCacheDB( P._util_lDir.join_Path( path = 'hash_cache.db' ), rehash = bool( P.Connection.cfg['rehash'] ) )
+
+        # written alongside the manifests being read, each replaces its manifest once closed
+        lPaths = [ P._remote_versions_lPath, P._remote_delete_lPath, P._local_versions_lPath, P._local_delete_lPath ]
+        writers = [ P.Manifest.open_writer( lPath ) for lPath in lPaths ]
+
+        streams = [
+            self._iter_local(),
+            P.Manifest.iter_sorted( P._remote_versions_lPath ),
+            P.Manifest.iter_sorted( P._local_versions_lPath ),
+            P.Manifest.iter_sorted( P._local_delete_lPath ),
+            P.Manifest.iter_sorted( P._remote_delete_lPath )
+        ]
+
+        nothing_to_do = True
+        chunk = []
+        for key, rows in merge_join( *streams, key = lambda row: kabbes_s3synchrony.sort_key( row[0] ) ):
+
+            chunk.append( rows )
+            if len( chunk ) == self.chunk_size:
+                nothing_to_do = self._synchronize_chunk( chunk, writers ) and nothing_to_do
+                chunk = []
+
+        if len( chunk ) > 0:
+            nothing_to_do = self._synchronize_chunk( chunk, writers ) and nothing_to_do
+
+        with P.metrics.phase( 'save_local' ):
+            for writer in writers:
+                writer.close()
+
+            self._hash_cache.evict()
+            self._hash_cache.close()
+
+        with P.metrics.phase( 'upload_manifests' ):
+            P._remote_versions_rPath.upload( Destination = P._remote_versions_lPath, override = True )
+            P._remote_delete_rPath.upload( Destination = P._remote_delete_lPath, override = True )
+
+        transfer_log = P._get_transfer_log()
+        if transfer_log is not None:
+            transfer_log.clear()
+
+        # the next run can stop early if neither side changes until then
+        fingerprint = kabbes_s3synchrony.Fingerprint( P.Connection, P.node_name )
+        if nothing_to_do and not self._racy:
+            fingerprint.save( self._fingerprint.hexdigest(), [ P._remote_versions_rPath.path, P._remote_delete_rPath.path ] )
+        else:
+            fingerprint.remove()
+
+    def _iter_local( self ):
+
+        """Yield the versions of the data dir, walking and hashing chunk_size files at a time"""
+
+        P = self.Platform
+        entries = kabbes_s3synchrony.iter_files( P.data_lDir.path, folders_to_skip = P.Connection.get_util_dirs(), ignore = P._ignore )
+        racy_ns = ( time.time() - kabbes_s3synchrony.HashCache.RACY_SECONDS ) * 1e9
+
+        while True:
+
+            with P.metrics.phase( 'walk' ):
+                batch = list( itertools.islice( entries, self.chunk_size ) )
+            if len( batch ) == 0:
+                return
+
+            rel_paths = [ rel_path for rel_path, path, stat_result in batch ]
+            paths = [ path for rel_path, path, stat_result in batch ]
+            stat_results = [ stat_result for rel_path, path, stat_result in batch ]
+
+            for rel_path, stat_result in zip( rel_paths, stat_results ):
+                kabbes_s3synchrony.update_fingerprint( self._fingerprint, rel_path, stat_result )
+                if stat_result.st_mtime_ns >= racy_ns:
+                    self._racy = True
+
+            self._hash_cache.prefetch( rel_paths )
+            df = P._compute_files( rel_paths, paths, stat_results, self._hash_cache )
+            self._hash_cache.save()
+
+            yield from df.itertuples( index = False, name = None )
+
+    def _synchronize_chunk( self, chunk, writers ):
+
+        """Run the phases on one chunk of merged rows and write what they leave. Returns whether there was nothing to do"""
+
+        P = self.Platform
+
+        def get_df( i ):
+            return pd.DataFrame( [ rows[i] for rows in chunk if rows[i] is not None ], columns = P.columns )
+
+        P.snapshot = kabbes_s3synchrony.Snapshot(
+            P,
+            mine = get_df( 0 ),
+            other = get_df( 1 ),
+            previous_local = pd.concat( [ get_df( 2 ), get_df( 3 ) ] ),
+            deleted_remote = get_df( 4 )
+        )
+        P.metrics.add( 'files_local', len( P.snapshot.mine ) )
+        P.metrics.add( 'files_remote', len( P.snapshot.other ) )
+
+        nothing_to_do = P._resume_transfers() == 0 and P.snapshot.get_diff().is_empty()
+        if not nothing_to_do:
+            P._run_phases()
+
+        for writer, df in zip( writers, [ P.snapshot.other, P.snapshot.deleted_remote, P.snapshot.mine, P.snapshot.deleted_local ] ):
+            writer.append( df )
+
+        return nothing_to_do
@@ -1,2 +1,13 @@
-from . import default
-from . import no_creds_needed
\ No newline at end of file
+import importlib
+
+
+def __getattr__( name: str ):
+
+    """Import each template module on first use"""
+
+    try:
+        return importlib.import_module( '.' + name, __name__ )
+    except ModuleNotFoundError as e:
+        if e.name != __name__ + '.' + name:
+            raise
+        raise AttributeError( 'module ' + repr( __name__ ) + ' has no attribute ' + repr( name ) )
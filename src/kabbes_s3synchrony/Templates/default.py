@@ -1,15 +1,17 @@
-import aws_credentials
-import user_profile
-
 def set_cfg( Connection ):
 
-    platform_Node = Connection.cfg.get_node( Connection.platform_node_name )
+    s3_node_names = [ node_name for node_name in Connection.node_names if Connection.get_platform_name( node_name ) == 's3' ]
 
-    if Connection.cfg['platform'] == 's3':
-        aws_role = user_profile.profile['aws_roles'][ platform_Node[ 'aws_role_shorthand'] ]
+    if len( s3_node_names ) > 0:
+        import aws_credentials # only s3 needs the profile, and importing it is slow
+        import user_profile
 
         Connection.cfg.load_dict( {'_name': user_profile.profile['name']} )
-        platform_Node.load_dict( {
-            "credentials": aws_credentials.client.Creds[ aws_role ].dict
-        } )
 
+        for node_name in s3_node_names:
+            platform_Node = Connection.cfg.get_node( 'platforms.' + node_name )
+            aws_role = user_profile.profile['aws_roles'][ platform_Node[ 'aws_role_shorthand'] ]
+
+            platform_Node.load_dict( {
+                "credentials": aws_credentials.client.Creds[ aws_role ].dict
+            } )
@@ -0,0 +1,235 @@
+from parent_class import ParentClass
+import threading
+import asyncio
+import random
+import time
+
+
+def backoff( attempt, base = 0.5, cap = 20.0 ):
+
+    """Seconds to wait before retry number attempt, counting from 0: exponential with full jitter,
+    so clients throttled at the same moment don't all come back at the same moment"""
+
+    return random.uniform( 0, min( cap, base * 2**attempt ) )
+
+
+class TokenBucket( ParentClass ):
+
+    """Limits a flow of bytes to rate bytes per second, letting up to burst bytes through at once, by default a quarter second's worth.
+    A request larger than what is in the bucket is let through and paid back by waiting, so a chunk is never split"""
+
+    def __init__( self, rate, burst = None ):
+
+        ParentClass.__init__( self )
+
+        self.rate = float( rate )
+        self.burst = float( burst if burst is not None else rate / 4 )
+
+        self.tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve( self, n_bytes ):
+
+        """Take n_bytes out of the bucket, returning the seconds to wait before sending them"""
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min( self.burst, self.tokens + ( now - self._last ) * self.rate )
+            self._last = now
+
+            self.tokens -= n_bytes
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class Bandwidth( ParentClass ):
+
+    """Caps on the bytes per second of all transfers together and of each direction, 'upload' and 'download'.
+    A transfer waits for the tightest of the caps that apply to it"""
+
+    def __init__( self, total = None, upload = None, download = None ):
+
+        ParentClass.__init__( self )
+
+        self.buckets = {}
+        for name, rate in [ ( 'total', total ), ( 'upload', upload ), ( 'download', download ) ]:
+            if rate:
+                self.buckets[ name ] = TokenBucket( rate )
+
+        self.wait_seconds = 0.0 # summed over every transfer held back
+        self._lock = threading.Lock()
+
+    def __len__( self ):
+        return len( self.buckets )
+
+    def reserve( self, direction, n_bytes ):
+
+        seconds = 0.0
+        for name in [ 'total', direction ]:
+            if name in self.buckets:
+                seconds = max( seconds, self.buckets[ name ].reserve( n_bytes ) )
+
+        if seconds > 0:
+            with self._lock:
+                self.wait_seconds += seconds
+        return seconds
+
+    def consume( self, direction, n_bytes ):
+
+        """Block until n_bytes may be sent in direction"""
+
+        seconds = self.reserve( direction, n_bytes )
+        if seconds > 0:
+            time.sleep( seconds )
+
+    async def consume_async( self, direction, n_bytes ):
+
+        seconds = self.reserve( direction, n_bytes )
+        if seconds > 0:
+            await asyncio.sleep( seconds )
+
+    def wrap( self, file, direction ):
+        return ThrottledFile( file, self, direction )
+
+
+class ThrottledFile( ParentClass ):
+
+    """A file object whose reads and writes are held to a Bandwidth, for handing to code that streams the file itself"""
+
+    def __init__( self, file, Bandwidth, direction ):
+
+        ParentClass.__init__( self )
+
+        self._file = file
+        self._Bandwidth = Bandwidth
+        self._direction = direction
+
+    def read( self, *args ):
+
+        data = self._file.read( *args )
+        self._Bandwidth.consume( self._direction, len( data ) )
+        return data
+
+    def write( self, data ):
+
+        self._Bandwidth.consume( self._direction, len( data ) )
+        return self._file.write( data )
+
+    def __getattr__( self, name ):
+        return getattr( self._file, name )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self._file.close()
+
+
+class AIMD( ParentClass ):
+
+    """Additive-increase, multiplicative-decrease limit on the transfers in flight.
+
+    The limit grows by one for every limit transfers that finish cleanly, up to maximum, and is cut by decrease
+    when a transfer is throttled, fails with an error worth retrying, or takes latency_factor times longer
+    per MB than usual. Cuts closer together than cooldown seconds count once, since they are usually the same congestion"""
+
+    WARMUP = 20          # transfers before the usual latency is trusted
+    SMOOTHING = 0.1      # weight of each transfer in the usual latency
+    MIN_SPIKE = 0.25     # seconds per MB below which no transfer counts as slow, whatever the usual
+
+    def __init__( self, initial, maximum = None, minimum = 1, decrease = 0.5, latency_factor = 4.0, cooldown = 1.0 ):
+
+        ParentClass.__init__( self )
+
+        self.minimum = max( 1, int( minimum ) )
+        self.maximum = max( self.minimum, int( maximum if maximum is not None else initial ) )
+        self.limit = float( min( self.maximum, max( self.minimum, int( initial ) ) ) )
+        self.decrease = float( decrease )
+        self.latency_factor = float( latency_factor )
+        self.cooldown = float( cooldown )
+
+        self.in_flight = 0
+        self.lowest = int( self.limit )
+        self.highest = int( self.limit )
+        self.n_decreases = 0
+        self.n_latency_spikes = 0
+
+        self._latency = None  # usual seconds per MB, smoothed
+        self._n_observed = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def reset_stats( self ):
+
+        """Start counting the decreases and the range of the limit over again, as at the start of a sync"""
+
+        with self._condition:
+            self.lowest = int( self.limit )
+            self.highest = int( self.limit )
+            self.n_decreases = 0
+            self.n_latency_spikes = 0
+
+    def _try_acquire( self ):
+
+        with self._condition:
+            if self.in_flight < int( self.limit ):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire( self ):
+
+        with self._condition:
+            while self.in_flight >= int( self.limit ):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async( self ):
+
+        # released from the event loop's own thread or the thread pool, so poll rather than share a condition
+        while not self._try_acquire():
+            await asyncio.sleep( 0.005 )
+
+    def release( self, seconds, n_bytes, outcome = 'ok' ):
+
+        """Give back a slot. outcome is 'ok', 'throttle' or 'error', or None for a failure that says nothing about congestion"""
+
+        with self._condition:
+            self.in_flight -= 1
+
+            if outcome in ( 'throttle', 'error' ):
+                self._decrease()
+
+            elif outcome == 'ok':
+                latency = seconds / ( 1 + n_bytes / 1024**2 )
+                if self._n_observed >= self.WARMUP and latency > max( self.MIN_SPIKE, self.latency_factor * self._latency ):
+                    self.n_latency_spikes += 1
+                    self._decrease()
+                else:
+                    self.limit = min( self.maximum, self.limit + 1 / self.limit )
+                    self.highest = max( self.highest, int( self.limit ) )
+
+                self._latency = latency if self._latency is None else ( 1 - self.SMOOTHING ) * self._latency + self.SMOOTHING * latency
+                self._n_observed += 1
+
+            self._condition.notify_all()
+
+    def throttled( self ):
+
+        """Cut the limit on a throttling response seen outside release, such as one retried by the client itself"""
+
+        with self._condition:
+            self._decrease()
+
+    def _decrease( self ):
+
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+
+        self._last_decrease = now
+        self.limit = max( float( self.minimum ), self.limit * self.decrease )
+        self.lowest = min( self.lowest, int( self.limit ) )
+        self.n_decreases += 1
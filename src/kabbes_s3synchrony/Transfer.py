@@ -0,0 +1,314 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import concurrent.futures
+import contextvars
+import contextlib
+import functools
+import threading
+import asyncio
+import time
+import sys
+
+
+# the bytes and retries of the item being transferred, whichever thread or task reports its bytes
+_item_state = contextvars.ContextVar( 'item_state', default = None )
+
+
+class TransferExecutor( ParentClass ):
+
+    """Runs a transfer function over many items on a bounded thread pool.
+    Each call returns True on success; failures and exceptions are collected
+    rather than raised, and progress is printed as files/s and MB/s
+
+    Given an AIMD as concurrency, only its limit of the workers transfer at once.
+    classify( exception ) returns 'throttle' or 'error' for exceptions worth retrying, which are retried
+    up to retries times with jittered exponential backoff, and None for the rest.
+    report( name, n ) is called to count throttle events, retries and errors"""
+
+    PROGRESS_INTERVAL = 0.5 #seconds between progress lines
+
+    def __init__( self, workers = 8, print_off = True, concurrency = None, retries = 0, backoff_seconds = 0.5, max_backoff_seconds = 20.0,
+                  classify = None, report = None ):
+
+        ParentClass.__init__( self )
+
+        self.workers = max( 1, int( workers ) )
+        self.print_off = print_off
+
+        self.concurrency = concurrency
+        if self.concurrency is not None:
+            self.workers = self.concurrency.maximum
+
+        self.retries = max( 0, int( retries ) )
+        self.backoff_seconds = float( backoff_seconds )
+        self.max_backoff_seconds = float( max_backoff_seconds )
+        self.classify = classify
+        self.report = report
+
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset( self ):
+
+        self.n_total = 0
+        self.n_done = 0
+        self.n_failed = 0
+        self.n_bytes = 0
+        self.errors = []      # [ ( item, exception ) ]
+        self._start = time.perf_counter()
+        self._last_print = 0.0
+
+    def add_bytes( self, n_bytes ):
+
+        """Called by a transfer function to report the bytes it moved"""
+
+        with self._lock:
+            self.n_bytes += n_bytes
+
+        state = _item_state.get()
+        if state is not None:
+            state[0] += n_bytes
+
+    def _report( self, name, n = 1 ):
+        if self.report is not None:
+            self.report( name, n )
+
+    def _classify( self, error ):
+        if self.classify is None:
+            return None
+        return self.classify( error )
+
+    def _end_attempt( self, start, state, error = None ):
+
+        """Release the slot of an attempt, returning how long to wait before retrying it, None not to retry"""
+
+        outcome = 'ok' if error is None else self._classify( error )
+        if self.concurrency is not None:
+            self.concurrency.release( time.perf_counter() - start, state[0], outcome )
+
+        if error is None or outcome is None:
+            return None
+
+        self._report( 'throttle_events' if outcome == 'throttle' else 'transfer_errors' )
+        if state[1] >= self.retries:
+            return None
+
+        state[1] += 1
+        self._report( 'transfer_retries' )
+        return kabbes_s3synchrony.backoff( state[1] - 1, base = self.backoff_seconds, cap = self.max_backoff_seconds )
+
+    def _abandon_attempt( self ):
+        if self.concurrency is not None:
+            self.concurrency.release( 0.0, 0, None )
+
+    def _call( self, function, item ):
+
+        """Call function( item ) in a slot of the concurrency limit, retrying what is worth retrying"""
+
+        state = [ 0, 0 ] # bytes moved by this attempt, retries so far
+        _item_state.set( state )
+
+        while True:
+            if self.concurrency is not None:
+                self.concurrency.acquire()
+
+            start = time.perf_counter()
+            state[0] = 0
+            try:
+                result = function( item )
+            except Exception as e:
+                seconds = self._end_attempt( start, state, e )
+                if seconds is None:
+                    raise
+                time.sleep( seconds )
+                continue
+            except BaseException:
+                self._abandon_attempt()
+                raise
+
+            self._end_attempt( start, state )
+            return result
+
+    def run( self, function, items, description = '', async_function = None ):
+
+        """Call function( item ) for every item, returning a list of booleans in the same order.
+        async_function is the coroutine version of function, only used by the AsyncTransferExecutor"""
+
+        items = list( items )
+        self._reset()
+        self.n_total = len( items )
+        self.description = description
+
+        results = [ False ] * len( items )
+        if len( items ) == 0:
+            return results
+
+        with concurrent.futures.ThreadPoolExecutor( max_workers = self.workers ) as executor:
+
+            futures = { executor.submit( self._call, function, item ): i for i, item in enumerate( items ) }
+            for future in concurrent.futures.as_completed( futures ):
+
+                i = futures[ future ]
+                try:
+                    self._finish_item( items, results, i, future.result() )
+                except Exception as e:
+                    self._finish_item( items, results, i, False, e )
+
+        self._print_progress( final = True )
+        return results
+
+    def _finish_item( self, items, results, i, success, error = None ):
+
+        results[i] = bool( success )
+
+        with self._lock:
+            if error is not None:
+                self.errors.append( ( items[i], error ) )
+            self.n_done += 1
+            if not results[i]:
+                self.n_failed += 1
+
+        self._print_progress()
+
+    def get_seconds( self ):
+        return time.perf_counter() - self._start
+
+    def get_files_per_second( self ):
+
+        seconds = self.get_seconds()
+        if seconds == 0:
+            return 0.0
+        return self.n_done / seconds
+
+    def get_bytes_per_second( self ):
+
+        seconds = self.get_seconds()
+        if seconds == 0:
+            return 0.0
+        return self.n_bytes / seconds
+
+    def _print_progress( self, final = False ):
+
+        if not self.print_off:
+            return
+
+        now = time.perf_counter()
+        if not final and now - self._last_print < self.PROGRESS_INTERVAL:
+            return
+        self._last_print = now
+
+        message = '{} {}/{} files, {:.1f} MB, {:.1f} files/s, {:.2f} MB/s'.format(
+            self.description, self.n_done, self.n_total, self.n_bytes / 1024**2,
+            self.get_files_per_second(), self.get_bytes_per_second() / 1024**2 ).strip()
+
+        if self.n_failed > 0:
+            message += ', {} failed'.format( self.n_failed )
+
+        sys.stdout.write( '\r' + message )
+        if final:
+            sys.stdout.write( '\n' )
+            for item, e in self.errors:
+                print ( 'ERROR: ' + str( item ) + ' - ' + repr( e ) )
+        sys.stdout.flush()
+
+
+class AsyncTransferExecutor( TransferExecutor ):
+
+    """Runs transfers as coroutines on an asyncio event loop, with up to concurrency of them in flight.
+    Items without a coroutine version run on a thread pool of workers threads instead.
+
+    contexts are callables returning async context managers entered around every run,
+    such as a platform opening its async client on the run's event loop"""
+
+    def __init__( self, workers = 8, concurrency = 256, print_off = True, **kwargs ):
+
+        """concurrency is the number of coroutines in flight, or an AIMD limiting them"""
+
+        if isinstance( concurrency, kabbes_s3synchrony.AIMD ):
+            TransferExecutor.__init__( self, workers = workers, print_off = print_off, concurrency = concurrency, **kwargs )
+            self.workers = max( 1, int( workers ) )
+            self.n_tasks = concurrency.maximum
+        else:
+            TransferExecutor.__init__( self, workers = workers, print_off = print_off, **kwargs )
+            self.n_tasks = max( 1, int( concurrency ) )
+
+        self.contexts = []
+        self._pool = None
+
+    def run( self, function, items, description = '', async_function = None ):
+
+        items = list( items )
+        self._reset()
+        self.n_total = len( items )
+        self.description = description
+
+        results = [ False ] * len( items )
+        if len( items ) == 0:
+            return results
+
+        asyncio.run( self._run( function, items, async_function, results ) )
+
+        self._print_progress( final = True )
+        return results
+
+    async def _run( self, function, items, async_function, results ):
+
+        async with contextlib.AsyncExitStack() as stack:
+            for context in self.contexts:
+                await stack.enter_async_context( context() )
+
+            with concurrent.futures.ThreadPoolExecutor( max_workers = self.workers ) as pool:
+                self._pool = pool
+
+                # a fixed number of tasks pull from one iterator, rather than a task per item
+                indices = iter( range( len( items ) ) )
+
+                async def work():
+                    for i in indices:
+                        try:
+                            success = await self._call_async( function, async_function, items[i] )
+                            self._finish_item( items, results, i, success )
+                        except Exception as e:
+                            self._finish_item( items, results, i, False, e )
+
+                try:
+                    await asyncio.gather( *[ work() for _ in range( min( self.n_tasks, len( items ) ) ) ] )
+                finally:
+                    self._pool = None
+
+    async def _call_async( self, function, async_function, item ):
+
+        state = [ 0, 0 ] # bytes moved by this attempt, retries so far
+        _item_state.set( state )
+
+        while True:
+            if self.concurrency is not None:
+                await self.concurrency.acquire_async()
+
+            start = time.perf_counter()
+            state[0] = 0
+            try:
+                if async_function is not None:
+                    result = await async_function( item )
+                else:
+                    result = await self.run_in_thread( function, item )
+            except Exception as e:
+                seconds = self._end_attempt( start, state, e )
+                if seconds is None:
+                    raise
+                await asyncio.sleep( seconds )
+                continue
+            except BaseException: # cancelled or interrupted
+                self._abandon_attempt()
+                raise
+
+            self._end_attempt( start, state )
+            return result
+
+    async def run_in_thread( self, function, *args ):
+
+        """Await a blocking call on the run's thread pool"""
+
+        # in the task's context, so the bytes it reports count toward the item
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor( self._pool, functools.partial( context.run, function, *args ) )
@@ -0,0 +1,167 @@
+from parent_class import ParentClass
+import threading
+import json
+import os
+
+
+class TransferLog( ParentClass ):
+
+    """Write-ahead log of the transfers of a sync, kept in the tmp folder of the util dir until the sync finishes.
+
+    Each line is one record of a file being planned, started or done by an operation. A sync that stops partway,
+    killed or crashed, leaves the log behind, and the next one replays it: files whose upload or remote delete was done
+    are recorded as such before the diff, so they are not transferred again, and an interrupted multipart upload
+    continues from the parts S3 already has. Downloads need no replaying, they land whole through a temporary file.
+
+    A replayed file must still be what the log recorded on both sides, otherwise it is synced as usual"""
+
+    FILENAME = 'transfers.jsonl'
+    OPERATIONS = [ 'upload_to_remote', 'download_from_remote', 'delete_from_remote', 'delete_from_local' ]
+    REMOTE_OPERATIONS = [ 'download_from_remote', 'delete_from_remote' ] # given remote Paths
+
+    def __init__( self, Platform ):
+
+        ParentClass.__init__( self )
+
+        self.Platform = Platform
+        self.path = os.path.join( Platform._tmp_lDir.path, self.FILENAME )
+
+        self.records = {} # ( op, rel_path ): the fields of every record of it, merged in order
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load( self ):
+
+        """Read the log a previous sync left, and remove the temporary downloads it was in the middle of"""
+
+        self.records = {}
+        try:
+            with open( self.path ) as file:
+                for line in file:
+                    try:
+                        record = json.loads( line )
+                        key = ( record['op'], record['file'] )
+                    except ( ValueError, KeyError, TypeError ): # the line being written when it stopped
+                        continue
+                    self.records.setdefault( key, {} ).update( record )
+        except OSError:
+            pass
+
+        if os.path.isdir( self.Platform._tmp_lDir.path ):
+            for filename in os.listdir( self.Platform._tmp_lDir.path ):
+                if filename.endswith( '.part' ):
+                    os.remove( os.path.join( self.Platform._tmp_lDir.path, filename ) )
+
+        return self
+
+    def _write( self, records, sync = False ):
+
+        with self._lock:
+            if self._file is None:
+                os.makedirs( os.path.dirname( self.path ), exist_ok = True )
+                self._file = open( self.path, 'a' )
+
+            for record in records:
+                self.records.setdefault( ( record['op'], record['file'] ), {} ).update( record )
+                self._file.write( json.dumps( record ) + '\n' )
+
+            self._file.flush()
+            if sync:
+                os.fsync( self._file.fileno() )
+
+    def get_rel_path( self, op, Path_inst ):
+
+        if op in self.REMOTE_OPERATIONS:
+            return Path_inst.get_rel( self.Platform.data_rDir ).path
+        return Path_inst.get_rel( self.Platform.data_lDir ).path
+
+    def plan( self, op, Paths_list ):
+
+        """Record the files about to be transferred along with the checksums on both sides, returning their rel paths"""
+
+        snapshot = self.Platform.snapshot
+        rel_paths = [ self.get_rel_path( op, Path_inst ) for Path_inst in Paths_list ]
+
+        records = []
+        for rel_path in rel_paths:
+            record = { 'op': op, 'file': rel_path, 'state': 'planned' }
+            if snapshot is not None:
+                record['checksum'] = snapshot.get_checksum( rel_path )
+                record['base'] = snapshot.get_remote_checksum( rel_path )
+            records.append( record )
+
+        self._write( records, sync = True )
+        return rel_paths
+
+    def start( self, op, rel_path ):
+        self._write( [ { 'op': op, 'file': rel_path, 'state': 'started' } ] )
+
+    def done( self, op, rel_paths ):
+        self._write( [ { 'op': op, 'file': rel_path, 'state': 'done' } for rel_path in rel_paths ] )
+
+    def get_multipart( self, rel_path ):
+
+        """Return the record of a multipart upload of rel_path left unfinished, or None"""
+
+        record = self.records.get( ( 'multipart', rel_path ) )
+        if record is None or record.get( 'state' ) != 'started':
+            return None
+        return record
+
+    def set_multipart( self, rel_path, **fields ):
+        self._write( [ dict( fields, op = 'multipart', file = rel_path, state = 'started' ) ], sync = True )
+
+    def end_multipart( self, rel_path ):
+        self._write( [ { 'op': 'multipart', 'file': rel_path, 'state': 'done' } ] )
+
+    def replay( self, snapshot ):
+
+        """Record in the snapshot what a previous sync finished but could not save. Returns the number of files replayed"""
+
+        uploaded = []
+        deleted = []
+        for ( op, rel_path ), record in self.records.items():
+
+            if record.get( 'state' ) != 'done':
+                continue
+
+            # only while the remote versions still hold what they did when the file was planned
+            if snapshot.get_remote_checksum( rel_path ) != record.get( 'base' ):
+                continue
+
+            # chunks are only found through the chunk index, which is saved with the versions
+            if op == 'upload_to_remote' and self.Platform._get_delta_store() is None:
+                if record.get( 'checksum' ) is not None and snapshot.get_checksum( rel_path ) == record['checksum']:
+                    uploaded.append( rel_path )
+
+            elif op == 'delete_from_remote' and record.get( 'base' ) is not None:
+                deleted.append( rel_path )
+
+        snapshot.record_uploaded( uploaded )
+        snapshot.record_deleted_remote( deleted )
+        return len( uploaded ) + len( deleted )
+
+    def clear( self, scope = None ):
+
+        """Forget the log once the sync saved everything it did. Given a Scope, only the files within it are forgotten"""
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+            if scope is not None:
+                self.records = { key: record for key, record in self.records.items() if not scope.contains( key[1] ) }
+            else:
+                self.records = {}
+
+            if len( self.records ) == 0:
+                if os.path.exists( self.path ):
+                    os.remove( self.path )
+                return
+
+            tmp_path = self.path + '.tmp'
+            with open( tmp_path, 'w' ) as file:
+                for record in self.records.values():
+                    file.write( json.dumps( record ) + '\n' )
+            os.replace( tmp_path, self.path )
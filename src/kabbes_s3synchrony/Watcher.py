@@ -0,0 +1,346 @@
+from parent_class import ParentClass
+import kabbes_s3synchrony
+import ctypes
+import ctypes.util
+import select
+import struct
+import errno
+import time
+import os
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct( 'iIII' ) # wd, mask, cookie, len
+
+
+class InotifySource( ParentClass ):
+
+    """Reports changed paths underneath root from Linux inotify, through ctypes.
+    Watches cost one descriptor per folder, not per file"""
+
+    READ_SIZE = 64 * 1024
+
+    def __init__( self, root, folders_to_skip = [], ignore = None ):
+
+        ParentClass.__init__( self )
+
+        self.root = root
+        self.folders_to_skip = set( folders_to_skip )
+        self.ignore = ignore
+
+        self._libc = ctypes.CDLL( ctypes.util.find_library( 'c' ) or 'libc.so.6', use_errno = True )
+        self._fd = self._libc.inotify_init1( IN_NONBLOCK | IN_CLOEXEC )
+        if self._fd < 0:
+            raise OSError( ctypes.get_errno(), 'inotify_init1 failed' )
+
+        self._rel_dirs = {} # wd: rel_dir
+        self._wds = {}      # rel_dir: wd
+
+        self._add_tree( '' )
+
+    def _add_tree( self, rel_dir ):
+
+        """Watch a folder and every folder underneath it"""
+
+        stack = [ rel_dir ]
+        while len( stack ) > 0:
+            rel_dir = stack.pop()
+            path = os.path.join( self.root, rel_dir ) if rel_dir != '' else self.root
+
+            wd = self._libc.inotify_add_watch( self._fd, os.fsencode( path ), WATCH_MASK )
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in ( errno.ENOENT, errno.ENOTDIR ): # removed before we got to it
+                    continue
+                raise OSError( error, 'inotify_add_watch failed for ' + path ) # ENOSPC: too many folders for fs.inotify.max_user_watches
+
+            self._rel_dirs[ wd ] = rel_dir
+            self._wds[ rel_dir ] = wd
+
+            try:
+                with os.scandir( path ) as it:
+                    for entry in it:
+                        if entry.is_dir( follow_symlinks = False ) and entry.name not in self.folders_to_skip:
+                            sub_rel_dir = self._join( rel_dir, entry.name )
+                            if self.ignore is None or not self.ignore.is_dir_ignored( sub_rel_dir ):
+                                stack.append( sub_rel_dir )
+            except ( FileNotFoundError, NotADirectoryError ):
+                continue
+
+    def _remove_tree( self, rel_dir ):
+
+        """Stop watching a folder that moved away, along with the folders underneath it"""
+
+        prefix = rel_dir + '/'
+        for sub_rel_dir in [ d for d in self._wds if d == rel_dir or d.startswith( prefix ) ]:
+            wd = self._wds.pop( sub_rel_dir )
+            self._rel_dirs.pop( wd, None )
+            self._libc.inotify_rm_watch( self._fd, wd )
+
+    def _join( self, rel_dir, name ):
+        if rel_dir == '':
+            return name
+        return rel_dir + '/' + name
+
+    def poll( self, timeout ):
+
+        """Wait up to timeout seconds for changes, returning ( rel_paths, overflowed )"""
+
+        rel_paths = set()
+        overflowed = False
+
+        readable, _, _ = select.select( [ self._fd ], [], [], timeout )
+        if len( readable ) == 0:
+            return rel_paths, overflowed
+
+        while True:
+            try:
+                buffer = os.read( self._fd, self.READ_SIZE )
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len( buffer ):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from( buffer, offset )
+                name = buffer[ offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length ].split( b'\0', 1 )[0]
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+
+                rel_dir = self._rel_dirs.get( wd )
+                if rel_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._rel_dirs.pop( wd, None )
+                    self._wds.pop( rel_dir, None )
+                    continue
+                if len( name ) == 0: # the watched folder itself
+                    continue
+
+                rel_path = self._join( rel_dir, os.fsdecode( name ) )
+                if mask & IN_ISDIR and ( rel_path.split( '/' )[-1] in self.folders_to_skip or ( self.ignore is not None and self.ignore.is_dir_ignored( rel_path ) ) ):
+                    continue
+
+                if mask & IN_ISDIR:
+                    if mask & ( IN_CREATE | IN_MOVED_TO ):
+                        self._add_tree( rel_path )
+                    elif mask & IN_MOVED_FROM:
+                        self._remove_tree( rel_path )
+
+                rel_paths.add( rel_path )
+
+        return rel_paths, overflowed
+
+    def close( self ):
+        os.close( self._fd )
+
+
+class PollingSource( ParentClass ):
+
+    """Reports changed paths underneath root by comparing a stat walk against the hash cache,
+    for platforms without inotify or when there are too many folders to watch"""
+
+    def __init__( self, root, hash_cache, folders_to_skip = [], poll_seconds = 10, ignore = None ):
+
+        ParentClass.__init__( self )
+
+        self.root = root
+        self.hash_cache = hash_cache
+        self.folders_to_skip = list( folders_to_skip )
+        self.ignore = ignore
+        self.poll_seconds = poll_seconds
+        self._last_poll = time.monotonic()
+        self._reported = {} # rel_path: stat of files reported but not in the cache yet, like ones modified moments ago
+
+    def poll( self, timeout ):
+
+        wait = self._last_poll + self.poll_seconds - time.monotonic()
+        if wait > timeout:
+            time.sleep( timeout )
+            return set(), False
+
+        time.sleep( max( 0, wait ) )
+        self._last_poll = time.monotonic()
+
+        rel_paths = set()
+        seen = set()
+        reported = {}
+        for rel_path, path, stat_result in kabbes_s3synchrony.iter_files( self.root, folders_to_skip = self.folders_to_skip, ignore = self.ignore ):
+            seen.add( rel_path )
+            if self.hash_cache.is_current( rel_path, stat_result ):
+                continue
+
+            key = ( stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino )
+            if self._reported.get( rel_path ) != key:
+                rel_paths.add( rel_path )
+            reported[ rel_path ] = key
+
+        self._reported = reported
+
+        # files that were hashed before and are gone now
+        rel_paths.update( rel_path for rel_path in self.hash_cache.entries if rel_path not in seen )
+        return rel_paths, False
+
+    def close( self ):
+        pass
+
+
+class Watcher( ParentClass ):
+
+    """Keeps the data dir in sync by synchronizing the paths that changed since the last time.
+
+    debounce_seconds:   wait for this long without changes before pushing them
+    interval_seconds:   synchronize at least this often, to pull what others pushed
+    full_scan_seconds:  walk the whole data dir this often, to catch anything the events missed
+    max_dirty:          past this many changed paths, a full scan is cheaper than keeping track
+    retry_seconds:      after a sync fails, wait a random time of up to this, doubled on every failure in a row,
+                        up to max_retry_seconds, before trying again with the paths it had"""
+
+    def __init__( self, Connection, debounce_seconds = 2, interval_seconds = 60, full_scan_seconds = 3600, max_dirty = 10000, poll_seconds = 10, use_inotify = True,
+                  retry_seconds = 5, max_retry_seconds = 300 ):
+
+        ParentClass.__init__( self )
+
+        self.Connection = Connection
+        self.debounce_seconds = debounce_seconds
+        self.interval_seconds = interval_seconds
+        self.full_scan_seconds = full_scan_seconds
+        self.max_dirty = max_dirty
+        self.poll_seconds = poll_seconds
+        self.use_inotify = use_inotify
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+
+        self.dirty = set()
+        self.overflowed = False
+        self.n_failures = 0 # syncs failed in a row
+        self._last_change = None
+        self._retry_at = 0.0
+
+    def run( self ):
+
+        self.Connection.template_module.set_cfg( self.Connection )
+        self.Connection.platform = self.Connection.platform_module.Platform( self.Connection )
+        self.Platform = self.Connection.platform
+
+        self.Platform.intro_message()
+        self.Platform.establish_connection()
+
+        self.source = self._get_source()
+        self._last_sync = self._last_full_sync = time.monotonic()
+        try:
+            self._full_sync()
+            self._loop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.source.close()
+            self.Platform.close_message()
+
+    def _get_source( self ):
+
+        folders_to_skip = self.Connection.get_util_dirs()
+
+        if self.use_inotify:
+            try:
+                return InotifySource( self.Platform.data_lDir.path, folders_to_skip = folders_to_skip, ignore = self.Platform._ignore )
+            except ( OSError, AttributeError ) as e:
+                print ( 'Watching by polling every ' + str( self.poll_seconds ) + ' seconds, inotify is unavailable: ' + str( e ) )
+
+        return PollingSource( self.Platform.data_lDir.path, self.Platform._get_hash_cache(), folders_to_skip = folders_to_skip, poll_seconds = self.poll_seconds, ignore = self.Platform._ignore )
+
+    def _loop( self ):
+
+        while True:
+
+            rel_paths, overflowed = self.source.poll( timeout = min( 1.0, self.debounce_seconds ) )
+            self._add_dirty( rel_paths, overflowed )
+
+            now = time.monotonic()
+            if now < self._retry_at: # keep collecting changes until the failed sync is retried
+                continue
+
+            if self.overflowed or now - self._last_full_sync >= self.full_scan_seconds:
+                self._full_sync()
+
+            elif len( self.dirty ) > 0 and now - self._last_change >= self.debounce_seconds:
+                self._incremental_sync()
+
+            elif now - self._last_sync >= self.interval_seconds:
+                self._incremental_sync()
+
+    def _add_dirty( self, rel_paths, overflowed ):
+
+        if overflowed:
+            self.overflowed = True
+
+        if len( rel_paths ) == 0:
+            return
+
+        self._last_change = time.monotonic()
+        if self.overflowed:
+            return
+
+        self.dirty.update( rel_paths )
+        if len( self.dirty ) > self.max_dirty:
+            self.overflowed = True
+            self.dirty = set()
+
+    def _incremental_sync( self ):
+
+        dirty = self.dirty
+        self.dirty = set()
+
+        try:
+            self.Platform.synchronize( changed_rel_paths = dirty )
+        except Exception as e:
+            # the paths are still to sync, along with any that changed since
+            self._add_dirty( dirty, False )
+            self._sync_failed( e )
+            return
+
+        self.n_failures = 0
+        self._last_sync = time.monotonic()
+
+    def _full_sync( self ):
+
+        self.dirty = set()
+        self.overflowed = False
+
+        try:
+            self.Platform.synchronize()
+        except Exception as e:
+            # only another full scan can tell what it missed
+            self.overflowed = True
+            self._sync_failed( e )
+            return
+
+        self.n_failures = 0
+        self._last_sync = self._last_full_sync = time.monotonic()
+
+    def _sync_failed( self, e ):
+
+        """Log a failed sync and put off the next one, for longer with every failure in a row"""
+
+        seconds = kabbes_s3synchrony.backoff( self.n_failures, base = self.retry_seconds, cap = self.max_retry_seconds )
+        self.n_failures += 1
+        self._retry_at = time.monotonic() + seconds
+
+        print ( 'ERROR: sync failed ' + str( self.n_failures ) + ' times in a row, retrying in ' + str( round( seconds, 1 ) ) + 's - ' + repr( e ) )
@@ -1,18 +1,74 @@
 import dir_ops as do
+import importlib
+import types
+import sys
 import os
 
 _Dir = do.Dir( os.path.abspath( __file__ ) ).ascend()   #Dir that contains the package 
 templates_Dir = do.Dir( _Dir.join( 'Templates' ) )
 platforms_Dir = do.Dir( _Dir.join( 'Platforms') )
 
-from .BasePlatform import BasePlatform
-from . import Platforms
+# submodules are imported on first use, so a run that has nothing to sync never loads pandas or boto3
+_LAZY = {
+    'Ignore': '.Ignore', 'Scope': '.Ignore',
+    'Scanner': '.Scanner', 'iter_files': '.Scanner', 'sort_key': '.Scanner',
+    'HashCache': '.HashCache', 'HashCacheDB': '.HashCache',
+    'Hasher': '.Hasher', 'hash_file': '.Hasher',
+    'Diff': '.Diff',
+    'Snapshot': '.Snapshot',
+    'TransferExecutor': '.Transfer', 'AsyncTransferExecutor': '.Transfer',
+    'AIMD': '.Throttle', 'Bandwidth': '.Throttle', 'TokenBucket': '.Throttle', 'ThrottledFile': '.Throttle', 'backoff': '.Throttle',
+    'Metrics': '.Metrics',
+    'Fingerprint': '.Fingerprint', 'fingerprint_files': '.Fingerprint', 'update_fingerprint': '.Fingerprint',
+    'Chunker': '.Chunker',
+    'DeltaStore': '.Delta',
+    'BlobStore': '.Blobs',
+    'Journal': '.Journal',
+    'TransferLog': '.TransferLog',
+    'Stream': '.Stream', 'merge_join': '.Stream',
+    'Compressor': '.Compression', 'decompress_stream': '.Compression',
+    'FanOut': '.FanOut', 'SharedReads': '.FanOut',
+    'Watcher': '.Watcher', 'InotifySource': '.Watcher', 'PollingSource': '.Watcher',
+    'BaseManifest': '.BaseManifest', 'ManifestWriter': '.BaseManifest',
+    'BasePlatform': '.BasePlatform',
+    'Connection': '.Connection',
+    'Client': '.Client',
+}
+
+def __getattr__( name: str ):
+
+    if name in _LAZY:
+        module = importlib.import_module( _LAZY[ name ], __name__ )
+
+        for lazy_name in _LAZY:
+            if _LAZY[ lazy_name ] == _LAZY[ name ]:
+                globals()[ lazy_name ] = getattr( module, lazy_name )
+        return globals()[ name ]
+
+    if name in ( 'Manifests', 'Platforms', 'Templates' ):
+        return importlib.import_module( '.' + name, __name__ )
+
+    raise AttributeError( 'module ' + repr( __name__ ) + ' has no attribute ' + repr( name ) )
+
+class _Package( types.ModuleType ):
+
+    def __setattr__( self, name, value ):
+
+        # importing a submodule by its path sets the package attribute of its name to it, whichever way it was imported
+        if name in _LAZY and isinstance( value, types.ModuleType ) and value.__name__ == __name__ + '.' + name:
+            value = getattr( value, name )
+        types.ModuleType.__setattr__( self, name, value )
+
+sys.modules[ __name__ ].__class__ = _Package
+
+def __dir__():
+    return sorted( list( globals() ) + list( _LAZY ) )
+
+def get_manifest( manifest_name: str ):
+    return importlib.import_module( '.Manifests.' + manifest_name, __name__ )
+
 def get_platform( platform_name: str ):
-    return getattr( Platforms, platform_name )
+    return importlib.import_module( '.Platforms.' + platform_name, __name__ )
 
-from . import Templates
 def get_template( template_name: str ):
-    return getattr( Templates, template_name )
-
-from .Connection import Connection
-from .Client import Client
\ No newline at end of file
+    return importlib.import_module( '.Templates.' + template_name, __name__ )
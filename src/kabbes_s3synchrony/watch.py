@@ -0,0 +1,17 @@
+import kabbes_s3synchrony
+
+# nobody is there to answer the prompts, Platform skips the reverts when auto_approve is on
+client = kabbes_s3synchrony.Client( dict = { 'auto_approve': True } )
+
+watcher = kabbes_s3synchrony.Watcher(
+    client,
+    debounce_seconds = float( client.cfg['watch.debounce_seconds'] ),
+    interval_seconds = float( client.cfg['watch.interval_seconds'] ),
+    full_scan_seconds = float( client.cfg['watch.full_scan_seconds'] ),
+    max_dirty = int( client.cfg['watch.max_dirty'] ),
+    poll_seconds = float( client.cfg['watch.poll_seconds'] ),
+    use_inotify = bool( client.cfg['watch.inotify'] ),
+    retry_seconds = float( client.cfg['watch.retry_seconds'] ),
+    max_retry_seconds = float( client.cfg['watch.max_retry_seconds'] )
+)
+watcher.run()
@@ -0,0 +1,75 @@
+import os
+import pytest
+import kabbes_s3synchrony
+
+
+@pytest.fixture( scope = 'session', autouse = True )
+def base_dir( tmp_path_factory ):
+
+    """The cwd of every Client, which only the first one reads, so each test's data dir is relative to it"""
+
+    base_dir = tmp_path_factory.getbasetemp()
+    cwd = os.getcwd()
+    os.chdir( base_dir )
+    yield base_dir
+    os.chdir( cwd )
+
+
+@pytest.fixture
+def make_client( tmp_path, base_dir ):
+
+    """Return a function making a Client that syncs tmp_path/<who>/Data with the local platform remote in tmp_path/remote"""
+
+    def make_client( who = 'alice', **cfg ):
+
+        d = {
+            'platform': 'local',
+            'local_data_rel_dir': os.path.relpath( tmp_path / who / 'Data', base_dir ),
+            'remote_data_dir': 'data',
+            'auto_approve': True,
+            'fast_noop': False,
+            'platforms': { 'local': { 'remote_root': str( tmp_path / 'remote' ) } }
+        }
+        d.update( cfg )
+
+        client = kabbes_s3synchrony.Client( dict = d )
+        client.cfg.load_dict( { '_name': who } )
+        return client
+
+    return make_client
+
+
+def write( tmp_path, who, rel_path, content ):
+
+    path = tmp_path / who / 'Data' / rel_path
+    path.parent.mkdir( parents = True, exist_ok = True )
+    path.write_bytes( content )
+
+
+S3_NODE = {
+    'aws_bkt': 'bkt',
+    'credentials': { 'aws_access_key_id': 'testing', 'aws_secret_access_key': 'testing', 'region_name': 'us-east-1' }
+}
+
+@pytest.fixture
+def make_s3_client( make_client, monkeypatch ):
+
+    """Return a function making a Client that syncs with the s3 platform on a moto bucket, a local stand-in for S3"""
+
+    moto = pytest.importorskip( 'moto' )
+    boto3 = pytest.importorskip( 'boto3' )
+
+    for key in [ 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY' ]:
+        monkeypatch.setenv( key, 'testing' )
+    monkeypatch.setenv( 'AWS_DEFAULT_REGION', 'us-east-1' )
+
+    with moto.mock_aws():
+        boto3.client( 's3' ).create_bucket( Bucket = 'bkt' )
+
+        def make_s3_client( who = 'alice', node = {}, **cfg ):
+
+            client = make_client( who, platform = 's3', **cfg )
+            client.cfg.get_node( 'platforms.s3' ).load_dict( dict( S3_NODE, **node ) )
+            return client
+
+        yield make_s3_client
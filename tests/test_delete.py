@@ -0,0 +1,27 @@
+import pytest
+from conftest import write
+
+
+@pytest.mark.parametrize( 'cfg', [
+    { 'content_addressed': True },
+    { 'delta': True, 'delta_min_file_size_mb': 0.001, 'delta_chunk_size_mb': 0.001 },
+] )
+def test_delete_file_stored_without_its_own_object( tmp_path, make_client, cfg ):
+
+    content = b'x' * 5000 + b'y' * 5000
+    write( tmp_path, 'alice', 'a.bin', content )
+    write( tmp_path, 'alice', 'b.txt', b'kept' )
+    make_client( 'alice', **cfg ).run()
+
+    assert not ( tmp_path / 'remote' / 'data' / 'a.bin' ).exists()
+
+    ( tmp_path / 'alice' / 'Data' / 'a.bin' ).unlink()
+    make_client( 'alice', **cfg ).run()
+
+    # the delete was recorded, so neither the next sync nor a teammate brings it back
+    make_client( 'alice', **cfg ).run()
+    assert not ( tmp_path / 'alice' / 'Data' / 'a.bin' ).exists()
+
+    make_client( 'bob', **cfg ).run()
+    assert not ( tmp_path / 'bob' / 'Data' / 'a.bin' ).exists()
+    assert ( tmp_path / 'bob' / 'Data' / 'b.txt' ).read_bytes() == b'kept'
@@ -0,0 +1,34 @@
+import kabbes_s3synchrony
+
+
+def get_platform( tmp_path, make_client, who ):
+
+    ( tmp_path / who / 'Data' ).mkdir( parents = True )
+    client = make_client( who, delta = True )
+    platform = client.platform_module.Platform( client )
+    platform.establish_connection()
+    return platform
+
+
+def test_overlapping_saves_keep_both_chunk_lists( tmp_path, make_client ):
+
+    alice = kabbes_s3synchrony.DeltaStore( get_platform( tmp_path, make_client, 'alice' ) )
+    bob = kabbes_s3synchrony.DeltaStore( get_platform( tmp_path, make_client, 'bob' ) )
+
+    alice.load()
+    alice.index['old'] = [ [ 'c0', 1 ] ]
+    alice.save()
+
+    # both load the same index, then each adds a file and bob collects 'old' as garbage
+    alice.load()
+    bob.load()
+    alice.index['a'] = [ [ 'c1', 1 ] ]
+    bob.index['b'] = [ [ 'c2', 1 ] ]
+    del bob.index['old']
+
+    alice.save()
+    bob.save()
+    assert bob.Platform.metrics.counts['delta_index_conflicts'] == 1
+
+    alice.load()
+    assert alice.index == { 'a': [ [ 'c1', 1 ] ], 'b': [ [ 'c2', 1 ] ] }
@@ -0,0 +1,31 @@
+import os
+import pytest
+from conftest import write
+
+
+@pytest.mark.parametrize( 'cfg', [
+    { 'delta': True, 'delta_min_file_size_mb': 0.001, 'delta_chunk_size_mb': 0.001 },
+    { 'content_addressed': True },
+] )
+def test_partial_downloads_stay_out_of_the_data_dir( tmp_path, make_client, monkeypatch, cfg ):
+
+    content = b'x' * 5000 + b'y' * 5000
+    write( tmp_path, 'alice', 'a.bin', content )
+    make_client( 'alice', **cfg ).run()
+
+    # bob has the content under another name, which content_addressed copies instead of downloading
+    write( tmp_path, 'bob', 'copy.bin', content )
+
+    # every file renamed into place was written somewhere a killed sync would leave it
+    sources = []
+    replace = os.replace
+    def spy( source, destination ):
+        sources.append( os.path.relpath( source, tmp_path / 'bob' / 'Data' ) )
+        return replace( source, destination )
+    monkeypatch.setattr( os, 'replace', spy )
+
+    make_client( 'bob', **cfg ).run()
+    assert ( tmp_path / 'bob' / 'Data' / 'a.bin' ).read_bytes() == content
+    # the util dir is cleaned by the next sync, and .. is the local remote bob uploads copy.bin to
+    leftovers = [ source for source in sources if source.endswith( '.part' ) and not source.startswith( ( '.LOCAL' + os.sep, '..' + os.sep ) ) ]
+    assert leftovers == []
@@ -0,0 +1,55 @@
+import os
+import pytest
+import time
+import kabbes_s3synchrony
+from conftest import write
+
+
+def test_files_hashed_once_are_cached_despite_atime( tmp_path, make_client, monkeypatch ):
+
+    old_ns = time.time_ns() - 3 * 24 * 3600 * 10**9
+    for i in range( 20 ):
+        write( tmp_path, 'alice', 'f{}.txt'.format( i ), b'content' + bytes( [i] ) )
+        os.utime( tmp_path / 'alice' / 'Data' / 'f{}.txt'.format( i ), ns = ( old_ns, old_ns ) )
+
+    # reading a file updates its atime whenever the filesystem decides to, make it always do
+    hash_paths = kabbes_s3synchrony.Hasher.hash_paths
+    def hash_paths_touching_atime( self, paths ):
+        checksums = list( hash_paths( self, paths ) )
+        for path in paths:
+            os.utime( path, ns = ( time.time_ns(), os.stat( path ).st_mtime_ns ) )
+        return checksums
+    monkeypatch.setattr( kabbes_s3synchrony.Hasher, 'hash_paths', hash_paths_touching_atime )
+
+    alice = make_client( 'alice' )
+    alice.run()
+    assert alice.platform.metrics.counts['files_hashed'] == 20
+
+    alice = make_client( 'alice' )
+    alice.run()
+    assert alice.platform.metrics.counts.get( 'files_hashed', 0 ) == 0
+    assert alice.platform.metrics.counts['files_cached'] == 20
+
+
+@pytest.mark.parametrize( 'removed', [ 'before_hash', 'after_hash' ] )
+@pytest.mark.parametrize( 'streaming', [ False, True ] )
+def test_file_removed_after_the_walk_is_left_out( tmp_path, make_client, monkeypatch, removed, streaming ):
+
+    for name in [ 'a.txt', 'b.txt', 'c.txt' ]:
+        write( tmp_path, 'alice', name, name.encode() )
+    b_path = str( tmp_path / 'alice' / 'Data' / 'b.txt' )
+
+    hash_paths = kabbes_s3synchrony.Hasher.hash_paths
+    def hash_paths_removing( self, paths ):
+        if removed == 'before_hash' and b_path in paths:
+            os.remove( b_path )
+        checksums = hash_paths( self, paths )
+        if removed == 'after_hash' and b_path in paths:
+            os.remove( b_path )
+        return checksums
+    monkeypatch.setattr( kabbes_s3synchrony.Hasher, 'hash_paths', hash_paths_removing )
+
+    alice = make_client( 'alice', streaming = streaming )
+    alice.run()
+
+    assert sorted( os.listdir( tmp_path / 'remote' / 'data' ) ) == [ '.LOCAL', 'a.txt', 'c.txt' ]
@@ -0,0 +1,44 @@
+import pytest
+import kabbes_s3synchrony
+
+
+@pytest.mark.parametrize( 'lines, rel_path, ignored', [
+    # anchored to the data dir by a leading slash
+    ( [ '/x' ], 'x', True ),
+    ( [ '/x' ], 'sub/x', False ),
+    ( [ 'x' ], 'sub/x', True ),
+    # a trailing slash only matches folders, and everything in them
+    ( [ 'dir/' ], 'dir/a.txt', True ),
+    ( [ 'dir/' ], 'sub/dir/a.txt', True ),
+    ( [ 'dir/' ], 'dir', False ),
+    # ** across any number of folders, * within one
+    ( [ '**/logs/*.log' ], 'logs/a.log', True ),
+    ( [ '**/logs/*.log' ], 'a/b/logs/a.log', True ),
+    ( [ '**/logs/*.log' ], 'logs/sub/a.log', False ),
+    ( [ 'raw/**' ], 'raw/a/b.txt', True ),
+    ( [ 'raw/**' ], 'other/raw/b.txt', False ),
+    ( [ 'a/**/z.txt' ], 'a/z.txt', True ),
+    ( [ 'a/**/z.txt' ], 'a/b/c/z.txt', True ),
+    # a negation re-includes a file an earlier rule ignored, and the last matching rule wins
+    ( [ '*.csv', '!keep.csv' ], 'keep.csv', False ),
+    ( [ '*.csv', '!keep.csv' ], 'drop.csv', True ),
+    ( [ '*.csv', '!keep.csv', 'keep.csv' ], 'keep.csv', True ),
+    # but nothing inside an ignored folder can be re-included
+    ( [ 'build/', '!build/keep.txt' ], 'build/keep.txt', True ),
+    ( [ 'build/', '!build/keep.txt' ], 'build/sub/other.txt', True ),
+    # an escaped # or ! is part of the name, an unescaped # starts a comment
+    ( [ '\\#notes.txt' ], '#notes.txt', True ),
+    ( [ '#notes.txt' ], '#notes.txt', False ),
+    ( [ '\\!important.txt' ], '!important.txt', True ),
+    # character classes match one character within a component
+    ( [ 'data[0-9].csv' ], 'data7.csv', True ),
+    ( [ 'data[0-9].csv' ], 'dataX.csv', False ),
+    ( [ 'data[!0-9].csv' ], 'dataX.csv', True ),
+    ( [ 'data[!0-9].csv' ], 'data7.csv', False ),
+    ( [ 'data[^0-9].csv' ], 'data7.csv', False ),
+    ( [ 'a[/]b' ], 'a/b', False ),
+    ( [ 'a[!x]b' ], 'a/b', False ),
+] )
+def test_rules( lines, rel_path, ignored ):
+
+    assert kabbes_s3synchrony.Ignore( lines ).is_ignored( rel_path ) == ignored
@@ -0,0 +1,18 @@
+import subprocess
+import sys
+import os
+import pytest
+
+
+@pytest.mark.parametrize( 'statements', [
+    'from kabbes_s3synchrony.BasePlatform import data_function; import kabbes_s3synchrony.Platforms.local',
+    'from kabbes_s3synchrony.BaseManifest import ManifestWriter; import kabbes_s3synchrony.Manifests.csv',
+    'import kabbes_s3synchrony.Snapshot; import kabbes_s3synchrony; assert isinstance( kabbes_s3synchrony.Snapshot, type )',
+    'import kabbes_s3synchrony.Ignore; import kabbes_s3synchrony; assert isinstance( kabbes_s3synchrony.Ignore, type ) and isinstance( kabbes_s3synchrony.Scope, type )',
+] )
+def test_submodule_imported_first( statements ):
+
+    # each in a fresh interpreter, as the package attributes are set by whichever import comes first
+    result = subprocess.run( [ sys.executable, '-c', statements ], capture_output = True, text = True,
+                             env = dict( os.environ, PYTHONPATH = os.pathsep.join( sys.path ) ) )
+    assert result.returncode == 0, result.stderr
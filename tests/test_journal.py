@@ -0,0 +1,101 @@
+import json
+import os
+import pytest
+import kabbes_s3synchrony
+from conftest import write
+
+
+def read_journal( tmp_path, rel_dir ):
+
+    journal_dir = tmp_path / 'remote' / 'data' / '.LOCAL' / 'journal' / rel_dir
+    if not journal_dir.exists():
+        return {}
+    return { int( name.split( '.' )[0] ): name for name in os.listdir( journal_dir ) if name.split( '.' )[0].isdigit() }
+
+
+def sync_in_between( monkeypatch, function_name, who, other_sync ):
+
+    """Run other_sync the first time who's sync reaches the given Journal function, as if both synced at once"""
+
+    function = getattr( kabbes_s3synchrony.Journal, function_name )
+    calls = []
+
+    def wrapper( self, *args, **kwargs ):
+        if self.Platform.Connection.cfg['_name'] == who and len( calls ) == 0:
+            calls.append( 'in between' )
+            other_sync()
+        result = function( self, *args, **kwargs )
+        if self.Platform.Connection.cfg['_name'] == who:
+            calls.append( result )
+        return result
+
+    monkeypatch.setattr( kabbes_s3synchrony.Journal, function_name, wrapper )
+    return calls
+
+
+def test_entry_taken_first_is_applied_before_appending( tmp_path, make_client, monkeypatch ):
+
+    cfg = { 'journal': True }
+    write( tmp_path, 'alice', 'a.txt', b'a' )
+    make_client( 'alice', **cfg ).run()
+    make_client( 'bob', **cfg ).run()
+    n_entries = len( read_journal( tmp_path, 'entries' ) )
+
+    # bob appends the entry alice loaded as the next one between her load and her commit
+    write( tmp_path, 'alice', 'x.txt', b'from alice' )
+    write( tmp_path, 'bob', 'y.txt', b'from bob' )
+    os.remove( tmp_path / 'bob' / 'Data' / 'a.txt' )
+    sync_in_between( monkeypatch, 'commit', 'alice', make_client( 'bob', **cfg ).run )
+
+    alice = make_client( 'alice', **cfg )
+    alice.run()
+    assert alice.platform.metrics.counts['journal_conflicts'] == 1
+
+    entries = read_journal( tmp_path, 'entries' )
+    assert len( entries ) == n_entries + 2
+    journal_dir = tmp_path / 'remote' / 'data' / '.LOCAL' / 'journal' / 'entries'
+    last_two = [ json.loads( ( journal_dir / entries[ seq ] ).read_text() ) for seq in sorted( entries )[-2:] ]
+    assert [ entry['user'] for entry in last_two ] == [ 'bob', 'alice' ]
+    assert [ row[0] for row in last_two[1]['upsert'] ] == [ 'x.txt' ]
+
+    # neither sync lost the other's changes
+    make_client( 'carol', **cfg ).run()
+    assert sorted( os.listdir( tmp_path / 'carol' / 'Data' ) ) == [ '.LOCAL', 'x.txt', 'y.txt' ]
+
+
+def test_head_replaced_first_keeps_the_other_snapshot( tmp_path, make_client, monkeypatch ):
+
+    cfg = { 'journal': True, 'journal_compact_every': 1 }
+    write( tmp_path, 'alice', 'a.txt', b'a' )
+    make_client( 'alice', **cfg ).run()
+    make_client( 'bob', **cfg ).run()
+
+    # bob compacts between alice's load of HEAD.json and her replacing it
+    write( tmp_path, 'alice', 'x.txt', b'from alice' )
+    write( tmp_path, 'bob', 'y.txt', b'from bob' )
+    compacts = sync_in_between( monkeypatch, 'compact', 'alice', make_client( 'bob', **cfg ).run )
+
+    alice = make_client( 'alice', **cfg )
+    alice.run()
+    assert compacts == [ 'in between', False ]
+
+    # HEAD.json still names bob's snapshot, and alice's was removed again
+    head = json.loads( ( tmp_path / 'remote' / 'data' / '.LOCAL' / 'journal' / 'HEAD.json' ).read_text() )
+    snapshots = read_journal( tmp_path, 'snapshots' )
+    assert head['seq'] in snapshots
+    assert max( snapshots ) == head['seq']
+
+    # alice's entry is after the snapshot, so the next sync catches up from it
+    make_client( 'carol', **cfg ).run()
+    assert sorted( os.listdir( tmp_path / 'carol' / 'Data' ) ) == [ '.LOCAL', 'a.txt', 'x.txt', 'y.txt' ]
+
+
+def test_journal_refused_without_conditional_writes( make_client ):
+
+    client = make_client( 'alice', journal = True )
+
+    class Platform( client.platform_module.Platform ):
+        _upload_bytes_if = None
+
+    with pytest.raises( ValueError, match = 'conditional writes' ):
+        Platform( client )
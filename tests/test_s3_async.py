@@ -0,0 +1,84 @@
+import contextlib
+import hashlib
+import socket
+import os
+import pytest
+import kabbes_s3synchrony
+from conftest import S3_NODE, write
+
+pytest.importorskip( 'aiobotocore' )
+moto_server = pytest.importorskip( 'moto.server' )
+boto3 = pytest.importorskip( 'boto3' )
+
+
+@pytest.fixture
+def endpoint_url( monkeypatch ):
+
+    """A moto server on localhost, as aiobotocore talks to it over http and the in-process mock cannot see that"""
+
+    for key in [ 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY' ]:
+        monkeypatch.setenv( key, 'testing' )
+    monkeypatch.setenv( 'AWS_DEFAULT_REGION', 'us-east-1' )
+
+    with socket.socket() as sock:
+        sock.bind( ( '127.0.0.1', 0 ) )
+        port = sock.getsockname()[1]
+
+    server = moto_server.ThreadedMotoServer( ip_address = '127.0.0.1', port = port )
+    server.start()
+    yield 'http://127.0.0.1:' + str( port )
+    server.stop()
+
+
+def test_async_transfers_use_the_aio_client( tmp_path, make_client, endpoint_url, monkeypatch ):
+
+    s3 = boto3.client( 's3', endpoint_url = endpoint_url )
+    s3.create_bucket( Bucket = 'bkt' )
+
+    # put there without s3synchrony, so its checksum is looked up when the prefix is initialized
+    s3.put_object( Bucket = 'bkt', Key = 'data/remote.txt', Body = b'remote' )
+
+    ( tmp_path / 'alice' / 'Data' ).mkdir( parents = True )
+    client = make_client( 'alice', platform = 's3' )
+    client.cfg.get_node( 'platforms.s3' ).load_dict( dict( S3_NODE, endpoint_url = endpoint_url, etag_is_md5 = False, transfer_mode = 'async' ) )
+    Platform = client.platform_module.Platform
+
+    # the calls made on the aio client, the blocking one does not go through it
+    operations = []
+    open_async_client = Platform._open_async_client
+    @contextlib.asynccontextmanager
+    async def recording_async_client( self ):
+        async with open_async_client( self ) as aio_client:
+            aio_client.meta.events.register( 'after-call.s3', lambda model = None, **kwargs: operations.append( model.name ) )
+            yield aio_client
+    monkeypatch.setattr( Platform, '_open_async_client', recording_async_client )
+
+    platform = Platform( client )
+    platform.establish_connection()
+    assert 'HeadObject' in operations
+    assert platform._list_remote_versions().set_index( platform._file_colname ).loc[ 'remote.txt', platform._hash_colname ] == hashlib.md5( b'remote' ).hexdigest()
+
+    platform.snapshot = kabbes_s3synchrony.Snapshot( platform )
+
+    rel_paths = [ 'f{}.txt'.format( i ) for i in range( 5 ) ]
+    lPaths = platform.PATHS_CLASS()
+    for rel_path in rel_paths:
+        write( tmp_path, 'alice', rel_path, rel_path.encode() )
+        lPaths._add( platform.data_lDir.join_Path( path = rel_path ) )
+
+    operations.clear()
+    assert len( platform._upload_to_remote( lPaths ) ) == 5
+    assert operations.count( 'PutObject' ) == 5
+    for rel_path in rel_paths:
+        assert s3.get_object( Bucket = 'bkt', Key = 'data/' + rel_path )['Body'].read() == rel_path.encode()
+        os.remove( tmp_path / 'alice' / 'Data' / rel_path )
+
+    rPaths = platform.PATHS_CLASS()
+    for rel_path in rel_paths:
+        rPaths._add( platform.data_rDir.join_Path( path = rel_path ) )
+
+    operations.clear()
+    assert len( platform._download_from_remote( rPaths ) ) == 5
+    assert operations.count( 'GetObject' ) == 5
+    for rel_path in rel_paths:
+        assert ( tmp_path / 'alice' / 'Data' / rel_path ).read_bytes() == rel_path.encode()
@@ -0,0 +1,32 @@
+import boto3
+import pytest
+
+
+def test_failed_checksum_aborts_prefix_init( tmp_path, make_s3_client, monkeypatch ):
+
+    # objects put there without s3synchrony, and with ETags not trusted as md5s, are checksummed one by one
+    s3 = boto3.client( 's3' )
+    for name in [ 'a.txt', 'b.txt', 'c.txt' ]:
+        s3.put_object( Bucket = 'bkt', Key = 'data/' + name, Body = name.encode() )
+
+    client = make_s3_client( 'alice', node = { 'etag_is_md5': False } )
+    platform_module = client.platform_module
+    get_remote_checksum = platform_module.Platform._get_remote_checksum
+    def failing_lookup( self, key ):
+        if key.endswith( 'b.txt' ):
+            raise ConnectionError( 'lookup failed' )
+        return get_remote_checksum( self, key )
+    monkeypatch.setattr( platform_module.Platform, '_get_remote_checksum', failing_lookup )
+
+    ( tmp_path / 'alice' / 'Data' ).mkdir( parents = True )
+    with pytest.raises( RuntimeError, match = 'b.txt' ):
+        platform_module.Platform( client ).establish_connection()
+
+    # nothing went up as the team's records, so the next sync initializes the prefix again
+    keys = [ obj['Key'] for obj in s3.list_objects_v2( Bucket = 'bkt' ).get( 'Contents', [] ) ]
+    assert sorted( keys ) == [ 'data/a.txt', 'data/b.txt', 'data/c.txt' ]
+
+    monkeypatch.setattr( platform_module.Platform, '_get_remote_checksum', get_remote_checksum )
+    platform_module.Platform( client ).establish_connection()
+    keys = [ obj['Key'] for obj in s3.list_objects_v2( Bucket = 'bkt' ).get( 'Contents', [] ) ]
+    assert len( keys ) > 3
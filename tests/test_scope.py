@@ -0,0 +1,52 @@
+import os
+import time
+import pytest
+from conftest import write
+
+
+def read_records( client ):
+
+    """The remote versions as of the client's last sync, by file"""
+
+    platform = client.platform
+    df = platform.Manifest.read( platform._remote_versions_lPath )
+    return { row[0]: row for row in df.itertuples( index = False, name = None ) }
+
+
+@pytest.mark.parametrize( 'cfg', [ {}, { 'manifest': 'sqlite' }, { 'journal': True } ], ids = [ 'csv', 'sqlite', 'journal' ] )
+def test_scoped_sync_leaves_the_rest_alone( tmp_path, make_client, cfg ):
+
+    for rel_path in [ 'raw/in/a.txt', 'raw/out/b.txt', 'docs/c.txt' ]:
+        write( tmp_path, 'alice', rel_path, b'from alice' )
+    make_client( 'alice', **cfg ).run()
+    make_client( 'bob', **cfg ).run()
+
+    # the records keep times to the second, so bob's changes are dated after alice's first sync
+    later = time.time() + 10
+    for rel_path in [ 'raw/in/a.txt', 'raw/out/b.txt' ]:
+        write( tmp_path, 'bob', rel_path, b'changed by bob' )
+        os.utime( tmp_path / 'bob' / 'Data' / rel_path, ( later, later ) )
+    bob = make_client( 'bob', **cfg )
+    bob.run()
+    records_before = read_records( bob )
+
+    # alice removed a file outside the scope, and has an older copy of another
+    os.remove( tmp_path / 'alice' / 'Data' / 'docs' / 'c.txt' )
+    write( tmp_path, 'alice', 'raw/in/new.txt', b'new' )
+    make_client( 'alice', scope = 'raw/in/', **cfg ).run()
+
+    assert ( tmp_path / 'alice' / 'Data' / 'raw' / 'in' / 'a.txt' ).read_bytes() == b'changed by bob'
+    assert ( tmp_path / 'alice' / 'Data' / 'raw' / 'out' / 'b.txt' ).read_bytes() == b'from alice'
+    assert not ( tmp_path / 'alice' / 'Data' / 'docs' / 'c.txt' ).exists()
+
+    carol = make_client( 'carol', **cfg )
+    carol.run()
+    records_after = read_records( carol )
+
+    # the rows outside the scope are bob's, exactly as he left them, and their files are still there
+    for rel_path in [ 'raw/out/b.txt', 'docs/c.txt' ]:
+        assert records_after[ rel_path ] == records_before[ rel_path ]
+    assert records_after[ 'raw/in/new.txt' ][1] == 'alice'
+    assert sorted( records_after ) == [ 'docs/c.txt', 'raw/in/a.txt', 'raw/in/new.txt', 'raw/out/b.txt' ]
+    assert ( tmp_path / 'carol' / 'Data' / 'raw' / 'out' / 'b.txt' ).read_bytes() == b'changed by bob'
+    assert ( tmp_path / 'carol' / 'Data' / 'docs' / 'c.txt' ).read_bytes() == b'from alice'
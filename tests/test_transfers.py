@@ -0,0 +1,63 @@
+import os
+import pytest
+import kabbes_s3synchrony
+from conftest import write
+
+@pytest.fixture
+def s3_platform( tmp_path, make_s3_client, monkeypatch ):
+
+    def make_platform( **node ):
+
+        ( tmp_path / 'alice' / 'Data' ).mkdir( parents = True, exist_ok = True )
+        client = make_s3_client( 'alice', node = node )
+
+        # the in-process mock cannot answer aiobotocore, so async runs the blocking calls on its threads, test_s3_async covers the rest
+        monkeypatch.setattr( client.platform_module, 'aiobotocore', None )
+
+        platform = client.platform_module.Platform( client )
+        platform.establish_connection()
+        platform.snapshot = kabbes_s3synchrony.Snapshot( platform )
+        return platform
+
+    return make_platform
+
+
+@pytest.mark.parametrize( 'transfer_mode', [ 'thread', 'async' ] )
+def test_partial_failures_are_collected_and_reported( tmp_path, s3_platform, capsys, transfer_mode ):
+
+    platform = s3_platform( transfer_mode = transfer_mode, transfer_workers = 4 )
+
+    rel_paths = [ 'f{}.txt'.format( i ) for i in range( 10 ) ]
+    for rel_path in rel_paths:
+        write( tmp_path, 'alice', rel_path, rel_path.encode() )
+
+    # one local file that is not there to upload
+    lPaths = platform.PATHS_CLASS()
+    for rel_path in rel_paths + [ 'missing.txt' ]:
+        lPaths._add( platform.data_lDir.join_Path( path = rel_path ) )
+
+    uploaded = platform._upload_to_remote( lPaths )
+    assert sorted( lPath.get_rel( platform.data_lDir ).path for lPath in uploaded ) == rel_paths
+
+    executor = platform._get_transfer_executor()
+    assert executor.n_failed == 1
+    assert [ str( item ) for item, e in executor.errors ] == [ str( platform.data_lDir.join_Path( path = 'missing.txt' ) ) ]
+    assert 'upload to remote 11/11 files' in capsys.readouterr().out
+
+    # one remote file that is not there to download
+    for rel_path in rel_paths:
+        os.remove( tmp_path / 'alice' / 'Data' / rel_path )
+
+    rPaths = platform.PATHS_CLASS()
+    for rel_path in rel_paths + [ 'missing.txt' ]:
+        rPaths._add( platform.data_rDir.join_Path( path = rel_path ) )
+
+    downloaded = platform._download_from_remote( rPaths )
+    assert len( downloaded ) == 10
+    for rel_path in rel_paths:
+        assert ( tmp_path / 'alice' / 'Data' / rel_path ).read_bytes() == rel_path.encode()
+
+    assert executor.n_failed == 1 and len( executor.errors ) == 1
+    out = capsys.readouterr().out
+    assert '1 failed' in out and 'ERROR: ' + str( platform.data_rDir.join_Path( path = 'missing.txt' ) ) in out
+    assert platform.metrics.get_record()['operations']['download_from_remote']['failed'] == 1
@@ -0,0 +1,55 @@
+import kabbes_s3synchrony
+from conftest import write
+
+
+class FakeSource:
+
+    """Reports the given batches of changed paths, one per poll, then stops the watcher"""
+
+    def __init__( self, batches ):
+        self.batches = list( batches )
+
+    def poll( self, timeout = None ):
+        if len( self.batches ) == 0:
+            raise KeyboardInterrupt
+        return self.batches.pop( 0 ), False
+
+    def close( self ):
+        pass
+
+
+def test_failed_syncs_are_retried_with_their_paths( tmp_path, make_client, monkeypatch ):
+
+    write( tmp_path, 'alice', 'a.txt', b'a' )
+    client = make_client( 'alice' )
+    watcher = kabbes_s3synchrony.Watcher( client, debounce_seconds = 0, interval_seconds = 3600, full_scan_seconds = 3600 )
+
+    # the first full sync and the first incremental one fail, as on a dropped connection
+    calls = []
+    platform_module = kabbes_s3synchrony.get_platform( 'local' )
+    synchronize = platform_module.Platform.synchronize
+    def flaky_synchronize( self, changed_rel_paths = None ):
+        calls.append( changed_rel_paths )
+        if len( calls ) in ( 1, 3 ):
+            raise ConnectionError( 'dropped' )
+        return synchronize( self, changed_rel_paths = changed_rel_paths )
+    monkeypatch.setattr( platform_module.Platform, 'synchronize', flaky_synchronize )
+
+    backoffs = []
+    def no_backoff( attempt, base, cap ):
+        backoffs.append( attempt )
+        return 0
+    monkeypatch.setattr( kabbes_s3synchrony, 'backoff', no_backoff )
+
+    write( tmp_path, 'alice', 'b.txt', b'b' )
+    write( tmp_path, 'alice', 'c.txt', b'c' )
+    source = FakeSource( [ [], [ 'b.txt' ], [ 'c.txt' ], [] ] )
+    monkeypatch.setattr( kabbes_s3synchrony.Watcher, '_get_source', lambda self: source )
+
+    watcher.run()
+
+    # full sync failed, full sync retried, b.txt failed, then b.txt retried along with c.txt
+    assert calls == [ None, None, { 'b.txt' }, { 'b.txt', 'c.txt' } ]
+    assert backoffs == [ 0, 0 ]
+    assert watcher.n_failures == 0 and watcher.dirty == set()
+    assert sorted( ( tmp_path / 'remote' / 'data' ).glob( '*.txt' ) ) == [ tmp_path / 'remote' / 'data' / name for name in [ 'a.txt', 'b.txt', 'c.txt' ] ]